@@ -0,0 +1,349 @@
+"""Stateful alerts: open, acknowledged, resolved.
+
+An alert is deduplicated on (series, rule name), so all the
+``power_price_spike`` rules on ``NYC:rt_price`` share one alert. While any of
+them fires, the alert stays open and tracks the latest value and the most
+severe firing rule, instead of re-raising every tick.
+
+A rule that stops firing is held until the value is back past the rule's
+level by a hysteresis margin: the rule's own ``hysteresis`` (absolute, in the
+series' units) or ``ALERT_HYSTERESIS_PCT`` percent of the level. A
+rate-of-change rule fires only on the tick of the move, so it is held for
+``ALERT_RATE_HOLD_SECONDS`` instead. The alert resolves once no rule is held.
+
+Acknowledging an alert keeps it active but marks it seen; escalating to a
+more severe rule reopens it. Resolved alerts move to ``AlertHistory``, a
+fixed-capacity ring of packed records, so memory stays bounded however long
+a spike lasts: active alerts are bounded by the (series, name) pairs the
+rules define, and history by its capacity.
+"""
+import fcntl
+import os
+import re
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from shared_tick import read_attempts
+
+OPEN, ACKNOWLEDGED, RESOLVED = 'open', 'acknowledged', 'resolved'
+SEVERITY_RANK = {'HIGH': 0, 'MEDIUM': 1, 'LOW': 2}
+SEVERITY_NAMES = sorted(SEVERITY_RANK, key=SEVERITY_RANK.get)
+HYSTERESIS_PCT = float(os.environ.get('ALERT_HYSTERESIS_PCT', 2))
+RATE_HOLD_SECONDS = float(os.environ.get('ALERT_RATE_HOLD_SECONDS', 300))
+HISTORY_CAPACITY = int(os.environ.get('ALERT_HISTORY_CAPACITY', 50000))
+PLACEHOLDER = re.compile(r'\{(entity|field|series|value|level|low|high)\}')
+
+
+def _isoformat(ts):
+    return None if ts is None or np.isnan(ts) else datetime.fromtimestamp(ts).isoformat()
+
+
+def cleared(rule, value, held_seconds):
+    """Whether a rule that is no longer firing has moved far enough back to let go"""
+    if value is None:
+        return True  # the series is no longer indexed
+    if rule['kind'] == 'rate_of_change':
+        return held_seconds >= RATE_HOLD_SECONDS
+
+    def margin(level):
+        return rule['hysteresis'] if 'hysteresis' in rule else abs(level) * HYSTERESIS_PCT / 100
+
+    if rule['kind'] == 'band':
+        mid = (rule['low'] + rule['high']) / 2
+        return min(rule['low'] + margin(rule['low']), mid) <= value <= max(rule['high'] - margin(rule['high']), mid)
+    if rule['op'] == 'above':
+        return value <= rule['level'] - margin(rule['level'])
+    return value >= rule['level'] + margin(rule['level'])
+
+
+def describe(rule, value):
+    """Message for an alert raised by ``rule`` at ``value``"""
+    series = rule['series']
+    entity, _, field = series.rpartition(':')
+    if 'message' in rule:
+        # Only the known placeholders are filled in; anything else in the template is left as written
+        fields = {'entity': entity, 'field': field, 'series': series, 'value': value,
+                  'level': rule.get('level'), 'low': rule.get('low'), 'high': rule.get('high')}
+        return PLACEHOLDER.sub(lambda match: str(fields[match.group(1)]), rule['message'])
+    return f"{series} triggered {rule['name']} at {value}"
+
+
+class Alert:
+    __slots__ = ('id', 'series', 'name', 'state', 'opened', 'updated', 'acknowledged', 'held',
+                 'rank', 'rule_id', 'peak_rank', 'peak_rule_id', 'value', 'min_value', 'max_value', 'payload')
+
+    def __init__(self, alert_id, series, name, now):
+        self.id = alert_id
+        self.series = series
+        self.name = name
+        self.state = OPEN
+        self.opened = self.updated = now
+        self.acknowledged = None
+        self.held = {}  # rule id -> when it last fired
+        self.rank = self.peak_rank = len(SEVERITY_NAMES)
+        self.rule_id = self.peak_rule_id = None
+        self.value = None
+        self.min_value = np.inf
+        self.max_value = -np.inf
+        self.payload = None  # dict served to clients, rebuilt after each change
+
+    def to_dict(self, rules):
+        if self.payload is None:
+            rule = rules[self.rule_id]
+            self.payload = {
+                'id': self.id,
+                'state': self.state,
+                'severity': SEVERITY_NAMES[self.rank],
+                'type': self.name,
+                'series': self.series,
+                'message': describe(rule, self.value),
+                'value': self.value,
+                'min_value': self.min_value,
+                'max_value': self.max_value,
+                'recommendation': rule.get('recommendation', ''),
+                'timestamp': _isoformat(self.opened),
+                'updated': _isoformat(self.updated),
+                'acknowledged_at': _isoformat(self.acknowledged),
+                'rule_id': self.rule_id
+            }
+        return self.payload
+
+
+class AlertBook:
+    """The active alerts, updated from each RuleIndex evaluation"""
+
+    def __init__(self, history=None):
+        self.history = history if history is not None else AlertHistory(HISTORY_CAPACITY)
+        self.active = {}  # series -> {rule name: Alert}
+        self.by_id = {}
+        self.holding = set()  # alerts holding a rule that has stopped firing
+        self.next_id = 1
+        self._alerts = []
+        self._changed = False
+
+    def update(self, index, updated, now, rebuilt=False):
+        """Apply one evaluation of ``index`` at epoch seconds ``now``; returns the active alerts, most severe first.
+
+        ``updated`` are the series whose firing rules changed. After the index
+        is rebuilt every active alert is rechecked, since its rules may be gone.
+        """
+        if rebuilt:
+            for names in self.active.values():
+                for alert in names.values():
+                    alert.payload = None  # a rule's message or recommendation may have been edited
+            self._changed = True
+        touched = set()
+        series_list = set(updated) | set(self.active) if rebuilt else updated
+        for series in series_list:
+            fired = self._fired(index, series)
+            for name in set(fired) | set(self.active.get(series, ())):
+                touched.add(self._apply(index, series, name, fired.get(name, ()), now))
+        # A held rule can clear without its series changing firing state: moving back past
+        # the margin, or a rate-of-change hold running out
+        for alert in list(self.holding - touched):
+            self._apply(index, alert.series, alert.name, self._fired(index, alert.series).get(alert.name, ()), now)
+
+        if self._changed:
+            alerts = [alert for names in self.active.values() for alert in names.values()]
+            alerts.sort(key=lambda alert: (alert.rank, -alert.opened, alert.id))
+            self._alerts = [alert.to_dict(index.rules) for alert in alerts]
+            self._changed = False
+        return self._alerts
+
+    @staticmethod
+    def _fired(index, series):
+        """{rule name: [firing rule ids]} for one series"""
+        fired = {}
+        for rule_id in index.firing.get(series, ()):
+            fired.setdefault(index.rules[rule_id]['name'], []).append(rule_id)
+        return fired
+
+    def _apply(self, index, series, name, fired, now):
+        alert = self.active.get(series, {}).get(name)
+        if alert is None:
+            if not fired:
+                return None
+            alert = self.active.setdefault(series, {})[name] = Alert(self.next_id, series, name, now)
+            self.by_id[alert.id] = alert
+            self.next_id += 1
+        for rule_id in fired:
+            alert.held[rule_id] = now
+        value = index.value(series)
+        for rule_id, last_fired in list(alert.held.items()):
+            rule = index.rules.get(rule_id)
+            if rule is None or (rule_id not in fired and cleared(rule, value, now - last_fired)):
+                del alert.held[rule_id]
+
+        if not alert.held:
+            self._resolve(alert, now)
+            return alert
+        if len(alert.held) > len(fired):
+            self.holding.add(alert)
+        else:
+            self.holding.discard(alert)
+        rank, rule_id = min((SEVERITY_RANK[index.rules[rule_id]['severity']], rule_id) for rule_id in alert.held)
+        if (value, rank, rule_id) == (alert.value, alert.rank, alert.rule_id):
+            return alert
+        if rank < alert.rank and alert.state == ACKNOWLEDGED:
+            alert.state = OPEN  # escalation needs a fresh acknowledgement
+        if rank < alert.peak_rank:
+            alert.peak_rank, alert.peak_rule_id = rank, rule_id
+        alert.rank, alert.rule_id, alert.value, alert.updated = rank, rule_id, value, now
+        if value is not None:
+            alert.min_value, alert.max_value = min(alert.min_value, value), max(alert.max_value, value)
+        alert.payload = None
+        self._changed = True
+        return alert
+
+    def _resolve(self, alert, now):
+        names = self.active[alert.series]
+        del names[alert.name]
+        if not names:
+            del self.active[alert.series]
+        del self.by_id[alert.id]
+        self.holding.discard(alert)
+        self._changed = True
+        if alert.rule_id is not None:
+            self.history.append(alert, now)
+
+    def acknowledge(self, alert_id, now):
+        """Mark an active alert as seen; returns False if it is not active"""
+        alert = self.by_id.get(alert_id)
+        if alert is None:
+            return False
+        if alert.state == OPEN:
+            alert.state, alert.acknowledged, alert.payload = ACKNOWLEDGED, now, None
+            self._changed = True
+        return True
+
+
+class AlertHistory:
+    """Fixed-capacity ring buffer of resolved alerts, one packed record each.
+
+    Like PriceHistory, everything lives in one flat buffer that may be shared
+    memory, with a single writer and lock-free readers that retry when the
+    sequence counter moved under them. Records are appended in order of
+    resolution time, so a time range is two binary searches away.
+    """
+
+    DTYPE = np.dtype([('id', '<i8'), ('rule_id', '<i8'), ('severity', 'i1'), ('opened', '<f8'),
+                      ('acknowledged', '<f8'), ('min_value', '<f8'), ('max_value', '<f8'),
+                      ('series', 'S64'), ('type', 'S32')])
+    _SEQ, _COUNT, _NEXT = range(3)
+    _STATE_SLOTS = 4
+
+    def __init__(self, capacity, buffer=None):
+        self.capacity = capacity
+        if buffer is None:
+            buffer = bytearray(self.nbytes(capacity))
+        self._state = np.ndarray(self._STATE_SLOTS, dtype=np.int64, buffer=buffer)
+        self.resolved = np.ndarray(capacity, dtype=np.float64, buffer=buffer, offset=self._state.nbytes)
+        self.records = np.ndarray(capacity, dtype=self.DTYPE, buffer=buffer,
+                                  offset=self._state.nbytes + self.resolved.nbytes)
+
+    @classmethod
+    def nbytes(cls, capacity):
+        return 8 * (cls._STATE_SLOTS + capacity) + cls.DTYPE.itemsize * capacity
+
+    @property
+    def count(self):
+        return int(self._state[self._COUNT])
+
+    def append(self, alert, now):
+        row = int(self._state[self._NEXT])
+        if self.count:
+            now = max(now, self.resolved[row - 1])
+        self._state[self._SEQ] += 1
+        self.resolved[row] = now
+        self.records[row] = (alert.id, alert.peak_rule_id, alert.peak_rank, alert.opened,
+                             np.nan if alert.acknowledged is None else alert.acknowledged,
+                             alert.min_value, alert.max_value,
+                             alert.series.encode()[:64], alert.name.encode()[:32])
+        self._state[self._NEXT] = (row + 1) % self.capacity
+        self._state[self._COUNT] = min(self.count + 1, self.capacity)
+        self._state[self._SEQ] += 1
+
+    def _runs(self):
+        count, head = self.count, int(self._state[self._NEXT])
+        if count < self.capacity:
+            return [(0, count)]
+        return [(head, self.capacity), (0, head)]
+
+    def _copy(self, start, end):
+        """Records resolved at or after ``start`` and opened by ``end``, oldest first"""
+        for _ in read_attempts('Alert history'):
+            seq = int(self._state[self._SEQ])
+            if seq & 1:
+                continue  # a write is in progress
+            resolved, records = [], []
+            for lo, hi in self._runs():
+                a = lo + int(np.searchsorted(self.resolved[lo:hi], start, side='left'))
+                resolved.append(self.resolved[a:hi].copy())
+                records.append(self.records[a:hi].copy())
+            if int(self._state[self._SEQ]) == seq:
+                break
+        resolved, records = np.concatenate(resolved), np.concatenate(records)
+        keep = records['opened'] <= end
+        return resolved[keep], records[keep]
+
+    def query(self, start=None, end=None, severities=None, limit=None):
+        """Resolved alerts that were active at some time in [start, end] (epoch seconds), newest first"""
+        resolved, records = self._copy(-np.inf if start is None else start, np.inf if end is None else end)
+        if severities is not None:
+            keep = np.isin(records['severity'], [SEVERITY_RANK[severity] for severity in severities])
+            resolved, records = resolved[keep], records[keep]
+        resolved, records = resolved[::-1][:limit], records[::-1][:limit]
+        return [{
+            'id': int(record['id']),
+            'rule_id': int(record['rule_id']),
+            'severity': SEVERITY_NAMES[record['severity']],
+            'type': record['type'].decode(errors='replace'),
+            'series': record['series'].decode(errors='replace'),
+            'opened': _isoformat(float(record['opened'])),
+            'acknowledged_at': _isoformat(float(record['acknowledged'])),
+            'resolved': _isoformat(float(ts)),
+            'min_value': float(record['min_value']),
+            'max_value': float(record['max_value'])
+        } for ts, record in zip(resolved.tolist(), records)]
+
+
+class AckLog:
+    """Alert ids waiting to be acknowledged by the engine's next alerts run.
+
+    Acknowledgements are queued rather than applied by the request thread,
+    so only the engine ever touches the AlertBook. Given a path, the queue
+    is an append-only file under an advisory lock, which lets web workers
+    pass acknowledgements to the tick producer.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending = []
+
+    def put(self, alert_id):
+        with self._lock:
+            if self.path is None:
+                self._pending.append(int(alert_id))
+                return
+            with open(self.path, 'a') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                f.write(f'{int(alert_id)}\n')
+
+    def drain(self):
+        """Take every queued id"""
+        with self._lock:
+            if self.path is None:
+                pending, self._pending = self._pending, []
+                return pending
+            try:
+                f = open(self.path, 'r+')
+            except FileNotFoundError:
+                return []
+            with f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                lines = f.read().split()
+                f.truncate(0)
+            return [int(line) for line in lines if line.isdigit()]
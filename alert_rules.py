@@ -0,0 +1,451 @@
+"""User-defined alert rules, indexed by series.
+
+A rule watches one series (``"NYC:rt_price"``, ``"Transco Z6 NY:price"``, or
+a market-wide ``"henry_hub"`` / ``"avg_spark_spread"``) and comes in three
+kinds:
+
+``threshold``       value above or below ``level``
+``rate_of_change``  a move since the previous tick, in percent, above or below ``level``
+``band``            value outside [``low``, ``high``]
+
+Every rule reduces to "above x" or "below x" on the series value or its
+percent change, so ``RuleIndex`` keeps, per series, sorted arrays of levels
+with the rule ids alongside. The rules a value triggers are one
+``searchsorted`` away, and a tick only searches the series whose value
+moved.
+
+``RuleStore`` holds the rule definitions. Given a path it keeps them in a
+JSON file guarded by an advisory lock, so that every gunicorn worker can
+edit them and the tick producer picks up changes by watching the file.
+"""
+import fcntl
+import json
+import os
+import re
+import threading
+
+import numpy as np
+
+KINDS = ('threshold', 'rate_of_change', 'band')
+OPS = ('above', 'below')
+SEVERITIES = ('LOW', 'MEDIUM', 'HIGH')
+MARKET_SERIES = ('henry_hub', 'avg_spark_spread')
+ZONE_FIELDS = ('rt_price', 'da_price', 'load_mw', 'heat_rate', 'spark_spread')
+HUB_FIELDS = ('price', 'basis_to_hh', 'volume_mmcf', 'volatility')
+# Rule text reaches every dashboard, so it is limited to plain names and printable text without markup
+NAME_PATTERN = re.compile(r'[A-Za-z0-9_. -]{1,64}')
+TEXT_PATTERN = re.compile(r'[^<>&"\'`\x00-\x1f\x7f]{1,200}')
+
+
+class RuleError(ValueError):
+    """Raised for a rule definition that cannot be indexed"""
+
+
+def _number(spec, name):
+    try:
+        value = float(spec[name])
+    except KeyError:
+        raise RuleError(f'{name} is required for a {spec.get("kind")} rule')
+    except (TypeError, ValueError):
+        raise RuleError(f'{name} must be a number')
+    if not np.isfinite(value):
+        raise RuleError(f'{name} must be finite')
+    return value
+
+
+def _text(value, name, pattern):
+    if not isinstance(value, str) or not pattern.fullmatch(value):
+        if pattern is NAME_PATTERN:
+            raise RuleError(f'{name} must be 1-64 letters, digits, spaces or _ . -')
+        raise RuleError(f'{name} must be 1-200 printable characters without < > & " \' or `')
+    return value
+
+
+def validate(spec, known_series=None):
+    """Normalize a rule definition, raising RuleError if it is malformed"""
+    if not isinstance(spec, dict):
+        raise RuleError('A rule must be a JSON object')
+    kind = spec.get('kind', 'threshold')
+    if kind not in KINDS:
+        raise RuleError(f'kind must be one of {", ".join(KINDS)}')
+    series = spec.get('series')
+    if not isinstance(series, str) or not series:
+        raise RuleError('series is required, e.g. "NYC:rt_price"')
+    if known_series is not None and series not in known_series:
+        raise RuleError(f'Unknown series: {series}')
+    severity = spec.get('severity', 'MEDIUM')
+    if severity not in SEVERITIES:
+        raise RuleError(f'severity must be one of {", ".join(SEVERITIES)}')
+
+    rule = {'kind': kind, 'series': series, 'severity': severity,
+            'name': _text(spec.get('name') or kind, 'name', NAME_PATTERN)}
+    for optional, pattern in (('message', TEXT_PATTERN), ('recommendation', TEXT_PATTERN), ('desk', NAME_PATTERN)):
+        if spec.get(optional) is not None:
+            rule[optional] = _text(spec[optional], optional, pattern)
+    if spec.get('hysteresis') is not None:
+        rule['hysteresis'] = _number(spec, 'hysteresis')
+        if rule['hysteresis'] < 0:
+            raise RuleError('hysteresis must not be negative')
+    if kind == 'band':
+        rule['low'], rule['high'] = _number(spec, 'low'), _number(spec, 'high')
+        if rule['low'] > rule['high']:
+            raise RuleError('low must not exceed high')
+    else:
+        op = spec.get('op', 'above')
+        if op not in OPS:
+            raise RuleError(f'op must be one of {", ".join(OPS)}')
+        rule['op'], rule['level'] = op, _number(spec, 'level')
+    return rule
+
+
+def series_names(zones, hubs):
+    """Every series a rule may watch"""
+    names = set(MARKET_SERIES)
+    for zone in zones:
+        names.update(f'{zone}:{field}' for field in ZONE_FIELDS)
+    for hub in hubs:
+        names.update(f'{hub}:{field}' for field in HUB_FIELDS)
+    return names
+
+
+def default_rules(zones):
+    """The checks generate_alerts used to hardcode, as rules"""
+    rules = []
+    for zone in zones:
+        for level, severity in ((100, 'MEDIUM'), (150, 'HIGH')):
+            rules.append({
+                'kind': 'threshold', 'series': f'{zone}:rt_price', 'op': 'above', 'level': level,
+                'severity': severity, 'name': 'power_price_spike',
+                'message': 'High electricity price in {entity}: ${value}/MWh',
+                'recommendation': 'Consider demand response or power sales'
+            })
+    rules.append({
+        'kind': 'threshold', 'series': 'henry_hub', 'op': 'above', 'level': 4.5,
+        'severity': 'HIGH', 'name': 'gas_price_spike',
+        'message': 'High Henry Hub price: ${value}/MMBtu',
+        'recommendation': 'Monitor power generation costs and spark spreads'
+    })
+    rules.append({
+        'kind': 'threshold', 'series': 'avg_spark_spread', 'op': 'below', 'level': 8,
+        'severity': 'MEDIUM', 'name': 'low_spark_spread',
+        'message': 'Low average spark spread: ${value}/MWh',
+        'recommendation': 'Gas generation may be uneconomical'
+    })
+    return rules
+
+
+class RuleStore:
+    """Rule definitions by id, in memory or in a JSON file shared between processes"""
+
+    def __init__(self, path=None, defaults=()):
+        self.path = path
+        self._lock = threading.Lock()
+        self._revision = 0
+        self._data = None
+        if path is None:
+            self._data = {'next_id': 1, 'rules': {}}
+            self._add_all(self._data, defaults)
+        elif not os.path.exists(path):
+            with self._locked() as data:
+                if not data['rules'] and data['next_id'] == 1:  # nobody seeded it while we waited
+                    self._add_all(data, defaults)
+                    self._write(data)
+
+    @staticmethod
+    def _add_all(data, specs):
+        created = []
+        for spec in specs:
+            rule = dict(validate(spec), id=data['next_id'])
+            data['rules'][str(rule['id'])] = rule
+            data['next_id'] += 1
+            created.append(rule)
+        return created
+
+    # Storage
+
+    def _locked(self):
+        return _FileTransaction(self) if self.path is not None else _MemoryTransaction(self)
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'next_id': 1, 'rules': {}}
+
+    def _write(self, data):
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def version(self):
+        """Changes whenever the rules do; cheap enough to check every tick"""
+        if self.path is None:
+            return self._revision
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    # CRUD
+
+    def rules(self):
+        with self._locked() as data:
+            return [dict(rule) for rule in data['rules'].values()]
+
+    def get(self, rule_id):
+        with self._locked() as data:
+            rule = data['rules'].get(str(rule_id))
+            return dict(rule) if rule else None
+
+    def create(self, specs, known_series=None):
+        """Add one or more rules; all are validated before any is stored"""
+        specs = [validate(spec, known_series) for spec in specs]
+        with self._locked() as data:
+            created = self._add_all(data, specs)
+            self._commit(data)
+        return created
+
+    def replace(self, rule_id, spec, known_series=None):
+        rule = validate(spec, known_series)
+        with self._locked() as data:
+            if str(rule_id) not in data['rules']:
+                return None
+            rule = data['rules'][str(rule_id)] = dict(rule, id=int(rule_id))
+            self._commit(data)
+        return dict(rule)
+
+    def delete(self, rule_id):
+        with self._locked() as data:
+            rule = data['rules'].pop(str(rule_id), None)
+            if rule is not None:
+                self._commit(data)
+        return rule
+
+    def _commit(self, data):
+        if self.path is None:
+            self._revision += 1
+        else:
+            self._write(data)
+
+
+class _MemoryTransaction:
+    def __init__(self, store):
+        self.store = store
+
+    def __enter__(self):
+        self.store._lock.acquire()
+        return self.store._data
+
+    def __exit__(self, *exc):
+        self.store._lock.release()
+
+
+class _FileTransaction:
+    """Holds the store's advisory lock across a read-modify-write of the rules file"""
+
+    def __init__(self, store):
+        self.store = store
+        self.fd = None
+
+    def __enter__(self):
+        self.store._lock.acquire()
+        self.fd = os.open(self.store.path + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self.store._read()
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
+        self.store._lock.release()
+
+
+class _Levels:
+    """One direction ("above" or "below") of one measure's rules for every series of a column.
+
+    Levels are sorted by (series position, level) and flattened, with
+    ``starts`` giving each series' segment. Encoding a level by its rank among
+    all distinct levels turns the pair into one integer key, so a single
+    vectorized ``searchsorted`` runs the binary search for every queried
+    series at once. When most series are queried, comparing every level with
+    its series' measure directly is cheaper than the searches.
+    """
+
+    def __init__(self, n_series, entries, above):
+        self.above = above
+        self.n_series = n_series
+        entries.sort()
+        self.positions = np.array([position for position, _, _ in entries], dtype=np.int64)
+        self.levels = np.array([level for _, level, _ in entries], dtype=float)
+        self.ids = np.array([rule_id for _, _, rule_id in entries], dtype=np.int64)
+        self.distinct = np.unique(self.levels)
+        self.stride = len(self.distinct) + 1
+        self.keys = self.positions * self.stride + np.searchsorted(self.distinct, self.levels)
+        self.starts = np.searchsorted(self.positions, np.arange(n_series + 1))
+
+    def query(self, positions, measures):
+        """(series position, rule id) for every rule the measures fire"""
+        if len(positions) * 8 > self.n_series:
+            # Unqueried series read NaN, which compares false against every level
+            if len(positions) == self.n_series:
+                by_series = measures  # positions are every series, in order
+            else:
+                by_series = np.full(self.n_series, np.nan)
+                by_series[positions] = measures
+            by_rule = by_series[self.positions]
+            hit = by_rule > self.levels if self.above else by_rule < self.levels
+            return self.positions[hit], self.ids[hit]
+        if self.above:
+            # Rules with level < measure: from the segment start up to the first level >= measure
+            rank = np.searchsorted(self.distinct, measures, side='left')
+            lo = self.starts[positions]
+            hi = np.searchsorted(self.keys, positions * self.stride + rank, side='left')
+        else:
+            # Rules with level > measure: from the first level > measure to the segment end
+            rank = np.searchsorted(self.distinct, measures, side='right')
+            lo = np.searchsorted(self.keys, positions * self.stride + rank, side='left')
+            hi = self.starts[positions + 1]
+        counts = hi - lo
+        total = int(counts.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        # Expand each [lo, hi) range without a Python loop
+        hit_positions = np.repeat(positions, counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        return hit_positions, self.ids[np.repeat(lo, counts) + offsets]
+
+
+class RuleIndex:
+    """Rules grouped by series, evaluated only for series that moved.
+
+    ``firing`` maps each series with a firing rule to {rule id: value}.
+    ``evaluate`` refreshes it for the series that moved, plus those with
+    firing rate-of-change rules (which lapse once the series stops moving),
+    and returns the names of the series whose entry was set or cleared.
+    """
+
+    def __init__(self, rules, zones, hubs):
+        self.rules = {rule['id']: rule for rule in rules}
+        self.zones = list(zones)
+        self.hubs = list(hubs)
+        zone_index = {zone: i for i, zone in enumerate(self.zones)}
+        hub_index = {hub: i for i, hub in enumerate(self.hubs)}
+
+        # Group the watched series by source column so a tick diffs each column in one pass
+        self.unknown = set()
+        grouped = {}  # (group, field) -> {series: entity index}
+        for series in sorted({rule['series'] for rule in self.rules.values()}):
+            entity, _, field = series.rpartition(':')
+            if not entity and field in MARKET_SERIES:
+                key, idx = ('market', None), MARKET_SERIES.index(field)  # the scalars share one column
+            elif entity in zone_index and field in ZONE_FIELDS:
+                key, idx = ('electricity', field), zone_index[entity]
+            elif entity in hub_index and field in HUB_FIELDS:
+                key, idx = ('natural_gas', field), hub_index[entity]
+            else:
+                self.unknown.add(series)
+                continue
+            grouped.setdefault(key, {})[series] = idx
+
+        self.columns = {}
+        self.locations = {}  # series -> (column key, position)
+        for key, members in grouped.items():
+            names = list(members)
+            position = {series: i for i, series in enumerate(names)}
+            self.locations.update((series, (key, i)) for series, i in position.items())
+            entries = {(measure, op): [] for measure in ('value', 'change') for op in OPS}
+            for rule in self.rules.values():
+                if rule['series'] not in position:
+                    continue
+                i = position[rule['series']]
+                if rule['kind'] == 'band':
+                    entries[('value', 'below')].append((i, rule['low'], rule['id']))
+                    entries[('value', 'above')].append((i, rule['high'], rule['id']))
+                else:
+                    measure = 'change' if rule['kind'] == 'rate_of_change' else 'value'
+                    entries[(measure, rule['op'])].append((i, rule['level'], rule['id']))
+            indices = np.array(list(members.values()), dtype=np.intp)
+            width = {'market': len(MARKET_SERIES), 'electricity': len(self.zones),
+                     'natural_gas': len(self.hubs)}[key[0]]
+            if len(indices) == width and np.array_equal(indices, np.arange(width)):
+                indices = None  # the series are the whole source column, in order
+            self.columns[key] = {
+                'indices': indices,
+                'names': names,
+                'levels': {(measure, op): _Levels(len(names), found, op == 'above')
+                           for (measure, op), found in entries.items() if found},
+                'last': None,  # values at the last evaluation
+                'firing': np.zeros(len(names), dtype=bool),
+                'rate_firing': np.zeros(len(names), dtype=bool)
+            }
+        self.firing = {}  # series -> {rule id: value}
+
+    def __len__(self):
+        return len(self.rules)
+
+    def value(self, series):
+        """The series' value at the last evaluation, or None"""
+        key, position = self.locations.get(series, (None, None))
+        last = self.columns[key]['last'] if key is not None else None
+        return None if last is None else float(last[position])
+
+    @staticmethod
+    def _column(market_data, group, field):
+        if group == 'market':
+            return [getattr(market_data, name) for name in MARKET_SERIES]
+        return getattr(market_data, group)[field]
+
+    def evaluate(self, market_data):
+        updated = []
+        for key, column in self.columns.items():
+            values = np.array(self._column(market_data, *key), dtype=float)  # a copy: kept as the next 'last'
+            if column['indices'] is not None:
+                values = values[column['indices']]
+            previous = column['last']
+            moved = np.ones(len(values), dtype=bool) if previous is None else values != previous
+            # A rate-of-change rule only fires on the tick of the move itself
+            recheck = np.flatnonzero(moved | column['rate_firing'])
+            column['last'] = values
+            if not recheck.size:
+                continue
+            # Slicing beats fancy indexing when every series is rechecked, as on a tick that moved them all
+            where = slice(None) if recheck.size == len(values) else recheck
+
+            hit_positions, hit_ids, rate_positions = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)], []
+            for (measure, op), levels in column['levels'].items():
+                positions = recheck
+                if measure == 'change':
+                    if previous is None:
+                        continue
+                    positions = recheck[moved[recheck] & (previous[recheck] != 0)]
+                    measures = np.round((values[positions] - previous[positions]) / np.abs(previous[positions]) * 100, 4)
+                else:
+                    measures = values[where]
+                found_positions, found_ids = levels.query(positions, measures)
+                hit_positions.append(found_positions)
+                hit_ids.append(found_ids)
+                if measure == 'change':
+                    rate_positions.append(found_positions)
+            column['rate_firing'][where] = False
+            for found in rate_positions:
+                column['rate_firing'][found] = True
+
+            names = column['names']
+            hit_positions = np.concatenate(hit_positions)
+            hits = {}
+            for position, rule_id in zip(hit_positions.tolist(), np.concatenate(hit_ids).tolist()):
+                hits.setdefault(position, {})[rule_id] = float(values[position])
+            # Only series that fire now or fired before need their entry touched
+            was_firing = column['firing'][where].copy()  # a view when ``where`` is a slice
+            column['firing'][where] = False
+            column['firing'][hit_positions] = True
+            for position in recheck[was_firing | column['firing'][where]].tolist():
+                series = names[position]
+                if position in hits:
+                    self.firing[series] = hits[position]
+                else:
+                    del self.firing[series]
+                updated.append(series)
+        return updated
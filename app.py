@@ -1,281 +1,1754 @@
-from flask import Flask, render_template_string, jsonify
+from flask import Flask, Response, g, jsonify, redirect, request
+import argparse
+import functools
+import gzip
+import hashlib
+import heapq
 import json
-import random
 import math
 import os
+import queue
+import sys
 from datetime import datetime, timedelta
 import threading
 import time
 
+import numpy as np
+
+try:
+    import brotli
+except ImportError:  # optional: without it the dashboard is served gzip-only
+    brotli = None
+
+import alert_lifecycle
+import alert_rules
+import feed_fetch
+import metrics
+import nyiso_ingest
+import scheduler
+import training
+from shared_tick import ProducerUnavailable, SharedTickSegment, read_attempts
+from tick_store import TickStore, TickStoreError
+
 app = Flask(__name__)
 
-class EnergyIntelligenceEngine:
-    def __init__(self):
-        self.electricity_zones = ['NYC', 'WEST', 'CAPITAL', 'NORTH', 'CENTRAL']
-        self.gas_hubs = ['Transco Z6 NY', 'Algonquin Citygate', 'Tennessee Z4', 'Iroquois Waddington', 'Dominion South']
+# Engine metrics are recorded wherever the engine runs (the producer, in shared mode);
+# HTTP metrics are per process.
+engine_metrics = metrics.Registry()
+STAGE_SECONDS = engine_metrics.histogram('nyiso_stage_duration_seconds', 'Time spent in each engine stage', ['stage'])
+TICK_SECONDS = engine_metrics.histogram('nyiso_tick_duration_seconds', 'Time to compute and publish one tick')
+TICKS = engine_metrics.counter('nyiso_ticks', 'Ticks published')
+STAGE_MISSED = engine_metrics.counter('nyiso_stage_missed_deadlines', 'Stage runs dropped after an overrun', ['stage'])
+STAGE_ERRORS = engine_metrics.counter('nyiso_stage_errors', 'Stage runs that failed, by exception type',
+                                      ['stage', 'error'])
+LAST_TICK = engine_metrics.gauge('nyiso_last_tick_timestamp_seconds', 'Market time of the newest tick')
+SIGNAL_COUNT = engine_metrics.gauge('nyiso_trading_signals', 'Trading signals in the newest tick', ['type'])
+FEED_FETCHES = engine_metrics.counter('nyiso_feed_fetches', 'Feed requests that finished, by outcome',
+                                     ['feed', 'outcome'])
+FEED_SECONDS = engine_metrics.histogram('nyiso_feed_fetch_duration_seconds', 'Time for one feed request', ['feed'])
+ALERT_COUNT = engine_metrics.gauge('nyiso_alerts', 'Active alerts in the newest tick', ['severity'])
+
+http_metrics = metrics.Registry()
+REQUEST_SECONDS = http_metrics.histogram('nyiso_http_request_duration_seconds', 'Request handling time',
+                                         ['route', 'method', 'status'])
+RESPONSE_BYTES = http_metrics.histogram('nyiso_http_response_size_bytes', 'Response body size, after encoding',
+                                        ['route'], buckets=metrics.SIZE_BUCKETS)
+DATA_AGE = http_metrics.gauge('nyiso_data_age_seconds', 'Age of the tick being served, at scrape time')
+
+HOURLY_LOAD_PATTERN = np.array([0.7, 0.65, 0.6, 0.6, 0.65, 0.75, 0.85, 0.95, 1.0, 0.98, 0.95, 0.92,
+                                0.9, 0.88, 0.85, 0.88, 0.92, 0.98, 1.0, 0.95, 0.9, 0.85, 0.8, 0.75])
+
+
+def _columns_to_records(names, columns, fields):
+    """Turn per-field arrays into the {name: {field: value}} JSON shape"""
+    rows = zip(*(columns[field].tolist() for field in fields))
+    return {name: dict(zip(fields, row)) for name, row in zip(names, rows)}
+
+
+def top_pair_spreads(prices, threshold, k):
+    """Find the k widest pairs whose price difference exceeds threshold.
+    
+    Prices are sorted once and a vectorized searchsorted gives, for every cheap
+    leg, the first partner more than threshold above it. Pairs are then pulled
+    widest-first from a heap, so only O(k) of the O(n^2) pairs are ever built.
+    Returns (buy_idx, sell_idx, spread) arrays in original index order.
+    """
+    empty = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0))
+    n = len(prices)
+    if k <= 0 or n < 2:
+        return empty
+    
+    order = np.argsort(prices, kind='stable')
+    ordered = np.asarray(prices, dtype=float)[order]
+    first = np.searchsorted(ordered, ordered + threshold, side='right')
+    rows = int(np.count_nonzero(first < n))  # first[] is monotonic, so candidate rows form a prefix
+    if rows == 0:
+        return empty
+    
+    # Row i's partners j = n-1 .. first[i] give shrinking spreads, and row i+1's
+    # widest spread never beats row i's, so rows are seeded into the heap lazily.
+    top = n - 1
+    heap = [(ordered[0] - ordered[top], 0, top)]
+    buy, sell, spread = [], [], []
+    while heap and len(spread) < k:
+        neg_diff, i, j = heapq.heappop(heap)
+        buy.append(i)
+        sell.append(j)
+        spread.append(-neg_diff)
+        if j - 1 >= first[i]:
+            heapq.heappush(heap, (ordered[i] - ordered[j - 1], i, j - 1))
+        if j == top and i + 1 < rows:
+            heapq.heappush(heap, (ordered[i + 1] - ordered[top], i + 1, top))
+    
+    return order[buy], order[sell], np.array(spread)
+
+
+def changed_mask(current, previous):
+    """Elementwise 'moved since last time' for aligned arrays; everything counts as moved without a previous"""
+    if previous is None or previous.shape != current.shape:
+        return np.ones(current.shape, dtype=bool)
+    return current != previous
+
+
+def spark_spreads(rt_price, heat_rate, gas_price, vom, previous=None):
+    """Spark spread per zone, recomputing only zones whose inputs moved since ``previous``.
+    
+    ``gas_price`` and ``vom`` are per zone: the price at the zone's delivering
+    hub and its variable O&M adder. ``previous`` is the (rt_price, heat_rate,
+    gas_price, spark_spread) the last result was computed from.
+    """
+    if previous is None:
+        dirty = None
+    else:
+        dirty = np.flatnonzero(changed_mask(rt_price, previous[0]) | changed_mask(heat_rate, previous[1]) |
+                               changed_mask(gas_price, previous[2]))
+        if dirty.size > len(rt_price) // 2:
+            dirty = None  # cheaper to redo them all in one pass
+    if dirty is None:
+        return np.round(rt_price - gas_price * heat_rate / 1000 - vom, 2)
+    spread = previous[3].copy()
+    spread[dirty] = np.round(rt_price[dirty] - gas_price[dirty] * heat_rate[dirty] / 1000 - vom[dirty], 2)
+    return spread
+
+
+class FuelMapping:
+    """Which gas hub fuels each zone, and each zone's variable O&M adder ($/MWh).
+    
+    Zones without a delivering hub are priced against the average of all
+    hubs. ``matrix`` prices every zone against every hub at once, for
+    comparing a zone's delivering hub with its alternatives.
+    """
+    
+    def __init__(self, zones, hubs, zone_hubs, vom_adders, default_vom=0.0):
+        hub_index = {hub: i for i, hub in enumerate(hubs)}
+        unknown = sorted({hub for zone, hub in zone_hubs.items() if zone in zones and hub not in hub_index})
+        if unknown:
+            raise ValueError(f'Zone to hub mapping names unknown hubs: {", ".join(unknown)}')
+        self.zones = list(zones)
+        self.hubs = list(hubs)
+        self.delivering = {zone: zone_hubs.get(zone) for zone in self.zones}
+        # Index len(hubs) selects the hub average appended by zone_gas
+        self.hub_index = np.array([hub_index.get(zone_hubs.get(zone), len(hubs)) for zone in self.zones],
+                                  dtype=np.intp)
+        self.averaged = bool((self.hub_index == len(hubs)).any())
+        self.vom = np.array([float(vom_adders.get(zone, default_vom)) for zone in self.zones])
+    
+    def zone_gas(self, gas_price):
+        """Gas price at each zone's delivering hub"""
+        if not self.averaged:
+            return gas_price[self.hub_index]
+        return np.append(gas_price, gas_price.mean())[self.hub_index]
+    
+    def matrix(self, rt_price, heat_rate, gas_price):
+        """(zones x hubs) spark spreads in one broadcast, unrounded"""
+        spreads = np.multiply.outer(heat_rate / -1000, gas_price)
+        spreads += (rt_price - self.vom)[:, None]
+        return spreads
+    
+    def to_dict(self, market_data):
+        """The matrix as columns: spreads flattened zone by zone in integer cents, hubs by index into ``hubs``"""
+        electricity = market_data.electricity
+        cents = np.rint(self.matrix(electricity['rt_price'], electricity['heat_rate'],
+                                    market_data.natural_gas['price']) * 100).astype(np.int64)
+        n_hubs = len(self.hubs)
+        return {
+            'timestamp': market_data.time.isoformat(),
+            'zones': self.zones,
+            'hubs': self.hubs,
+            'shape': [len(self.zones), n_hubs],
+            'spread_cents': cents.ravel().tolist(),
+            'vom': self.vom.tolist(),
+            'delivering_hub': [None if i == n_hubs else i for i in self.hub_index.tolist()],
+            'best_hub': cents.argmax(axis=1).tolist() if n_hubs else [None] * len(self.zones)
+        }
+
+
+class TopPairs:
+    """Incrementally maintained ``top_pair_spreads`` for a price vector that changes a few nodes at a time.
+    
+    Up to ``k + reserve`` of the widest qualifying pairs are kept. On an
+    update, kept pairs touching a changed node are dropped and every pair
+    involving a changed node is re-scored, an O(changed * n) vectorized pass.
+    No pair outside the kept set was wider than the narrowest kept pair, so
+    merged pairs at least that wide are exactly the widest overall; the rest
+    are discarded. While at least k remain (or the kept set holds every
+    qualifying pair) the top k are exact; otherwise, or when many nodes moved,
+    it falls back to a full ``top_pair_spreads`` scan.
+    
+    Re-scoring costs about as much per changed node as the full scan's sort
+    does per log2(n) nodes, so updates stay incremental only while fewer
+    than log2(n) / 2 nodes moved, and below ``MIN_INCREMENTAL_NODES`` the
+    full scan is cheap enough that every update uses it.
+    """
+    MIN_INCREMENTAL_NODES = 1024
+    
+    def __init__(self, threshold, k, reserve=None):
+        self.threshold = threshold
+        self.k = k
+        self.capacity = k + (k if reserve is None else reserve)
+        self.prices = None
+        self.buy = self.sell = np.empty(0, dtype=np.intp)
+        self.spread = np.empty(0)
+        self.complete = False  # kept pairs are every qualifying pair, not just the widest
+        self.rescans = 0
+    
+    def update(self, prices):
+        """Bring the kept pairs up to date with ``prices``; returns the top k as (buy_idx, sell_idx, spread)"""
+        prices = np.asarray(prices, dtype=float)
+        changed = np.flatnonzero(changed_mask(prices, self.prices))
+        n = len(prices)
+        if not changed.size:
+            pass
+        elif n < self.MIN_INCREMENTAL_NODES or changed.size > math.log2(n) / 2:
+            self._rescan(prices)
+        else:
+            self._update(prices, changed)
+        self.prices = prices.copy()
+        return self.buy[:self.k], self.sell[:self.k], self.spread[:self.k]
+    
+    def _rescan(self, prices):
+        self.rescans += 1
+        buy, sell, spread = top_pair_spreads(prices, self.threshold, self.capacity)
+        self.complete = len(spread) < self.capacity
+        self._store(buy, sell, spread)
+    
+    def _store(self, buy, sell, spread):
+        # Widest first; ties in a fixed (buy, sell) order so results do not depend on update history
+        order = np.lexsort((sell, buy, -spread))[:self.capacity]
+        self.buy, self.sell, self.spread = buy[order], sell[order], spread[order]
+    
+    def _update(self, prices, changed):
+        dirty = np.zeros(len(prices), dtype=bool)
+        dirty[changed] = True
+        keep = ~(dirty[self.buy] | dirty[self.sell])
+        floor = None if self.complete or not len(self.spread) else self.spread[-1]
+        
+        # Re-score every pair with a changed node on either leg, flattened into one score vector:
+        # [changed node buys from anyone][unchanged node buys from changed node]. Pairs inside the
+        # changed set are covered once, in the first block.
+        n, m = len(prices), len(changed)
+        others = np.flatnonzero(~dirty)
+        scores = np.concatenate([(prices[None, :] - prices[changed][:, None]).ravel(),
+                                 (prices[changed][:, None] - prices[others][None, :]).ravel()])
+        qualifying = scores > self.threshold
+        if floor is not None:
+            qualifying &= scores >= floor  # narrower pairs may rank below unseen unchanged pairs
+        candidates = np.flatnonzero(qualifying)
+        if len(candidates) > self.capacity:
+            self.complete = False
+            candidates = candidates[np.argpartition(-scores[candidates], self.capacity - 1)[:self.capacity]]
+        first = candidates[candidates < m * n]
+        second = candidates[candidates >= m * n] - m * n
+        width = max(len(others), 1)  # second is empty when every node changed
+        
+        buy = np.concatenate([self.buy[keep], changed[first // n], others[second % width]])
+        sell = np.concatenate([self.sell[keep], first % n, changed[second // width]])
+        spread = np.concatenate([self.spread[keep], scores[first], scores[second + m * n]])
+        if self.complete and len(spread) > self.capacity:
+            self.complete = False
+        if not self.complete and len(spread) < self.k:
+            self._rescan(prices)
+            return
+        self._store(buy, sell, spread)
+
+
+class MarketSnapshot:
+    """One market tick stored column-wise, every field an array indexed by zone/hub id"""
+
+    ELECTRICITY_FIELDS = ('rt_price', 'da_price', 'load_mw', 'heat_rate', 'spark_spread')
+    GAS_FIELDS = ('price', 'basis_to_hh', 'volume_mmcf', 'volatility')
+
+    def __init__(self, time, zones, hubs, electricity, natural_gas, henry_hub, avg_spark_spread, fuel_mix=None):
+        self.time = time
+        self.zones = zones
+        self.hubs = hubs
+        self.electricity = electricity
+        self.natural_gas = natural_gas
+        self.henry_hub = henry_hub
+        self.avg_spark_spread = avg_spark_spread
+        self.fuel_mix = fuel_mix  # {fuel category: MW}, when ingested from NYISO files
+
+    def to_dict(self):
+        """Build the nested per-zone/per-hub shape served by the API"""
+        data = {
+            'timestamp': self.time.isoformat(),
+            'electricity': _columns_to_records(self.zones, self.electricity, self.ELECTRICITY_FIELDS),
+            'natural_gas': _columns_to_records(self.hubs, self.natural_gas, self.GAS_FIELDS),
+            'henry_hub': self.henry_hub,
+            'avg_spark_spread': self.avg_spark_spread
+        }
+        if self.fuel_mix is not None:
+            data['fuel_mix'] = self.fuel_mix
+        return data
+    
+    @classmethod
+    def from_record(cls, record, zones, hubs):
+        """Rebuild a snapshot from a tick store record"""
+        return cls(
+            time=datetime.fromtimestamp(float(record['timestamp'])),
+            zones=zones,
+            hubs=hubs,
+            electricity={field: np.array(record[field]) for field in cls.ELECTRICITY_FIELDS},
+            natural_gas={field: np.array(record[field]) for field in cls.GAS_FIELDS},
+            henry_hub=float(record['henry_hub']),
+            avg_spark_spread=float(record['avg_spark_spread'])
+        )
+
+
+class PriceHistory:
+    """Fixed-capacity ring buffer of per-tick prices, one preallocated array per field.
+    
+    Rows are indexed by tick and columns by zone/hub id. Timestamps are kept
+    non-decreasing, so the live part of the buffer is at most two sorted runs
+    and a time range is located by binary search on each run.
+    
+    All arrays, including the ring position, live in one flat buffer that may
+    be shared memory. There is a single writer (the tick thread); readers take
+    no lock and instead retry if the sequence counter moved while they copied.
+    """
+    
+    ELECTRICITY_FIELDS = ('rt_price', 'da_price', 'load_mw', 'spark_spread')
+    GAS_FIELDS = ('price', 'basis_to_hh')
+    _SEQ, _COUNT, _NEXT = range(3)
+    _STATE_SLOTS = 4
+    
+    def __init__(self, zones, hubs, capacity, buffer=None):
+        self.capacity = capacity
+        if buffer is None:
+            buffer = bytearray(self.nbytes(zones, hubs, capacity))
+        offset = 0
+        
+        def take(shape, dtype=np.float64):
+            nonlocal offset
+            array = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+            offset += array.nbytes
+            return array
+        
+        self._state = take(self._STATE_SLOTS, np.int64)
+        self.timestamps = take(capacity)
+        self.columns = {}
+        for field in self.ELECTRICITY_FIELDS:
+            self.columns[field] = take((capacity, len(zones)))
+        for field in self.GAS_FIELDS:
+            self.columns[field] = take((capacity, len(hubs)))
+        self.series_index = {}
+        for idx, zone in enumerate(zones):
+            for field in self.ELECTRICITY_FIELDS:
+                self.series_index[f'{zone}:{field}'] = (field, idx)
+        for idx, hub in enumerate(hubs):
+            for field in self.GAS_FIELDS:
+                self.series_index[f'{hub}:{field}'] = (field, idx)
+    
+    @classmethod
+    def nbytes(cls, zones, hubs, capacity):
+        """Size of the flat buffer backing a history of this shape"""
+        row = 1 + len(cls.ELECTRICITY_FIELDS) * len(zones) + len(cls.GAS_FIELDS) * len(hubs)
+        return 8 * (cls._STATE_SLOTS + capacity * row)
+    
+    @property
+    def count(self):
+        return int(self._state[self._COUNT])
+    
+    @property
+    def _next(self):
+        return int(self._state[self._NEXT])
+    
+    def append(self, snapshot):
+        """Copy one snapshot into the next slot, overwriting the oldest when full"""
+        ts = snapshot.time.timestamp()
+        if self.count:
+            ts = max(ts, self.timestamps[self._next - 1])
+        row = self._next
+        self._state[self._SEQ] += 1
+        self.timestamps[row] = ts
+        for field in self.ELECTRICITY_FIELDS:
+            self.columns[field][row] = snapshot.electricity[field]
+        for field in self.GAS_FIELDS:
+            self.columns[field][row] = snapshot.natural_gas[field]
+        self._state[self._NEXT] = (row + 1) % self.capacity
+        self._state[self._COUNT] = min(self.count + 1, self.capacity)
+        self._state[self._SEQ] += 1
+    
+    def extend(self, timestamps, columns):
+        """Bulk-append rows, oldest first, e.g. when warming up from the tick store"""
+        timestamps = np.asarray(timestamps, dtype=float)[-self.capacity:]
+        n = len(timestamps)
+        if n == 0:
+            return
+        floor = self.timestamps[self._next - 1] if self.count else -np.inf
+        rows = (self._next + np.arange(n)) % self.capacity
+        self._state[self._SEQ] += 1
+        self.timestamps[rows] = np.maximum.accumulate(np.maximum(timestamps, floor))
+        for field, column in self.columns.items():
+            column[rows] = columns[field][-n:]
+        self._state[self._NEXT] = (self._next + n) % self.capacity
+        self._state[self._COUNT] = min(self.count + n, self.capacity)
+        self._state[self._SEQ] += 1
+    
+    def _runs(self):
+        """Physical (lo, hi) slices of the live rows, oldest first"""
+        count, head = self.count, self._next
+        if count < self.capacity:
+            return [(0, count)]
+        return [(head, self.capacity), (0, head)]
+    
+    def _locate(self, start, end):
+        """Physical slices holding the rows within [start, end], oldest first"""
+        slices = []
+        for lo, hi in self._runs():
+            run = self.timestamps[lo:hi]
+            a = lo + int(np.searchsorted(run, start, side='left'))
+            b = lo + int(np.searchsorted(run, end, side='right'))
+            if a < b:
+                slices.append(slice(a, b))
+        return slices
+    
+    def oldest(self):
+        """Time of the oldest tick held, or None when empty"""
+        if not self.count:
+            return None
+        return float(self.timestamps[self._runs()[0][0]])
+    
+    def count_between(self, start=None, end=None):
+        """Number of ticks within [start, end]"""
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+        return sum(s.stop - s.start for s in self._locate(start, end))
+    
+    def _read(self, start, end, read_columns):
+        """Copy timestamps plus whatever read_columns(slices) returns, retrying if a write raced the copy"""
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+        for _ in read_attempts('Price history'):
+            seq = int(self._state[self._SEQ])
+            if seq & 1:
+                continue  # a write is in progress
+            slices = self._locate(start, end)
+            timestamps = np.concatenate([self.timestamps[s] for s in slices]) if slices else np.empty(0)
+            columns = read_columns(slices)
+            if int(self._state[self._SEQ]) == seq:
+                return timestamps, columns
+    
+    def query(self, series, start=None, end=None):
+        """Return timestamps and values for each series within [start, end] (epoch seconds)"""
+        unknown = [name for name in series if name not in self.series_index]
+        if unknown:
+            raise KeyError(', '.join(unknown))
+        
+        def read_columns(slices):
+            values = {}
+            for name in series:
+                field, idx = self.series_index[name]
+                column = self.columns[field]
+                values[name] = np.concatenate([column[s, idx] for s in slices]) if slices else np.empty(0)
+            return values
+        
+        return self._read(start, end, read_columns)
+    
+    def export(self, fields, start=None, end=None):
+        """Copy whole (ticks x nodes) field arrays in time order, e.g. for model training"""
+        def read_columns(slices):
+            return {field: np.concatenate([self.columns[field][s] for s in slices])
+                    if slices else np.empty((0, self.columns[field].shape[1])) for field in fields}
         
-        # Initialize with default data
-        self.market_data = self.generate_initial_data()
-        self.predictions = {}
-        self.alerts = []
-        self.trading_signals = []
+        return self._read(start, end, read_columns)
+
+
+class RollupPyramid:
+    """OHLC and mean rollups of every history series at 1 minute, 5 minutes, 1 hour and 1 day.
+    
+    Each resolution is a ring of buckets aligned to local time (so daily bars
+    run midnight to midnight). A tick is folded into the open bucket of each
+    resolution, or starts a new one, at a fixed cost per series whatever the
+    bucket's length. NaN values (backfilled ticks have no gas prices) are
+    skipped, and a bucket's mean is its sum over its count of real values.
+    
+    The layout and concurrency rules are those of PriceHistory: one flat,
+    optionally shared buffer, a single writer, and readers that retry when
+    the sequence counter moves under them.
+    """
+    
+    RESOLUTIONS = {'1m': 60, '5m': 300, '1h': 3600, '1d': 86400}
+    # Buckets kept per resolution: a week of minutes, four weeks of 5 minutes, 90 days of hours, two years of days
+    CAPACITIES = {60: 10080, 300: 8064, 3600: 2160, 86400: 730}
+    STATS = ('open', 'high', 'low', 'close', 'sum', 'count')
+    OPEN, HIGH, LOW, CLOSE, SUM, COUNT = range(6)
+    
+    def __init__(self, zones, hubs, capacities=None, buffer=None):
+        self.capacities = dict(capacities or self.CAPACITIES)
+        nodes = [(field, zones) for field in PriceHistory.ELECTRICITY_FIELDS]
+        nodes += [(field, hubs) for field in PriceHistory.GAS_FIELDS]
+        self.fields = [field for field, _ in nodes]
+        self.series_index = {}  # same names as PriceHistory's, in column order
+        for field, names in nodes:
+            for name in names:
+                self.series_index[f'{name}:{field}'] = len(self.series_index)
+        n_series = len(self.series_index)
+        if buffer is None:
+            buffer = bytearray(self.nbytes(zones, hubs, self.capacities))
+        offset = 0
+        
+        def take(shape, dtype=np.float64):
+            nonlocal offset
+            array = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+            offset += array.nbytes
+            return array
+        
+        # Sequence counter, then each level's next slot and bucket count
+        self._state = take(1 + 2 * len(self.capacities), np.int64)
+        self._first = take(1)  # time of the first tick folded in, once there is one
+        self.levels = {}  # resolution -> (bucket start times, (stat x bucket x series) values)
+        for resolution, capacity in sorted(self.capacities.items()):
+            self.levels[resolution] = (take(capacity), take((len(self.STATS), capacity, n_series)))
+    
+    @classmethod
+    def nbytes(cls, zones, hubs, capacities=None):
+        n_series = len(PriceHistory.ELECTRICITY_FIELDS) * len(zones) + len(PriceHistory.GAS_FIELDS) * len(hubs)
+        capacities = capacities or cls.CAPACITIES
+        buckets = sum(capacities.values())
+        return 8 * (1 + 2 * len(capacities) + 1 + buckets * (1 + len(cls.STATS) * n_series))
+    
+    def _slot(self, resolution):
+        return 1 + 2 * sorted(self.levels).index(resolution)
+    
+    def count(self, resolution):
+        return int(self._state[self._slot(resolution) + 1])
+    
+    def first_time(self):
+        """Time of the oldest tick folded in, or None before the first"""
+        return float(self._first[0]) if self.count(min(self.levels)) else None
+    
+    def row(self, snapshot):
+        """One snapshot's values in series order"""
+        return np.concatenate([snapshot.electricity[field] for field in PriceHistory.ELECTRICITY_FIELDS]
+                              + [snapshot.natural_gas[field] for field in PriceHistory.GAS_FIELDS]).astype(float)
+    
+    def append(self, snapshot):
+        """Fold one tick into every resolution"""
+        values = self.row(snapshot)[None, :]
+        valid = ~np.isnan(values)
+        stats = (values, values, values, values, np.where(valid, values, 0.0), valid.astype(float))
+        self._fold(np.array([snapshot.time.timestamp()]), lambda starts: (starts, stats))
+    
+    def extend(self, timestamps, columns):
+        """Fold many ticks at once, oldest first, e.g. when warming up from the tick store"""
+        timestamps = np.maximum.accumulate(np.asarray(timestamps, dtype=float))
+        if len(timestamps) == 0:
+            return
+        values = np.concatenate([np.asarray(columns[field], dtype=float).reshape(len(timestamps), -1)
+                                 for field in self.fields], axis=1)
+        self._fold(timestamps, lambda starts: self._aggregate(starts, values))
+    
+    def _fold(self, timestamps, aggregate):
+        """Fold ticks into every level; aggregate(bucket starts) gives the stats per bucket"""
+        offsets = _utc_offsets(timestamps)
+        self._state[0] += 1
+        if not self.count(min(self.levels)):
+            self._first[0] = timestamps[0]
+        for resolution in self.levels:
+            self._merge(resolution, *aggregate(timestamps - (timestamps + offsets) % resolution))
+        self._state[0] += 1
+    
+    @staticmethod
+    def _aggregate(starts, values):
+        """Per-bucket stats of sorted ticks: (bucket starts, (open, high, low, close, sum, count))"""
+        n = len(starts)
+        bounds = np.flatnonzero(np.r_[True, np.diff(starts) > 0])
+        valid = ~np.isnan(values)
+        positions = np.arange(n)[:, None]
+        first = np.minimum.reduceat(np.where(valid, positions, n), bounds)
+        last = np.maximum.reduceat(np.where(valid, positions, -1), bounds)
+        columns = np.arange(values.shape[1])
+        open_ = np.where(first < n, values[np.minimum(first, n - 1), columns], np.nan)
+        close = np.where(last >= 0, values[np.maximum(last, 0), columns], np.nan)
+        with np.errstate(invalid='ignore'):
+            stats = (open_, np.fmax.reduceat(values, bounds), np.fmin.reduceat(values, bounds), close,
+                     np.add.reduceat(np.where(valid, values, 0.0), bounds),
+                     np.add.reduceat(valid.astype(float), bounds))
+        return starts[bounds], stats
+    
+    def _merge(self, resolution, starts, stats):
+        """Fold per-bucket stats into a level: into its open bucket, then as new buckets"""
+        bucket_starts, buckets = self.levels[resolution]
+        capacity = len(bucket_starts)
+        slot = self._slot(resolution)
+        head, count = int(self._state[slot]), int(self._state[slot + 1])
+        if count:
+            current = (head - 1) % capacity
+            # A clock that steps back folds into the open bucket rather than reopening an old one
+            starts = np.maximum(starts, bucket_starts[current])
+            merged = int(np.searchsorted(starts, bucket_starts[current], side='right'))
+            bucket = buckets[:, current]
+            for i in range(merged):
+                o, h, l, c, total, n = (stat[i] for stat in stats)
+                bucket[self.OPEN] = np.where(np.isnan(bucket[self.OPEN]), o, bucket[self.OPEN])
+                bucket[self.HIGH] = np.fmax(bucket[self.HIGH], h)
+                bucket[self.LOW] = np.fmin(bucket[self.LOW], l)
+                bucket[self.CLOSE] = np.where(np.isnan(c), bucket[self.CLOSE], c)
+                bucket[self.SUM] += total
+                bucket[self.COUNT] += n
+            starts, stats = starts[merged:], tuple(stat[merged:] for stat in stats)
+        n_new = len(starts)
+        if n_new == 0:
+            return
+        # More new buckets than the ring holds: only the newest survive
+        rows = ((head + np.arange(n_new)) % capacity)[-capacity:]
+        starts, stats = starts[-capacity:], tuple(stat[-capacity:] for stat in stats)
+        bucket_starts[rows] = starts
+        for k, stat in enumerate(stats):
+            buckets[k, rows] = stat
+        self._state[slot] = (head + n_new) % capacity
+        self._state[slot + 1] = min(count + n_new, capacity)
+    
+    def _runs(self, resolution):
+        capacity = len(self.levels[resolution][0])
+        slot = self._slot(resolution)
+        head, count = int(self._state[slot]), int(self._state[slot + 1])
+        if count < capacity:
+            return [(0, count)]
+        return [(head, capacity), (0, head)]
+    
+    def covers_from(self, resolution):
+        """Earliest time this level still has every tick from"""
+        if self.count(resolution) < len(self.levels[resolution][0]):
+            return self.first_time()
+        lo, _ = self._runs(resolution)[0]
+        return float(self.levels[resolution][0][lo])
+    
+    def _locate(self, resolution, start, end):
+        """Physical slices of the buckets overlapping [start, end], oldest first"""
+        starts = self.levels[resolution][0]
+        slices = []
+        for lo, hi in self._runs(resolution):
+            run = starts[lo:hi]
+            a = lo + int(np.searchsorted(run, start - resolution, side='right'))
+            b = lo + int(np.searchsorted(run, end, side='right'))
+            if a < b:
+                slices.append(slice(a, b))
+        return slices
+    
+    def bucket_count(self, resolution, start=None, end=None):
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+        return sum(s.stop - s.start for s in self._locate(resolution, start, end))
+    
+    def query(self, resolution, series, start=None, end=None):
+        """Bucket start times and {series: {stat: values}} (open, high, low, close, mean) within [start, end]"""
+        unknown = [name for name in series if name not in self.series_index]
+        if unknown:
+            raise KeyError(', '.join(unknown))
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+        starts, buckets = self.levels[resolution]
+        columns = [self.series_index[name] for name in series]
+        for _ in read_attempts('Rollups'):
+            seq = int(self._state[0])
+            if seq & 1:
+                continue  # a write is in progress
+            slices = self._locate(resolution, start, end)
+            timestamps = np.concatenate([starts[s] for s in slices]) if slices else np.empty(0)
+            stats = (np.concatenate([buckets[:, s][:, :, columns] for s in slices], axis=1) if slices
+                     else np.empty((len(self.STATS), 0, len(columns))))
+            if int(self._state[0]) == seq:
+                break
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = stats[self.SUM] / stats[self.COUNT]
+        values = {}
+        for i, name in enumerate(series):
+            values[name] = {'open': stats[self.OPEN, :, i], 'high': stats[self.HIGH, :, i],
+                            'low': stats[self.LOW, :, i], 'close': stats[self.CLOSE, :, i], 'mean': mean[:, i]}
+        return timestamps, values
+
+
+def _utc_offsets(timestamps):
+    """Local UTC offset at each time, in seconds; offsets only change on the hour, so look up each hour once"""
+    if len(timestamps) == 1:
+        return time.localtime(timestamps[0]).tm_gmtoff
+    hours, inverse = np.unique(np.floor(timestamps / 3600), return_inverse=True)
+    return np.array([time.localtime(hour * 3600).tm_gmtoff for hour in hours], dtype=float)[inverse]
+
+
+def select_resolution(history, rollups, start=None, end=None, max_points=None):
+    """The finest resolution, in seconds (0 for raw ticks), that covers [start, end] in at most ``max_points``.
+    
+    A resolution whose ring no longer reaches back to the start of the range
+    is passed over. If no resolution fits the budget, the coarsest is used.
+    """
+    covers = {0: history.oldest()}
+    covers.update((resolution, rollups.covers_from(resolution)) for resolution in rollups.levels)
+    known = [value for value in covers.values() if value is not None]
+    if not known:
+        return 0
+    since = max(start if start is not None else -np.inf, min(known))
+    candidates = [resolution for resolution, oldest in sorted(covers.items())
+                  if oldest is not None and oldest <= since] or [max(rollups.levels)]
+    for resolution in candidates:
+        points = history.count_between(start, end) if resolution == 0 else \
+            rollups.bucket_count(resolution, start, end)
+        if max_points is None or points <= max_points:
+            return resolution
+    return candidates[-1]
+
+
+class OnlineForecaster:
+    """Hour-of-day seasonal EWMA forecaster over many series at once.
+    
+    Each update is a handful of vectorized array operations, O(1) per series:
+    
+      level    L += alpha * (x - S[h] - L)
+      season   S[h] += gamma * (x - L - S[h])      for the observation's hour h
+      variance V = (1 - beta) * V + beta * e^2     e = one-step forecast error
+    
+    A forecast H hours ahead is L + S[hour + H]. Its interval uses the usual
+    exponential-smoothing variance V * (1 + (k - 1) * alpha^2) for k ticks
+    ahead, capped by the series' own dispersion around a slow-moving mean so
+    mean-reverting prices do not get ever-widening bands. The width is then
+    scaled per series by a factor adapted online (adaptive conformal style) so
+    the one-step intervals hit the target coverage; ``coverage`` reports the
+    recent hit rate of those intervals.
+    """
+    
+    Z_90 = 1.645
+    
+    def __init__(self, n_series, alpha=0.1, gamma=0.05, beta=0.05, target=0.9, eta=0.02):
+        self.alpha, self.gamma, self.beta = alpha, gamma, beta
+        self.target, self.eta = target, eta
+        self.level = np.zeros(n_series)
+        self.anchor = np.zeros(n_series)
+        self.dispersion = np.zeros(n_series)
+        self.season = np.zeros((n_series, 24))
+        self.variance = np.zeros(n_series)
+        self.scale = np.ones(n_series)
+        self.coverage = np.full(n_series, target)
+        self.seen = np.zeros(n_series, dtype=bool)  # series observed at least once
+        self.tick_seconds = 30.0
+        self.last_timestamp = None
+    
+    def update(self, values, timestamp):
+        """Fold one observation per series into the model; repeated timestamps and NaN values are ignored"""
+        missing = np.isnan(values)
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            # Except that a repeat can still start series never observed before
+            self._start(values, self.season[:, datetime.fromtimestamp(timestamp).hour], ~self.seen & ~missing)
+            return
+        if missing.any():
+            # Update as usual, then put back the state of the series that were not observed
+            state = (self.level, self.anchor, self.dispersion, self.season, self.variance, self.scale, self.coverage,
+                     self.seen)
+            saved = [array[missing].copy() for array in state]
+            self.update(np.where(missing, self.level + self.season[:, datetime.fromtimestamp(timestamp).hour], values),
+                        timestamp)
+            for array, kept in zip(state, saved):
+                array[missing] = kept
+            return
+        hour = datetime.fromtimestamp(timestamp).hour
+        seasonal = self.season[:, hour]
+        self._start(values, seasonal, ~self.seen)
+        if self.last_timestamp is not None:
+            error = values - (self.level + seasonal)
+            half_width = self.scale * self.Z_90 * np.sqrt(self.variance)
+            miss = (np.abs(error) > half_width).astype(float)
+            self.scale *= np.exp(self.eta * (miss - (1 - self.target)))
+            self.coverage += 0.02 * ((1 - miss) - self.coverage)
+            self.variance += self.beta * (error ** 2 - self.variance)
+            self.tick_seconds += 0.05 * ((timestamp - self.last_timestamp) - self.tick_seconds)
+            self.level += self.alpha * (values - seasonal - self.level)
+            self.anchor += 0.002 * (values - seasonal - self.anchor)
+            self.dispersion += 0.002 * ((values - seasonal - self.anchor) ** 2 - self.dispersion)
+        self.season[:, hour] += self.gamma * (values - self.level - seasonal)
+        self.last_timestamp = timestamp
+    
+    def _start(self, values, seasonal, fresh):
+        """A series' first observation sets its level and a starting variance"""
+        if fresh.any():
+            self.level[fresh] = (values - seasonal)[fresh]
+            self.anchor[fresh] = self.level[fresh]
+            self.variance[fresh] = (0.05 * values[fresh]) ** 2 + 1e-12
+            self.dispersion[fresh] = self.variance[fresh]
+            self.seen[fresh] = True
+    
+    def forecast(self, horizon_hours, timestamp):
+        """Point forecast and 90% interval bounds for every series"""
+        hour = (datetime.fromtimestamp(timestamp).hour + horizon_hours) % 24
+        point = self.level + self.season[:, hour]
+        steps = max(horizon_hours * 3600 / max(self.tick_seconds, 1e-9), 1)
+        variance = np.minimum(self.variance * (1 + (steps - 1) * self.alpha ** 2),
+                              np.maximum(self.dispersion, self.variance))
+        half_width = self.scale * self.Z_90 * np.sqrt(variance)
+        return point, point - half_width, point + half_width
+
+
+class TickBroadcaster:
+    """Fans one pre-serialized Server-Sent Event out to every stream subscriber.
+    
+    Each subscriber owns a small bounded queue. When a slow client falls behind,
+    its oldest queued tick is dropped so it always catches up to the latest one.
+    """
+    
+    def __init__(self, queue_size=2):
+        self.queue_size = queue_size
+        self.latest = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def message(event_id, body):
+        """One tick as a Server-Sent Event"""
+        return f'id: {event_id}\nevent: tick\ndata: '.encode() + body + b'\n\n'
+    
+    def publish(self, event_id, body):
+        message = self.message(event_id, body)
+        self.latest = message
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            while True:
+                try:
+                    q.put_nowait(message)
+                    break
+                except queue.Full:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        pass
+    
+    def subscribe(self):
+        q = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+    
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+    
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+
+class SerializedPayload:
+    """A response body serialized once, with its gzip variant and strong ETag"""
+    
+    def __init__(self, body, gzip_body, etag):
+        self.body = body
+        self.gzip_body = gzip_body
+        self.etag = etag
+    
+    # Past this size, level 6 takes several times as long as level 1 for about 10% less output
+    FAST_GZIP_BYTES = 256 * 1024
+    
+    @classmethod
+    def build(cls, data, version):
+        body = json.dumps(data, sort_keys=True, separators=(',', ':')).encode()
+        level = 1 if len(body) > cls.FAST_GZIP_BYTES else 6
+        return cls(body, gzip.compress(body, compresslevel=level, mtime=0),
+                   f'v{version}-{hashlib.sha1(body).hexdigest()[:16]}')
+
+
+class EngineSnapshot:
+    """Everything the engine produced for one tick, published with one reference swap.
+    
+    Snapshots are never modified after publication. Each API payload is
+    serialized at most once per snapshot and memoized on it; payloads built
+    from the market data alone carry over to later snapshots until it changes.
+    """
+    
+    PAYLOADS = {
+        'market-data': lambda s: s.market_data.to_dict(),
+        'predictions': lambda s: s.predictions,
+        'trading-signals': lambda s: s.trading_signals,
+        'alerts': lambda s: s.alerts,
+        'spark-matrix': lambda s: s.fuel.to_dict(s.market_data),
+        'snapshot': lambda s: s.to_dict()
+    }
+    MARKET_PAYLOADS = ('market-data', 'spark-matrix')
+    
+    def __init__(self, version, market_data, predictions, trading_signals, alerts, fuel):
+        self.version = version
+        self.market_data = market_data
+        self.predictions = predictions
+        self.trading_signals = trading_signals
+        self.alerts = alerts
+        self.fuel = fuel
+        self.timestamp = market_data.time.timestamp()
+        self._payloads = {}
+    
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'market_data': self.market_data.to_dict(),
+            'predictions': self.predictions,
+            'trading_signals': self.trading_signals,
+            'alerts': self.alerts
+        }
+    
+    def payload(self, name):
+        """Serialized body for one API product; concurrent first calls may both build it, harmlessly"""
+        payload = self._payloads.get(name)
+        if payload is None:
+            payload = self._payloads.setdefault(name, SerializedPayload.build(self.PAYLOADS[name](self), self.version))
+        return payload
+    
+    def inherit(self, previous):
+        """Take over ``previous``'s market payloads if both snapshots hold the same market data"""
+        if previous is None or previous.market_data is not self.market_data:
+            return
+        for name in self.MARKET_PAYLOADS:
+            if name in previous._payloads:
+                self._payloads.setdefault(name, previous._payloads[name])
+
+
+class EnergyIntelligenceEngine:
+    DEFAULT_ZONES = ['NYC', 'WEST', 'CAPITAL', 'NORTH', 'CENTRAL']
+    DEFAULT_HUBS = ['Transco Z6 NY', 'Algonquin Citygate', 'Tennessee Z4', 'Iroquois Waddington', 'Dominion South']
+    SPARK_BUY_THRESHOLD = 15
+    SPARK_SELL_THRESHOLD = 5
+    GAS_ARBITRAGE_THRESHOLD = 0.30
+    POWER_ARBITRAGE_THRESHOLD = 8
+    SIGNAL_TOP_K = 8
+    SIGNAL_QUOTAS = {'spark_spread_trade': 8, 'gas_arbitrage': 8, 'power_arbitrage': 8}
+    # Delivering hub per zone and VOM adders in $/MWh. SPARK_ZONE_HUBS, a JSON object, replaces the built-in
+    # mapping; the built-in one only applies to zones whose hub is among the configured hubs.
+    ZONE_HUBS = json.loads(os.environ.get('SPARK_ZONE_HUBS', 'null'))
+    DEFAULT_ZONE_HUBS = {
+        'NYC': 'Transco Z6 NY',
+        'WEST': 'Dominion South',
+        'CAPITAL': 'Iroquois Waddington',
+        'NORTH': 'Iroquois Waddington',
+        'CENTRAL': 'Tennessee Z4'
+    }
+    VOM_ADDERS = json.loads(os.environ.get('SPARK_VOM_ADDERS', '{}'))
+    DEFAULT_VOM = float(os.environ.get('SPARK_VOM_DEFAULT', 0))
+    HISTORY_CAPACITY = int(os.environ.get('HISTORY_CAPACITY', 120960))  # one week of 5 s price ticks
+    FORECAST_HORIZONS = (1, 4, 24)
+    # On warm start the forecaster is seeded from this much of the newest stored history, one seasonal cycle
+    FORECAST_SEED_SECONDS = float(os.environ.get('FORECAST_SEED_SECONDS', 86400))
+    MODEL_RETRAIN_SECONDS = int(os.environ.get('MODEL_RETRAIN_SECONDS', 3600))
+    MODEL_MIN_SAMPLES = int(os.environ.get('MODEL_MIN_SAMPLES', 240))
+    MODEL_HORIZON_HOURS = int(os.environ.get('MODEL_HORIZON_HOURS', 1))
+    TICK_STORE_DIR = os.environ.get('TICK_STORE_DIR')
+    NYISO_DROP_DIR = os.environ.get('NYISO_DROP_DIR')  # unset: prices are simulated
+    # Base of NYISO's CSV tree (http://mis.nyiso.com/public/csv); set, its files are fetched into the drop dir
+    NYISO_FEED_URL = os.environ.get('NYISO_FEED_URL')
+    FEED_TIMEOUT_SECONDS = float(os.environ.get('FEED_TIMEOUT_SECONDS', 10))
+    FEED_DEADLINE_SECONDS = float(os.environ.get('FEED_DEADLINE_SECONDS', 1))
+    ALERT_RULES_PATH = os.environ.get('ALERT_RULES_PATH')  # unset: rules live in memory
+    # Each stage runs on its own cadence; predictions, signals and alerts only rerun on new prices
+    STAGE_INTERVALS = {
+        'market_data': float(os.environ.get('PRICE_INTERVAL_SECONDS', 5)),
+        'predictions': float(os.environ.get('PREDICTION_INTERVAL_SECONDS', 60)),
+        'trading_signals': float(os.environ.get('SIGNAL_INTERVAL_SECONDS', 15)),
+        'alerts': float(os.environ.get('ALERT_INTERVAL_SECONDS', 5))
+    }
+    OVERRUN_POLICY = os.environ.get('STAGE_OVERRUN_POLICY', scheduler.SKIP)
+    
+    def __init__(self, electricity_zones=None, gas_hubs=None, signal_top_k=None, signal_quotas=None,
+                 history_capacity=None, tick_store_dir=None, history=None, start=True, train_models=None,
+                 seed=None, clock=None, stage_intervals=None, overrun_policy=None, alert_rules_path=None,
+                 alert_history=None, zone_hubs=None, vom_adders=None, ingest_dir=None, feed_url=None,
+                 rollups=None, rollup_capacities=None):
+        self.electricity_zones = electricity_zones or list(self.DEFAULT_ZONES)
+        self.gas_hubs = gas_hubs or list(self.DEFAULT_HUBS)
+        self.rng = np.random.default_rng(seed)
+        self.clock = clock or datetime.now
+        self.signal_top_k = self.SIGNAL_TOP_K if signal_top_k is None else signal_top_k
+        self.signal_quotas = dict(self.SIGNAL_QUOTAS, **(signal_quotas or {}))
+        if zone_hubs is None:
+            zone_hubs = self.ZONE_HUBS
+        if zone_hubs is None:
+            # Zones whose built-in hub is not configured fall back to the hub average
+            zone_hubs = {zone: hub for zone, hub in self.DEFAULT_ZONE_HUBS.items() if hub in self.gas_hubs}
+        self.fuel = FuelMapping(self.electricity_zones, self.gas_hubs, zone_hubs,
+                                dict(self.VOM_ADDERS, **(vom_adders or {})), self.DEFAULT_VOM)
+        # Incremental state, each diffed against what its own stage saw last time
+        self.gas_pairs = TopPairs(self.GAS_ARBITRAGE_THRESHOLD, self.signal_quotas.get('gas_arbitrage', 0))
+        self.power_pairs = TopPairs(self.POWER_ARBITRAGE_THRESHOLD, self.signal_quotas.get('power_arbitrage', 0))
+        rules_path = self.ALERT_RULES_PATH if alert_rules_path is None else alert_rules_path  # '' keeps them in memory
+        self.alert_rules = alert_rules.RuleStore(rules_path or None, alert_rules.default_rules(self.electricity_zones))
+        self.alert_series = alert_rules.series_names(self.electricity_zones, self.gas_hubs)
+        self.rule_index = None
+        self._rules_version = None
+        self.alert_book = alert_lifecycle.AlertBook(alert_history)
+        self.alert_acks = alert_lifecycle.AckLog(rules_path + '.acks' if rules_path else None)
+        self.history = history or PriceHistory(self.electricity_zones, self.gas_hubs,
+                                               history_capacity or self.HISTORY_CAPACITY)
+        self.rollups = rollups or RollupPyramid(self.electricity_zones, self.gas_hubs, rollup_capacities)
+        self.tick_store = None
+        self.update_thread = None
+        self.broadcaster = TickBroadcaster()
+        self.forecaster = OnlineForecaster(2 * len(self.electricity_zones) + len(self.gas_hubs))
+        self.trainer = None
+        if (start if train_models is None else train_models) and training.available():
+            self.trainer = training.ModelTrainer(self.MODEL_RETRAIN_SECONDS, self.MODEL_MIN_SAMPLES,
+                                                 self.MODEL_HORIZON_HOURS * 3600)
+        self.listeners = []  # called with each published EngineSnapshot
+        self.snapshot = None
+        drop_dir = self.NYISO_DROP_DIR if ingest_dir is None else ingest_dir  # '' simulates prices
+        self.ingestor = nyiso_ingest.NyisoIngestor(drop_dir, self.electricity_zones) if drop_dir else None
+        feed_url = self.NYISO_FEED_URL if feed_url is None else feed_url
+        feeds = feed_fetch.nyiso_feeds(feed_url) if feed_url else {}
+        self.fetcher = None
+        if feeds:
+            if self.ingestor is None:
+                raise ValueError('Fetching NYISO feeds needs a drop directory: set NYISO_DROP_DIR')
+            self.fetcher = feed_fetch.FeedFetcher(feeds, drop_dir, self.FEED_TIMEOUT_SECONDS, self.FEED_DEADLINE_SECONDS)
+        self.scheduler = self.build_scheduler(dict(self.STAGE_INTERVALS, **(stage_intervals or {})),
+                                              overrun_policy or self.OVERRUN_POLICY)
+        
+        # Initialize with default data, warm-starting from disk when a tick store is configured
+        market_data = None
+        store_dir = self.TICK_STORE_DIR if tick_store_dir is None else tick_store_dir  # '' disables it
+        if store_dir:
+            self.tick_store = TickStore(store_dir, self.electricity_zones, self.gas_hubs)
+            market_data = self.load_history()
+        if self.ingestor is not None and market_data is not None:
+            self.ingestor.last_time = market_data.time  # the store already has everything up to here
+        if self.fetcher is not None:
+            self.fetch_feeds(self.FEED_TIMEOUT_SECONDS)  # the first tick needs files, so wait for them
         
         # Generate initial predictions and signals
-        self.generate_predictions()
-        self.generate_trading_signals() 
-        self.generate_alerts()
+        self.tick(market_data)
         
         # Start real-time data generation
-        self.start_real_time_engine()
+        if start:
+            self.start_real_time_engine()
     
     def generate_initial_data(self):
-        """Generate initial market data immediately"""
-        current_time = datetime.now()
+        """Generate a columnar market snapshot with vectorized draws per field"""
+        current_time = self.clock()
+        rng = self.rng
+        n_zones = len(self.electricity_zones)
         
         # Generate electricity data
-        electricity_data = {}
-        for zone in self.electricity_zones:
-            base_price = 45 + random.uniform(-10, 25)
-            load_factor = self.get_hourly_pattern()
-            
-            electricity_data[zone] = {
-                'rt_price': round(base_price + random.uniform(-5, 15), 2),
-                'da_price': round(base_price * random.uniform(0.95, 1.05), 2),
-                'load_mw': round(2000 + load_factor * 1500 + random.uniform(-200, 300), 1),
-                'heat_rate': round(random.uniform(7500, 9500), 0),
-                'spark_spread': 0
-            }
-        
-        # Generate natural gas data
-        gas_data = {}
-        henry_hub_base = 3.50 + random.uniform(-0.50, 1.00)
-        
-        for hub in self.gas_hubs:
-            basis_diff = random.uniform(-0.30, 0.80)
-            gas_price = henry_hub_base + basis_diff
-            
-            gas_data[hub] = {
-                'price': round(gas_price, 3),
-                'basis_to_hh': round(basis_diff, 3),
-                'volume_mmcf': round(random.uniform(50, 300), 1),
-                'volatility': round(random.uniform(0.15, 0.35), 3)
-            }
-        
-        # Calculate spark spreads
-        avg_gas_price = sum(hub['price'] for hub in gas_data.values()) / len(gas_data)
-        for zone in electricity_data:
-            heat_rate = electricity_data[zone]['heat_rate']
-            gas_cost = (avg_gas_price * heat_rate) / 1000
-            electricity_data[zone]['spark_spread'] = round(
-                electricity_data[zone]['rt_price'] - gas_cost, 2
-            )
-        
-        return {
-            'timestamp': current_time.isoformat(),
-            'electricity': electricity_data,
-            'natural_gas': gas_data,
-            'henry_hub': round(henry_hub_base, 3),
-            'avg_spark_spread': round(sum(zone['spark_spread'] for zone in electricity_data.values()) / len(electricity_data), 2)
+        base_price = 45 + rng.uniform(-10, 25, n_zones)
+        load_factor = self.get_hourly_pattern(current_time)
+        electricity = {
+            'rt_price': np.round(base_price + rng.uniform(-5, 15, n_zones), 2),
+            'da_price': np.round(base_price * rng.uniform(0.95, 1.05, n_zones), 2),
+            'load_mw': np.round(2000 + load_factor * 1500 + rng.uniform(-200, 300, n_zones), 1),
+            'heat_rate': np.round(rng.uniform(7500, 9500, n_zones), 0)
         }
+        henry_hub, natural_gas = self._simulated_gas()
+        return self._market_snapshot(current_time, electricity, natural_gas, henry_hub,
+                                     self.scheduler['market_data'].value)
+    
+    def _simulated_gas(self):
+        """Draw a Henry Hub price and a price, basis, volume and volatility for every hub"""
+        rng = self.rng
+        n_hubs = len(self.gas_hubs)
+        henry_hub_base = 3.50 + rng.uniform(-0.50, 1.00)
+        basis_diff = rng.uniform(-0.30, 0.80, n_hubs)
+        natural_gas = {
+            'price': np.round(henry_hub_base + basis_diff, 3),
+            'basis_to_hh': np.round(basis_diff, 3),
+            'volume_mmcf': np.round(rng.uniform(50, 300, n_hubs), 1),
+            'volatility': np.round(rng.uniform(0.15, 0.35, n_hubs), 3)
+        }
+        return round(float(henry_hub_base), 3), natural_gas
+    
+    def _market_snapshot(self, current_time, electricity, natural_gas, henry_hub, previous, fuel_mix=None):
+        """Complete a snapshot from its electricity and gas prices by working out spark spreads"""
+        # Price each zone against its delivering hub, only for zones whose inputs moved since the last tick
+        zone_gas = self.fuel.zone_gas(natural_gas['price'])
+        if previous is not None:
+            previous = (previous.electricity['rt_price'], previous.electricity['heat_rate'],
+                        self.fuel.zone_gas(previous.natural_gas['price']), previous.electricity['spark_spread'])
+        electricity['spark_spread'] = spark_spreads(electricity['rt_price'], electricity['heat_rate'],
+                                                    zone_gas, self.fuel.vom, previous)
+        
+        return MarketSnapshot(
+            time=current_time,
+            zones=self.electricity_zones,
+            hubs=self.gas_hubs,
+            electricity=electricity,
+            natural_gas=natural_gas,
+            henry_hub=henry_hub,
+            avg_spark_spread=round(float(electricity['spark_spread'].mean()), 2),
+            fuel_mix=fuel_mix
+        )
     
     def generate_real_time_market_data(self):
-        """Generate updated market data"""
-        self.market_data = self.generate_initial_data()
-        return self.market_data
+        """Generate updated market data and record it in the price history"""
+        snapshot = self.generate_initial_data()
+        self.record(snapshot)
+        return snapshot
+    
+    def ingest_market_data(self):
+        """Build snapshots from the NYISO intervals that arrived since the last poll.
+        
+        Every new interval is recorded; the newest becomes the stage's value.
+        NYISO publishes no gas prices or heat rates, so those are still simulated.
+        """
+        if self.fetcher is not None:
+            self._timed('fetch', self.fetch_feeds)
+        snapshot = scheduler.UNCHANGED
+        previous = self.scheduler['market_data'].value
+        for interval in self.ingestor.poll():
+            snapshot = previous = self._nyiso_snapshot(interval['time'], interval, previous, interval['fuel_mix'])
+            self.record(snapshot)
+        return snapshot
+    
+    def fetch_feeds(self, deadline=None):
+        """Pull changed feed files into the drop directory, waiting at most ``deadline`` seconds"""
+        for result in self.fetcher.fetch(self.clock(), deadline):
+            FEED_FETCHES.inc(result.feed, result.outcome)
+            FEED_SECONDS.observe(result.seconds, result.feed)
+            if result.error is not None:
+                print(f"Error fetching {result.url}: {result.error}")
+    
+    def _nyiso_snapshot(self, when, prices, previous, fuel_mix=None):
+        """Snapshot from NYISO prices and load, with simulated heat rates and gas prices.
+        
+        The simulated inputs are drawn once per gas day and held between
+        intervals, so only zones whose NYISO prices moved get new spreads.
+        """
+        electricity = {field: np.array(prices[field], dtype=float) for field in ('rt_price', 'da_price', 'load_mw')}
+        if previous is not None and previous.time.date() == when.date():
+            electricity['heat_rate'] = previous.electricity['heat_rate']
+            henry_hub, natural_gas = previous.henry_hub, dict(previous.natural_gas)
+        else:
+            electricity['heat_rate'] = np.round(self.rng.uniform(7500, 9500, len(self.electricity_zones)), 0)
+            henry_hub, natural_gas = self._simulated_gas()
+        return self._market_snapshot(when, electricity, natural_gas, henry_hub, previous, fuel_mix)
+    
+    def record(self, snapshot):
+        """Add a snapshot to the price history, its rollups and the tick store"""
+        self.history.append(snapshot)
+        self.rollups.append(snapshot)
+        if self.tick_store is not None:
+            try:
+                self.tick_store.append(snapshot)
+            except (OSError, TickStoreError) as e:
+                print(f"Error persisting tick: {e}")
+    
+    def load_history(self):
+        """Map the newest ticks from the tick store into history; returns the last snapshot"""
+        slices = self.tick_store.tail(self.history.capacity)
+        if not slices:
+            return None
+        seed_from = slices[-1]['timestamp'][-1] - self.FORECAST_SEED_SECONDS
+        for records in slices:
+            self.history.extend(records['timestamp'], records)
+            self.rollups.extend(records['timestamp'], records)
+            for record in records[records['timestamp'] >= seed_from]:
+                self.forecaster.update(self._forecast_series(record, record), float(record['timestamp']))
+        print(f"Warm start: loaded {sum(len(s) for s in slices)} ticks from {self.tick_store.directory}")
+        snapshot = MarketSnapshot.from_record(slices[-1][-1], self.electricity_zones, self.gas_hubs)
+        if np.isnan(snapshot.natural_gas['price']).any():
+            # A backfilled tick has no gas prices or heat rates; fill them in as ingestion does
+            snapshot = self._nyiso_snapshot(snapshot.time, snapshot.electricity, None)
+        return snapshot
     
-    def get_hourly_pattern(self):
+    def get_hourly_pattern(self, when=None):
         """Get hourly load pattern (0-1 multiplier)"""
-        hour = datetime.now().hour
-        pattern = [0.7, 0.65, 0.6, 0.6, 0.65, 0.75, 0.85, 0.95, 1.0, 0.98, 0.95, 0.92,
-                  0.9, 0.88, 0.85, 0.88, 0.92, 0.98, 1.0, 0.95, 0.9, 0.85, 0.8, 0.75]
-        return pattern[hour]
-    
-    def generate_predictions(self):
-        """Generate price predictions"""
-        if not self.market_data:
+        return HOURLY_LOAD_PATTERN[(when or self.clock()).hour]
+    
+    @property
+    def market_data(self):
+        return self.snapshot.market_data if self.snapshot else None
+    
+    @property
+    def predictions(self):
+        return self.snapshot.predictions if self.snapshot else {}
+    
+    @property
+    def trading_signals(self):
+        return self.snapshot.trading_signals if self.snapshot else []
+    
+    @property
+    def alerts(self):
+        return self.snapshot.alerts if self.snapshot else []
+    
+    def generate_predictions(self, market_data=None):
+        """Update the online forecaster with this tick and forecast every zone and hub"""
+        market_data = self.market_data if market_data is None else market_data
+        if market_data is None:
             return {}
         
-        predictions = {
-            'electricity': {},
-            'natural_gas': {},
-            'spark_spreads': {}
+        timestamp = market_data.time.timestamp()
+        self.forecaster.update(self._forecast_series(market_data.electricity, market_data.natural_gas), timestamp)
+        n_zones = len(self.electricity_zones)
+        n_hubs = len(self.gas_hubs)
+        groups = {
+            'electricity': (slice(0, n_zones), 'price', 2),
+            'natural_gas': (slice(n_zones, n_zones + n_hubs), 'price', 3),
+            'spark_spreads': (slice(n_zones + n_hubs, None), 'spread', 2)
         }
+        columns = {group: {} for group in groups}
+        for horizon in self.FORECAST_HORIZONS:
+            point, lower, upper = self.forecaster.forecast(horizon, timestamp)
+            for group, (part, prefix, digits) in groups.items():
+                columns[group][f'{prefix}_{horizon}h'] = np.round(point[part], digits)
+                columns[group][f'{prefix}_{horizon}h_interval'] = np.round(
+                    np.stack([lower[part], upper[part]], axis=1), digits)
+        for group in ('electricity', 'natural_gas'):
+            columns[group]['confidence'] = np.round(self.forecaster.coverage[groups[group][0]], 3)
         
-        # Electricity predictions
-        for zone, data in self.market_data['electricity'].items():
-            current_price = data['rt_price']
-            volatility = 0.15
-            
-            predictions['electricity'][zone] = {
-                'price_1h': round(current_price * (1 + random.uniform(-volatility, volatility)), 2),
-                'price_4h': round(current_price * (1 + random.uniform(-volatility*1.5, volatility*1.5)), 2),
-                'price_24h': round(current_price * (1 + random.uniform(-volatility*2, volatility*2)), 2),
-                'confidence': round(random.uniform(0.75, 0.95), 3)
-            }
-        
-        # Natural gas predictions
-        for hub, data in self.market_data['natural_gas'].items():
-            current_price = data['price']
-            volatility = data['volatility']
-            
-            predictions['natural_gas'][hub] = {
-                'price_1h': round(current_price * (1 + random.uniform(-volatility, volatility)), 3),
-                'price_4h': round(current_price * (1 + random.uniform(-volatility*1.2, volatility*1.2)), 3),
-                'price_24h': round(current_price * (1 + random.uniform(-volatility*1.8, volatility*1.8)), 3),
-                'confidence': round(random.uniform(0.70, 0.90), 3)
-            }
+        predictions = {
+            'electricity': _columns_to_records(self.electricity_zones, columns['electricity'], tuple(columns['electricity'])),
+            'natural_gas': _columns_to_records(self.gas_hubs, columns['natural_gas'], tuple(columns['natural_gas'])),
+            'spark_spreads': _columns_to_records(self.electricity_zones, columns['spark_spreads'], tuple(columns['spark_spreads']))
+        }
         
-        # Spark spread predictions
-        for zone in self.electricity_zones:
-            current_spread = self.market_data['electricity'][zone]['spark_spread']
-            predictions['spark_spreads'][zone] = {
-                'spread_1h': round(current_spread + random.uniform(-3, 3), 2),
-                'spread_4h': round(current_spread + random.uniform(-5, 5), 2),
-                'spread_24h': round(current_spread + random.uniform(-8, 8), 2)
-            }
+        # Trained models, once the first background fit has finished
+        bundle = self.trainer.bundle if self.trainer else None
+        if bundle is not None:
+            electricity = market_data.electricity
+            modelled = bundle.predict(timestamp, electricity['load_mw'], electricity['rt_price'],
+                                      market_data.natural_gas['price'].mean())
+            hours = self.MODEL_HORIZON_HOURS
+            for zone, load, price in zip(self.electricity_zones, np.round(modelled['load'], 1).tolist(),
+                                         np.round(modelled['price'], 2).tolist()):
+                predictions['electricity'][zone][f'model_price_{hours}h'] = price
+                predictions.setdefault('load', {})[zone] = {f'load_{hours}h': load}
+            predictions['model'] = bundle.describe()
         
-        self.predictions = predictions
         return predictions
     
-    def generate_trading_signals(self):
+    def _training_data(self):
+        """Copy of the history in the shape training.fit_models expects, without backfilled ticks (no gas prices)"""
+        timestamps, columns = self.history.export(('load_mw', 'rt_price', 'price'))
+        gas_price = columns['price'].mean(axis=1)
+        keep = ~np.isnan(gas_price)
+        return timestamps[keep], columns['load_mw'][keep], columns['rt_price'][keep], gas_price[keep]
+    
+    @staticmethod
+    def _forecast_series(electricity, natural_gas):
+        """All forecast series side by side: zone RT prices, hub gas prices, zone spark spreads"""
+        return np.concatenate([electricity['rt_price'], natural_gas['price'], electricity['spark_spread']])
+    
+    def generate_trading_signals(self, market_data=None):
         """Generate trading signals for gas and power"""
-        if not self.market_data:
+        market_data = self.market_data if market_data is None else market_data
+        if market_data is None:
             return []
         
-        signals = []
+        rng = self.rng
+        zones = self.electricity_zones
+        hubs = self.gas_hubs
+        quotas = self.signal_quotas
+        electricity = market_data.electricity
+        candidates = []
         
         # Spark spread opportunities
-        for zone, data in self.market_data['electricity'].items():
-            spread = data['spark_spread']
-            if spread > 15:
-                signals.append({
-                    'type': 'spark_spread_trade',
-                    'action': 'BUY_POWER_SELL_GAS',
-                    'zone': zone,
-                    'spread': spread,
-                    'profit_potential': round(spread * random.uniform(50, 200), 0),
-                    'risk_score': round(random.uniform(0.2, 0.6), 3),
-                    'confidence': round(random.uniform(0.75, 0.95), 3)
-                })
-            elif spread < 5:
-                signals.append({
-                    'type': 'spark_spread_trade',
-                    'action': 'SELL_POWER_BUY_GAS',
-                    'zone': zone,
-                    'spread': spread,
-                    'profit_potential': round(abs(spread) * random.uniform(30, 150), 0),
-                    'risk_score': round(random.uniform(0.4, 0.8), 3),
-                    'confidence': round(random.uniform(0.65, 0.85), 3)
-                })
+        spread = electricity['spark_spread']
+        high = np.flatnonzero(spread > self.SPARK_BUY_THRESHOLD)
+        low = np.flatnonzero(spread < self.SPARK_SELL_THRESHOLD)
+        buy_profit = np.round(spread[high] * rng.uniform(50, 200, high.size), 0)
+        sell_profit = np.round(np.abs(spread[low]) * rng.uniform(30, 150, low.size), 0)
+        spark = [(profit, 'BUY_POWER_SELL_GAS', idx, (0.2, 0.6), (0.75, 0.95))
+                 for profit, idx in zip(buy_profit.tolist(), high.tolist())]
+        spark += [(profit, 'SELL_POWER_BUY_GAS', idx, (0.4, 0.8), (0.65, 0.85))
+                  for profit, idx in zip(sell_profit.tolist(), low.tolist())]
+        for profit, action, idx, risk, confidence in heapq.nlargest(quotas.get('spark_spread_trade', 0), spark):
+            candidates.append({
+                'type': 'spark_spread_trade',
+                'action': action,
+                'zone': zones[idx],
+                'spread': float(spread[idx]),
+                'profit_potential': profit,
+                'risk_score': round(rng.uniform(*risk), 3),
+                'confidence': round(rng.uniform(*confidence), 3)
+            })
         
         # Gas arbitrage opportunities
-        gas_prices = list(self.market_data['natural_gas'].values())
-        for i, hub1 in enumerate(self.gas_hubs):
-            for hub2 in self.gas_hubs[i+1:]:
-                if i < len(gas_prices):
-                    j = self.gas_hubs.index(hub2)
-                    if j < len(gas_prices):
-                        price_diff = abs(gas_prices[i]['price'] - gas_prices[j]['price'])
-                        if price_diff > 0.30:
-                            signals.append({
-                                'type': 'gas_arbitrage',
-                                'action': 'ARBITRAGE',
-                                'hub_buy': hub1 if gas_prices[i]['price'] < gas_prices[j]['price'] else hub2,
-                                'hub_sell': hub2 if gas_prices[i]['price'] < gas_prices[j]['price'] else hub1,
-                                'spread': round(price_diff, 3),
-                                'profit_potential': round(price_diff * random.uniform(1000, 5000), 0),
-                                'risk_score': round(random.uniform(0.3, 0.7), 3),
-                                'confidence': round(random.uniform(0.70, 0.90), 3)
-                            })
+        buy, sell, diff = self.gas_pairs.update(market_data.natural_gas['price'])
+        profit = np.round(diff * rng.uniform(1000, 5000, diff.size), 0)
+        for i, j, price_diff, potential in zip(buy.tolist(), sell.tolist(), diff.tolist(), profit.tolist()):
+            candidates.append({
+                'type': 'gas_arbitrage',
+                'action': 'ARBITRAGE',
+                'hub_buy': hubs[i],
+                'hub_sell': hubs[j],
+                'spread': round(price_diff, 3),
+                'profit_potential': potential,
+                'risk_score': round(rng.uniform(0.3, 0.7), 3),
+                'confidence': round(rng.uniform(0.70, 0.90), 3)
+            })
         
         # Power arbitrage
-        power_prices = [(zone, data['rt_price']) for zone, data in self.market_data['electricity'].items()]
-        for i, (zone1, price1) in enumerate(power_prices):
-            for zone2, price2 in power_prices[i+1:]:
-                price_diff = abs(price1 - price2)
-                if price_diff > 8:
-                    signals.append({
-                        'type': 'power_arbitrage',
-                        'action': 'ARBITRAGE',
-                        'zone_buy': zone1 if price1 < price2 else zone2,
-                        'zone_sell': zone2 if price1 < price2 else zone1,
-                        'spread': round(price_diff, 2),
-                        'profit_potential': round(price_diff * random.uniform(100, 400), 0),
-                        'risk_score': round(random.uniform(0.25, 0.65), 3),
-                        'confidence': round(random.uniform(0.75, 0.92), 3)
-                    })
-        
-        signals.sort(key=lambda x: x['profit_potential'], reverse=True)
-        self.trading_signals = signals[:8]
-        return self.trading_signals
-    
-    def generate_alerts(self):
-        """Generate market alerts"""
-        if not self.market_data:
+        buy, sell, diff = self.power_pairs.update(electricity['rt_price'])
+        profit = np.round(diff * rng.uniform(100, 400, diff.size), 0)
+        for i, j, price_diff, potential in zip(buy.tolist(), sell.tolist(), diff.tolist(), profit.tolist()):
+            candidates.append({
+                'type': 'power_arbitrage',
+                'action': 'ARBITRAGE',
+                'zone_buy': zones[i],
+                'zone_sell': zones[j],
+                'spread': round(price_diff, 2),
+                'profit_potential': potential,
+                'risk_score': round(rng.uniform(0.25, 0.65), 3),
+                'confidence': round(rng.uniform(0.75, 0.92), 3)
+            })
+        
+        return heapq.nlargest(self.signal_top_k, candidates, key=lambda x: x['profit_potential'])
+    
+    def generate_alerts(self, market_data=None):
+        """Evaluate the alert rules against this tick and update the active alerts"""
+        market_data = self.market_data if market_data is None else market_data
+        if market_data is None:
             return []
         
-        alerts = []
-        current_time = datetime.now()
-        
-        # High electricity price alerts
-        for zone, data in self.market_data['electricity'].items():
-            price = data['rt_price']
-            if price > 100:
-                alerts.append({
-                    'severity': 'HIGH' if price > 150 else 'MEDIUM',
-                    'type': 'power_price_spike',
-                    'message': f'High electricity price in {zone}: ${price}/MWh',
-                    'value': price,
-                    'recommendation': 'Consider demand response or power sales',
-                    'timestamp': current_time.isoformat()
-                })
-        
-        # Gas price alerts
-        hh_price = self.market_data['henry_hub']
-        if hh_price > 4.5:
-            alerts.append({
-                'severity': 'HIGH',
-                'type': 'gas_price_spike',
-                'message': f'High Henry Hub price: ${hh_price}/MMBtu',
-                'value': hh_price,
-                'recommendation': 'Monitor power generation costs and spark spreads',
-                'timestamp': current_time.isoformat()
-            })
+        now = self.clock().timestamp()
         
-        # Spark spread alerts
-        avg_spread = self.market_data['avg_spark_spread']
-        if avg_spread < 8:
-            alerts.append({
-                'severity': 'MEDIUM',
-                'type': 'low_spark_spread',
-                'message': f'Low average spark spread: ${avg_spread}/MWh',
-                'value': avg_spread,
-                'recommendation': 'Gas generation may be uneconomical',
-                'timestamp': current_time.isoformat()
-            })
+        # Rules are re-indexed only when they change; a fresh index evaluates every series once
+        version = self.alert_rules.version()
+        rebuilt = self.rule_index is None or version != self._rules_version
+        if rebuilt:
+            self.rule_index = alert_rules.RuleIndex(self.alert_rules.rules(), self.electricity_zones, self.gas_hubs)
+            self._rules_version = version
         
-        self.alerts = alerts[:10]
-        return self.alerts
+        # Only series that moved are searched; alerts on the others carry over unchanged
+        updated = self.rule_index.evaluate(market_data)
+        for alert_id in self.alert_acks.drain():
+            self.alert_book.acknowledge(alert_id, now)
+        return self.alert_book.update(self.rule_index, updated, now, rebuilt)
+    
+    @property
+    def alert_history(self):
+        return self.alert_book.history
+    
+    def build_scheduler(self, intervals, policy):
+        def stage(name, func, inputs=(), value=None):
+            return scheduler.Stage(name, intervals[name], functools.partial(self._timed, name, func), inputs, value)
+        
+        return scheduler.Scheduler([
+            stage('market_data', self.generate_real_time_market_data if self.ingestor is None
+                  else self.ingest_market_data),
+            stage('predictions', self.generate_predictions, ['market_data'], {}),
+            stage('trading_signals', self.generate_trading_signals, ['market_data'], []),
+            stage('alerts', self.generate_alerts, ['market_data'], [])
+        ], policy=policy, on_error=self._stage_failed, on_missed=self._stage_missed)
+    
+    def _stage_failed(self, stage, error):
+        # The stage keeps its previous output and version, so nothing downstream reruns on it
+        STAGE_ERRORS.inc(stage.name, type(error).__name__)
+        print(f"Error in {stage.name} stage: {error}")
+    
+    def _stage_missed(self, stage, slots):
+        STAGE_MISSED.inc(stage.name, amount=slots)
+    
+    def tick(self, market_data=None):
+        """Run every stage now, whatever its schedule, and publish the results together"""
+        started = time.perf_counter()
+        self.scheduler.run_all({} if market_data is None else {'market_data': market_data})
+        if self.scheduler['market_data'].value is None:
+            if self.ingestor is not None:
+                raise RuntimeError(f'No market data: no complete NYISO interval in {self.ingestor.directory}')
+            raise RuntimeError('No market data: the first market_data stage run failed')
+        return self.publish(started)
+    
+    def publish(self, started):
+        """Publish the latest output of every stage as one snapshot"""
+        stages = self.scheduler.stages
+        snapshot = EngineSnapshot(
+            version=self.snapshot.version + 1 if self.snapshot else 1,
+            market_data=stages['market_data'].value,
+            predictions=stages['predictions'].value,
+            trading_signals=stages['trading_signals'].value,
+            alerts=stages['alerts'].value,
+            fuel=self.fuel
+        )
+        snapshot.inherit(self.snapshot)
+        # A single reference swap: readers see either the old snapshot or the new one, never a mix
+        self.snapshot = snapshot
+        if self.trainer is not None:
+            self._timed('retrain', self.trainer.maybe_retrain, self._training_data)
+        body = self._timed('serialize', lambda: snapshot.payload('snapshot').body)
+        self.record_tick(snapshot, time.perf_counter() - started)
+        self.broadcaster.publish(snapshot.version, body)
+        self._timed('publish', self._notify_listeners, snapshot)
+        return snapshot
+    
+    def _timed(self, stage, func, *args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage)
+    
+    def _notify_listeners(self, snapshot):
+        for listener in self.listeners:
+            listener(snapshot)
+    
+    def record_tick(self, snapshot, seconds):
+        """Record one tick's duration and product counts (publishing to listeners is timed separately)"""
+        TICKS.inc()
+        TICK_SECONDS.observe(seconds)
+        LAST_TICK.set(snapshot.timestamp)
+        signals, alerts = {}, {}
+        for signal in snapshot.trading_signals:
+            signals[(signal['type'],)] = signals.get((signal['type'],), 0) + 1
+        for alert in snapshot.alerts:
+            alerts[(alert['severity'],)] = alerts.get((alert['severity'],), 0) + 1
+        SIGNAL_COUNT.replace(signals)
+        ALERT_COUNT.replace(alerts)
+    
+    def render_metrics(self):
+        return engine_metrics.render()
     
     def start_real_time_engine(self):
         """Start the real-time data generation"""
         def update_loop():
+            # Every stage just ran in __init__, so each first comes due one interval from now
+            self.scheduler.start()
             while True:
-                try:
-                    time.sleep(30)  # Wait 30 seconds before first update
-                    self.generate_real_time_market_data()
-                    self.generate_predictions()
-                    self.generate_trading_signals()
-                    self.generate_alerts()
-                except Exception as e:
-                    print(f"Error in real-time engine: {e}")
-                    time.sleep(10)
-        
-        thread = threading.Thread(target=update_loop, daemon=True)
-        thread.start()
+                self.scheduler.sleep_until_due()
+                started = time.perf_counter()
+                # Stages that fail are reported by the scheduler and retried at their next slot
+                if self.scheduler.run_pending():
+                    try:
+                        self.publish(started)
+                    except Exception as e:
+                        STAGE_ERRORS.inc('publish', type(e).__name__)
+                        print(f"Error publishing snapshot: {e}")
+        
+        self.update_thread = threading.Thread(target=update_loop, daemon=True)
+        self.update_thread.start()
+    
+    def health_problem(self):
+        """Why this engine cannot serve fresh ticks, or None"""
+        if self.update_thread is not None and not self.update_thread.is_alive():
+            return 'the engine update loop has stopped'
+        return None
+
+
+class SimulationClock:
+    """Injectable clock for simulation: time only moves when the simulation advances it"""
+    
+    def __init__(self, start, step_seconds):
+        self.current = start
+        self.step = timedelta(seconds=step_seconds)
+    
+    def __call__(self):
+        return self.current
+    
+    def advance(self):
+        self.current += self.step
+        return self.current
+
+
+def simulate(seed, ticks, start=datetime(2026, 1, 1), step_seconds=30, out=None, **engine_options):
+    """Run the engine on a seeded RNG and simulated clock, as fast as it can tick.
+    
+    No background thread, model training or tick store is involved, so for a
+    given seed (and TZ) every tick, signal and alert is reproduced exactly.
+    When ``out`` is a binary file, each tick's /api/snapshot body is written
+    to it as one line; the output is byte-identical across runs.
+    """
+    clock = SimulationClock(start, step_seconds)
+    engine = EnergyIntelligenceEngine(seed=seed, clock=clock, start=False, train_models=False,
+                                      tick_store_dir='', alert_rules_path='', ingest_dir='', feed_url='',
+                                      **engine_options)
+    if out is not None:
+        out.write(engine.snapshot.payload('snapshot').body + b'\n')
+    for _ in range(ticks - 1):
+        clock.advance()
+        snapshot = engine.tick()
+        if out is not None:
+            out.write(snapshot.payload('snapshot').body + b'\n')
+    return engine
+
+
+class SharedSnapshotPublisher:
+    """Engine listener that copies each snapshot's serialized payloads into shared memory"""
+    
+    def __init__(self, segment):
+        self.segment = segment
+    
+    def __call__(self, snapshot):
+        parts = {
+            'version': str(snapshot.version).encode(),
+            'timestamp': repr(snapshot.timestamp).encode(),
+            # Rendered before this tick's publish stage is recorded, so that stage lags by one tick
+            'metrics': engine_metrics.render().encode()
+        }
+        for name in EngineSnapshot.PAYLOADS:
+            payload = snapshot.payload(name)
+            parts[name] = payload.body
+            parts[name + '.gz'] = payload.gzip_body
+            parts[name + '.etag'] = payload.etag.encode()
+        self.segment.write_frame(parts)
+
+
+class PublishedSnapshot:
+    """Read-only snapshot rebuilt in a web worker from the bytes the producer published"""
+    
+    def __init__(self, parts):
+        self.version = int(parts['version'])
+        self.timestamp = float(parts['timestamp'])
+        self.metrics = parts['metrics']
+        self._payloads = {
+            name: SerializedPayload(parts[name], parts[name + '.gz'], parts[name + '.etag'].decode())
+            for name in EngineSnapshot.PAYLOADS
+        }
+    
+    def payload(self, name):
+        return self._payloads[name]
 
-# Initialize the engine
-intelligence_engine = EnergyIntelligenceEngine()
+
+class SharedEngineReader:
+    """Stands in for the engine inside web workers, serving the producer's ticks from shared memory.
+    
+    Nothing is attached or started until first use, so this is safe to build
+    before gunicorn forks. The current frame is copied out once per tick and
+    then shared by every request in the worker.
+    """
+    
+    POLL_SECONDS = 0.25
+    # How long a request waits for the producer's segment and first tick before answering 503
+    WAIT_SECONDS = float(os.environ.get('SHARED_TICK_WAIT_SECONDS', 10))
+    # A producer whose heartbeat is older than this is taken to be dead
+    STALE_SECONDS = float(os.environ.get('SHARED_TICK_STALE_SECONDS', 10))
+    
+    def __init__(self, segment_name):
+        self.segment_name = segment_name
+        self._segment = None
+        self._history = None
+        self._rollups = None
+        self._alert_history = None
+        self._broadcaster = None
+        self._generation = 0
+        self._snapshot = None
+        self._alert_rules = None
+        self._lock = threading.Lock()
+    
+    def _attach(self, deadline=None):
+        deadline = time.monotonic() + self.WAIT_SECONDS if deadline is None else deadline
+        while self._segment is None:
+            with self._lock:
+                if self._segment is None:
+                    try:
+                        self._segment = SharedTickSegment.attach(self.segment_name, timeout=0)
+                    except FileNotFoundError:
+                        pass
+            if self._segment is None:
+                if time.monotonic() > deadline:
+                    raise ProducerUnavailable(f'shared memory segment {self.segment_name} does not exist')
+                time.sleep(self.POLL_SECONDS)  # the producer has not created it yet
+        return self._segment
+    
+    def _live_segment(self, deadline):
+        """The segment of a live producer that has published, waiting until ``deadline`` for one"""
+        segment = self._attach(deadline)
+        while True:
+            if segment.generation() and segment.heartbeat_age() <= self.STALE_SECONDS:
+                return segment
+            if segment.generation():
+                segment = self._reattach(segment)
+                continue
+            # The producer is still building its engine, or failed to
+            if time.monotonic() > deadline:
+                raise ProducerUnavailable('it has not published a tick yet')
+            time.sleep(self.POLL_SECONDS)
+    
+    def _reattach(self, stale):
+        """Switch to the segment of a restarted producer; raises if there is none yet"""
+        try:
+            fresh = SharedTickSegment.attach(self.segment_name, timeout=0)
+        except (FileNotFoundError, ValueError):
+            fresh = None
+        if fresh is None or fresh.layout['created'] == stale.layout['created']:
+            if fresh is not None:
+                fresh.close()
+            raise ProducerUnavailable(f'its heartbeat is {stale.heartbeat_age():.0f} s old')
+        with self._lock:
+            if self._segment is stale:
+                # Views into the old segment go with it
+                self._segment, self._generation, self._snapshot = fresh, 0, None
+                self._history = self._rollups = self._alert_history = None
+            else:
+                fresh.close()  # another thread switched already
+        stale.close()
+        return self._segment
+    
+    def health_problem(self):
+        """Why the producer's ticks cannot be served right now, or None"""
+        try:
+            self._live_segment(time.monotonic())
+        except ProducerUnavailable as e:
+            return f'tick producer unavailable: {e}'
+        return None
+    
+    @property
+    def snapshot(self):
+        segment = self._live_segment(time.monotonic() + self.WAIT_SECONDS)
+        if segment.generation() != self._generation:
+            with self._lock:
+                generation, parts = segment.read_frame()
+                if generation != self._generation:
+                    self._snapshot = PublishedSnapshot(parts)
+                    self._generation = generation
+        return self._snapshot
+    
+    @property
+    def history(self):
+        if self._history is None:
+            segment = self._attach()
+            layout = segment.layout
+            self._history = PriceHistory(layout['zones'], layout['hubs'], layout['capacity'],
+                                         buffer=segment.history_buffer)
+        return self._history
+    
+    @property
+    def rollups(self):
+        if self._rollups is None:
+            segment = self._attach()
+            layout = segment.layout
+            offset = PriceHistory.nbytes(layout['zones'], layout['hubs'], layout['capacity'])
+            self._rollups = RollupPyramid(layout['zones'], layout['hubs'], dict(layout['rollup_capacities']),
+                                          buffer=segment.history_buffer[offset:])
+        return self._rollups
+    
+    @property
+    def alert_history(self):
+        if self._alert_history is None:
+            segment = self._attach()
+            layout = segment.layout
+            capacities = dict(layout['rollup_capacities'])
+            offset = (PriceHistory.nbytes(layout['zones'], layout['hubs'], layout['capacity'])
+                      + RollupPyramid.nbytes(layout['zones'], layout['hubs'], capacities))
+            self._alert_history = alert_lifecycle.AlertHistory(layout['alert_capacity'],
+                                                               buffer=segment.history_buffer[offset:])
+        return self._alert_history
+    
+    @property
+    def alert_acks(self):
+        """Acknowledgements queued here are applied by the producer on its next alerts run"""
+        return alert_lifecycle.AckLog(shared_alert_rules_path() + '.acks')
+    
+    @property
+    def alert_rules(self):
+        """The producer's rule file; edits made here reach it on its next alerts run"""
+        if self._alert_rules is None:
+            layout = self._attach().layout
+            self._alert_rules = alert_rules.RuleStore(shared_alert_rules_path(),
+                                                      alert_rules.default_rules(layout['zones']))
+        return self._alert_rules
+    
+    @property
+    def alert_series(self):
+        layout = self._attach().layout
+        return alert_rules.series_names(layout['zones'], layout['hubs'])
+    
+    def render_metrics(self):
+        """Engine metrics as last published by the producer"""
+        return self.snapshot.metrics.decode()
+    
+    @property
+    def broadcaster(self):
+        if self._broadcaster is None:
+            with self._lock:
+                if self._broadcaster is None:
+                    self._broadcaster = TickBroadcaster()
+                    threading.Thread(target=self._watch, daemon=True).start()
+        return self._broadcaster
+    
+    def _watch(self):
+        """Relay each new producer tick to this worker's stream subscribers"""
+        version = None
+        while True:
+            try:
+                snapshot = self.snapshot
+                if snapshot.version != version:
+                    version = snapshot.version
+                    self._broadcaster.publish(version, snapshot.payload('snapshot').body)
+            except Exception as e:
+                print(f"Error reading shared ticks: {e}")
+            time.sleep(self.POLL_SECONDS)
+
+
+def shared_alert_rules_path():
+    """Rule file shared by the producer and every worker, so rule edits reach the producer"""
+    return EnergyIntelligenceEngine.ALERT_RULES_PATH or 'alert_rules.json'
+
+def create_engine():
+    """Build the engine for this process.
+    
+    With SHARED_TICK_SEGMENT set (see gunicorn.conf.py), one producer process
+    runs the engine and publishes each tick to shared memory, and every web
+    worker gets a reader that serves those ticks instead of its own engine.
+    """
+    segment_name = os.environ.get('SHARED_TICK_SEGMENT')
+    if not segment_name:
+        return EnergyIntelligenceEngine(start=ENGINE_AUTOSTART)
+    if os.environ.get('SHARED_TICK_ROLE') != 'producer':
+        return SharedEngineReader(segment_name)
+    
+    zones = EnergyIntelligenceEngine.DEFAULT_ZONES
+    hubs = EnergyIntelligenceEngine.DEFAULT_HUBS
+    capacity = EnergyIntelligenceEngine.HISTORY_CAPACITY
+    alert_capacity = alert_lifecycle.HISTORY_CAPACITY
+    rollup_capacities = RollupPyramid.CAPACITIES
+    price_nbytes = PriceHistory.nbytes(zones, hubs, capacity)
+    rollup_end = price_nbytes + RollupPyramid.nbytes(zones, hubs, rollup_capacities)
+    segment = SharedTickSegment.create(
+        segment_name, {'zones': zones, 'hubs': hubs, 'capacity': capacity, 'alert_capacity': alert_capacity,
+                       'rollup_capacities': sorted(rollup_capacities.items())},
+        rollup_end + alert_lifecycle.AlertHistory.nbytes(alert_capacity))
+    # The history region holds the price history, then its rollups, then the resolved-alert history
+    history = segment.history_buffer
+    engine = EnergyIntelligenceEngine(
+        history=PriceHistory(zones, hubs, capacity, buffer=history[:price_nbytes]),
+        rollups=RollupPyramid(zones, hubs, rollup_capacities, buffer=history[price_nbytes:rollup_end]),
+        alert_history=alert_lifecycle.AlertHistory(alert_capacity, buffer=history[rollup_end:]),
+        alert_rules_path=shared_alert_rules_path(), start=ENGINE_AUTOSTART)
+    publisher = SharedSnapshotPublisher(segment)
+    publisher(engine.snapshot)
+    engine.listeners.append(publisher)
+    engine.shared_publisher = publisher
+    return engine
+
+# The engine is created lazily: importing this module does no work and starts
+# no threads. ENGINE_AUTOSTART=0 builds it without the background update loop,
+# for tests and tooling that drive ticks by hand.
+ENGINE_AUTOSTART = os.environ.get('ENGINE_AUTOSTART', '1') != '0'
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    """Return this process's engine, creating it on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine()
+    return _engine
+
+def _reset_engine_after_fork():
+    """Threads do not survive fork(), so a child builds its own engine on first use"""
+    global _engine, _engine_lock
+    _engine = None
+    _engine_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_engine_after_fork)
+
+def __getattr__(name):
+    # Keeps `app.intelligence_engine` working for existing callers
+    if name == 'intelligence_engine':
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # HTML Template (same as before)
 html_template = '''
@@ -803,44 +2276,6 @@ html_template = '''
             });
         }
         
-        async function fetchMarketData() {
-            try {
-                const response = await fetch('/api/market-data');
-                const data = await response.json();
-                currentData = data;
-                updateDashboard(data);
-                updateTables(data);
-                return data;
-            } catch (error) {
-                console.error('Error fetching market data:', error);
-                return null;
-            }
-        }
-        
-        async function fetchTradingSignals() {
-            try {
-                const response = await fetch('/api/trading-signals');
-                const signals = await response.json();
-                updateSignals(signals);
-                return signals;
-            } catch (error) {
-                console.error('Error fetching trading signals:', error);
-                return [];
-            }
-        }
-        
-        async function fetchAlerts() {
-            try {
-                const response = await fetch('/api/alerts');
-                const alerts = await response.json();
-                updateAlerts(alerts);
-                return alerts;
-            } catch (error) {
-                console.error('Error fetching alerts:', error);
-                return [];
-            }
-        }
-        
         function updateDashboard(data) {
             if (!data) return;
             
@@ -1000,36 +2435,45 @@ html_template = '''
                 const alertDiv = document.createElement('div');
                 alertDiv.className = `alert-item alert-${alert.severity.toLowerCase()}`;
                 
-                alertDiv.innerHTML = `
-                    <strong>${alert.severity}:</strong> ${alert.message}<br>
-                    <div style="margin-top: 8px; font-style: italic; color: #cbd5e0; font-size: 0.9rem;">
-                        💡 ${alert.recommendation}
-                    </div>
-                `;
+                // Alert text comes from user-defined rules, so it is only ever set as text, never as HTML
+                const severity = document.createElement('strong');
+                severity.textContent = `${alert.severity}:`;
+                const recommendation = document.createElement('div');
+                recommendation.style.cssText = 'margin-top: 8px; font-style: italic; color: #cbd5e0; font-size: 0.9rem;';
+                recommendation.textContent = `💡 ${alert.recommendation || ''}`;
+                alertDiv.append(severity, ` ${alert.message}`, document.createElement('br'), recommendation);
                 alertsList.appendChild(alertDiv);
             });
         }
         
+        function refreshActiveChart() {
+            const activeTab = document.querySelector('.tab-btn.active');
+            if (activeTab) {
+                const activeTabText = activeTab.textContent.toLowerCase();
+                if (activeTabText.includes('electricity')) {
+                    initPowerChart();
+                } else if (activeTabText.includes('natural')) {
+                    initGasChart();
+                } else if (activeTabText.includes('spark')) {
+                    initSpreadsChart();
+                }
+            }
+        }
+        
+        function applySnapshot(snapshot) {
+            currentData = snapshot.market_data;
+            updateDashboard(snapshot.market_data);
+            updateTables(snapshot.market_data);
+            updateSignals(snapshot.trading_signals);
+            updateAlerts(snapshot.alerts);
+            refreshActiveChart();
+        }
+        
         async function refreshData() {
             try {
-                await Promise.all([
-                    fetchMarketData(),
-                    fetchTradingSignals(),
-                    fetchAlerts()
-                ]);
-                
-                // Refresh active chart
-                const activeTab = document.querySelector('.tab-btn.active');
-                if (activeTab) {
-                    const activeTabText = activeTab.textContent.toLowerCase();
-                    if (activeTabText.includes('electricity')) {
-                        initPowerChart();
-                    } else if (activeTabText.includes('natural')) {
-                        initGasChart();
-                    } else if (activeTabText.includes('spark')) {
-                        initSpreadsChart();
-                    }
-                }
+                // One request returns prices, signals and alerts from the same tick
+                const response = await fetch('/api/snapshot');
+                applySnapshot(await response.json());
                 
                 console.log('Data refreshed successfully');
             } catch (error) {
@@ -1037,6 +2481,38 @@ html_template = '''
             }
         }
         
+        function startPolling() {
+            if (updateInterval) return;
+            console.log('Live stream unavailable, polling every 2 minutes');
+            updateInterval = setInterval(refreshData, 120000);
+        }
+        
+        function stopPolling() {
+            if (!updateInterval) return;
+            clearInterval(updateInterval);
+            updateInterval = null;
+        }
+        
+        function startStream() {
+            if (!window.EventSource) {
+                startPolling();
+                return;
+            }
+            
+            const source = new EventSource('/api/stream');
+            source.addEventListener('tick', event => {
+                stopPolling();
+                applySnapshot(JSON.parse(event.data));
+            });
+            source.onerror = () => {
+                // EventSource reconnects by itself unless the server refused the stream outright
+                if (source.readyState === EventSource.CLOSED) {
+                    startPolling();
+                    setTimeout(startStream, 60000);
+                }
+            };
+        }
+        
         // Initialize everything
         document.addEventListener('DOMContentLoaded', function() {
             console.log('🚀 Initializing Energy Intelligence Platform...');
@@ -1052,39 +2528,301 @@ html_template = '''
                 });
             }, 1000);
             
-            // Set up auto-refresh every 2 minutes
-            updateInterval = setInterval(refreshData, 120000);
+            // Receive pushed updates every tick, polling only if the stream is unavailable
+            startStream();
         });
     </script>
 </body>
 </html>
 '''
 
+# Streams are recycled periodically so a worker thread is never held forever;
+# EventSource reconnects transparently.
+STREAM_KEEPALIVE_SECONDS = 15
+STREAM_MAX_SECONDS = int(os.environ.get('STREAM_MAX_SECONDS', 300))
+
+def negotiated_response(variants, etag, mimetype, cache_control):
+    """Send the best pre-encoded variant the client accepts, or a 304 when its ETag still matches.
+    
+    ``variants`` maps a content-coding ('identity', 'gzip', 'br') to ready-made
+    bytes; each encoding gets its own strong ETag derived from ``etag``.
+    """
+    encoding = next((coding for coding in ('br', 'gzip')
+                     if coding in variants and request.accept_encodings[coding] > 0), 'identity')
+    tag = etag if encoding == 'identity' else f'{etag}-{encoding}'
+    # If-None-Match uses the weak comparison, so a W/ tag from an intermediary still matches
+    if request.if_none_match.contains_weak(tag) or request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(variants[encoding], mimetype=mimetype)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(tag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+def cached_json_response(name):
+    """Serve a product from the current snapshot's pre-serialized cache"""
+    payload = get_engine().snapshot.payload(name)
+    return negotiated_response({'identity': payload.body, 'gzip': payload.gzip_body}, payload.etag,
+                               'application/json', 'no-cache')
+
+
+class StaticAsset:
+    """A static page rendered and compressed once, addressed by its content hash"""
+    
+    def __init__(self, body, mimetype, filename):
+        self.mimetype = mimetype
+        self.digest = hashlib.sha256(body).hexdigest()[:20]
+        stem, extension = os.path.splitext(filename)
+        self.url = f'/assets/{stem}-{self.digest}{extension}'
+        self.variants = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(body, quality=11)
+    
+    def response(self, cache_control):
+        return negotiated_response(self.variants, self.digest, self.mimetype, cache_control)
+
+_dashboard_asset = None
+
+def get_dashboard_asset():
+    """The dashboard page, rendered from html_template once per process on first use"""
+    global _dashboard_asset
+    if _dashboard_asset is None:
+        body = app.jinja_env.from_string(html_template).render().encode()
+        _dashboard_asset = StaticAsset(body, 'text/html', 'dashboard.html')
+    return _dashboard_asset
+
+def asset_redirect(asset):
+    """An uncached redirect to the asset's current hashed URL"""
+    response = redirect(asset.url, 302)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.errorhandler(ProducerUnavailable)
+def producer_unavailable(e):
+    return jsonify({'error': f'Tick producer unavailable: {e}'}), 503, {'Retry-After': '5'}
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUEST_SECONDS.observe(time.perf_counter() - g.request_started, route, request.method,
+                            str(response.status_code))
+    if not response.is_streamed:
+        RESPONSE_BYTES.observe(response.content_length or 0, route)
+    return response
+
 # API Routes
 @app.route('/')
 def dashboard():
-    return render_template_string(html_template)
+    # A tiny uncached redirect, so a deploy shows up on the next load while the page itself is cached for good
+    return asset_redirect(get_dashboard_asset())
+
+@app.route('/assets/dashboard-<digest>.html')
+def dashboard_asset(digest):
+    asset = get_dashboard_asset()
+    if digest != asset.digest:
+        return asset_redirect(asset)  # a bookmark from before a deploy
+    return asset.response('public, max-age=31536000, immutable')
 
 @app.route('/api/market-data')
 def get_market_data():
-    return jsonify(intelligence_engine.market_data)
+    return cached_json_response('market-data')
 
 @app.route('/api/trading-signals')
 def get_trading_signals():
-    return jsonify(intelligence_engine.trading_signals)
+    return cached_json_response('trading-signals')
 
 @app.route('/api/alerts')
 def get_alerts():
-    return jsonify(intelligence_engine.alerts)
+    return cached_json_response('alerts')
 
 @app.route('/api/predictions')
 def get_predictions():
-    return jsonify(intelligence_engine.predictions)
+    return cached_json_response('predictions')
+
+@app.route('/api/spark-matrix')
+def get_spark_matrix():
+    return cached_json_response('spark-matrix')
+
+@app.route('/api/snapshot')
+def get_snapshot():
+    return cached_json_response('snapshot')
+
+@app.route('/api/stream')
+def stream():
+    broadcaster = get_engine().broadcaster
+    
+    def events():
+        subscription = broadcaster.subscribe()
+        deadline = time.monotonic() + STREAM_MAX_SECONDS
+        try:
+            yield b'retry: 5000\n\n' + (broadcaster.latest or b'')
+            while time.monotonic() < deadline:
+                try:
+                    yield subscription.get(timeout=STREAM_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield b': keep-alive\n\n'
+        finally:
+            broadcaster.unsubscribe(subscription)
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/history')
+def get_history():
+    """Raw ticks by default. With max_points (or an explicit resolution: tick, 1m, 5m, 1h, 1d) the
+    finest resolution that fits the budget is chosen, and each series comes as open/high/low/close/mean."""
+    series = [name for name in request.args.get('series', '').split(',') if name]
+    if not series:
+        return jsonify({'error': 'series is required, e.g. series=NYC:rt_price,Transco Z6 NY:price'}), 400
+    try:
+        start = _parse_time(request.args.get('start'))
+        end = _parse_time(request.args.get('end'))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid time range: {e}'}), 400
+    resolution = request.args.get('resolution')
+    max_points = request.args.get('max_points')
+    if resolution is not None and resolution != 'tick' and resolution not in RollupPyramid.RESOLUTIONS:
+        return jsonify({'error': f'Unknown resolution {resolution}; expected tick, '
+                                 f'{", ".join(RollupPyramid.RESOLUTIONS)}'}), 400
+    if max_points is not None and (not max_points.isdigit() or int(max_points) < 1):
+        return jsonify({'error': 'max_points must be a positive integer'}), 400
+    engine = get_engine()
+    try:
+        if resolution is None and max_points is None:
+            timestamps, values = engine.history.query(series, start, end)
+            return jsonify({'timestamps': _iso_times(timestamps),
+                            'series': {name: _json_values(column) for name, column in values.items()}})
+        
+        if resolution is None:
+            seconds = select_resolution(engine.history, engine.rollups, start, end, int(max_points))
+        else:
+            seconds = RollupPyramid.RESOLUTIONS.get(resolution, 0)
+        if seconds:
+            timestamps, values = engine.rollups.query(seconds, series, start, end)
+        else:
+            timestamps, raw = engine.history.query(series, start, end)
+            values = {name: dict.fromkeys(('open', 'high', 'low', 'close', 'mean'), column)
+                      for name, column in raw.items()}
+    except KeyError as e:
+        return jsonify({'error': f'Unknown series: {e.args[0]}'}), 404
+    names = {seconds: name for name, seconds in RollupPyramid.RESOLUTIONS.items()}
+    return jsonify({
+        'resolution': names.get(seconds, 'tick'),
+        'timestamps': _iso_times(timestamps),
+        'series': {name: {stat: _json_values(column) for stat, column in stats.items()}
+                   for name, stats in values.items()}
+    })
+
+def _iso_times(timestamps):
+    return [datetime.fromtimestamp(ts).isoformat() for ts in timestamps.tolist()]
+
+def _json_values(column):
+    # Backfilled ticks have no gas prices, which JSON can only express as null
+    return np.where(np.isnan(column), None, column).tolist() if np.isnan(column).any() else column.tolist()
+
+def _parse_time(value):
+    """Parse an ISO-8601 or epoch-seconds query parameter into epoch seconds"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+@app.route('/api/alert-rules', methods=['GET'])
+def list_alert_rules():
+    rules = get_engine().alert_rules.rules()
+    for field in ('series', 'desk', 'kind', 'severity'):
+        if request.args.get(field):
+            rules = [rule for rule in rules if rule.get(field) == request.args[field]]
+    return jsonify({'rules': sorted(rules, key=lambda rule: rule['id'])})
+
+@app.route('/api/alert-rules', methods=['POST'])
+def create_alert_rules():
+    """Create one rule (a JSON object) or many at once (a JSON array)"""
+    engine = get_engine()
+    specs = request.get_json(silent=True)
+    if specs is None:
+        return jsonify({'error': 'Expected a JSON rule object or an array of them'}), 400
+    try:
+        created = engine.alert_rules.create(specs if isinstance(specs, list) else [specs], engine.alert_series)
+    except alert_rules.RuleError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'rules': created}), 201
+
+@app.route('/api/alert-rules/<int:rule_id>', methods=['GET'])
+def get_alert_rule(rule_id):
+    rule = get_engine().alert_rules.get(rule_id)
+    if rule is None:
+        return jsonify({'error': f'No alert rule {rule_id}'}), 404
+    return jsonify(rule)
+
+@app.route('/api/alert-rules/<int:rule_id>', methods=['PUT'])
+def replace_alert_rule(rule_id):
+    engine = get_engine()
+    try:
+        rule = engine.alert_rules.replace(rule_id, request.get_json(silent=True), engine.alert_series)
+    except alert_rules.RuleError as e:
+        return jsonify({'error': str(e)}), 400
+    if rule is None:
+        return jsonify({'error': f'No alert rule {rule_id}'}), 404
+    return jsonify(rule)
+
+@app.route('/api/alert-rules/<int:rule_id>', methods=['DELETE'])
+def delete_alert_rule(rule_id):
+    rule = get_engine().alert_rules.delete(rule_id)
+    if rule is None:
+        return jsonify({'error': f'No alert rule {rule_id}'}), 404
+    return jsonify(rule)
+
+@app.route('/api/alerts/<int:alert_id>/acknowledge', methods=['POST'])
+def acknowledge_alert(alert_id):
+    """Queue an acknowledgement; the engine applies it on its next alerts run"""
+    engine = get_engine()
+    active = json.loads(engine.snapshot.payload('alerts').body)
+    if not any(alert['id'] == alert_id for alert in active):
+        return jsonify({'error': f'No active alert {alert_id}'}), 404
+    engine.alert_acks.put(alert_id)
+    return jsonify({'id': alert_id, 'state': alert_lifecycle.ACKNOWLEDGED}), 202
+
+@app.route('/api/alerts/history')
+def get_alert_history():
+    severities = [name for name in request.args.get('severity', '').upper().split(',') if name]
+    unknown = [name for name in severities if name not in alert_lifecycle.SEVERITY_RANK]
+    if unknown:
+        return jsonify({'error': f'Unknown severity: {", ".join(unknown)}'}), 400
+    try:
+        start = _parse_time(request.args.get('start'))
+        end = _parse_time(request.args.get('end'))
+        limit = int(request.args.get('limit', 500))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query: {e}'}), 400
+    alerts = get_engine().alert_history.query(start, end, severities or None, max(limit, 0))
+    return jsonify({'alerts': alerts})
+
+@app.route('/metrics')
+def get_metrics():
+    engine = get_engine()
+    DATA_AGE.set(round(time.time() - engine.snapshot.timestamp, 3))
+    body = engine.render_metrics() + http_metrics.render()
+    return Response(body, mimetype=None, content_type=metrics.CONTENT_TYPE)
 
 @app.route('/health')
 def health():
-    return jsonify({
-        'status': 'healthy',
+    status = health_status()
+    return jsonify(status), 200 if status['status'] == 'healthy' else 503
+
+def health_status():
+    problem = get_engine().health_problem()
+    status = {
+        'status': 'healthy' if problem is None else 'unhealthy',
         'service': 'Natural Gas & Electricity Intelligence Platform',
         'version': '1.0.0',
         'timestamp': datetime.now().isoformat(),
@@ -1096,15 +2834,43 @@ def health():
             'Price predictions',
             'Market alerts'
         ]
-    })
+    }
+    if problem is not None:
+        status['error'] = problem
+    return status
+
+def run_simulation(argv):
+    parser = argparse.ArgumentParser(prog='app.py simulate',
+                                     description='Replay a seeded, faster-than-real-time run of the engine')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ticks', type=int, default=2880, help='number of ticks (default: one day of 30 s ticks)')
+    parser.add_argument('--step', type=float, default=30, help='simulated seconds between ticks')
+    parser.add_argument('--start', type=datetime.fromisoformat, default=datetime(2026, 1, 1),
+                        help='simulated start time, ISO-8601')
+    parser.add_argument('--out', help='write one /api/snapshot body per tick to this file')
+    args = parser.parse_args(argv)
+    
+    started = time.perf_counter()
+    if args.out:
+        with open(args.out, 'wb') as out:
+            simulate(args.seed, args.ticks, args.start, args.step, out)
+    else:
+        simulate(args.seed, args.ticks, args.start, args.step)
+    elapsed = time.perf_counter() - started
+    print(f"Simulated {args.ticks} ticks ({args.ticks * args.step / 3600:.1f} h) in {elapsed:.2f} s, "
+          f"{args.ticks * args.step / elapsed:.0f}x real time")
 
 if __name__ == '__main__':
+    if sys.argv[1:2] == ['simulate']:
+        run_simulation(sys.argv[2:])
+        sys.exit(0)
+    
     print("🚀 Starting Natural Gas & Electricity Intelligence Platform...")
     print("⚡ Electricity market monitoring active")
     print("⛽ Natural gas price tracking enabled") 
     print("🔥 Spark spread analysis running")
     print("🎯 Trading signals generated")
-    print("📊 Real-time data updates every 30 seconds")
+    print(f"📊 Real-time prices update every {EnergyIntelligenceEngine.STAGE_INTERVALS['market_data']:g} seconds")
     print("✅ Energy intelligence platform ready!")
     
     port = int(os.environ.get('PORT', 5000))
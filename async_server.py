@@ -0,0 +1,290 @@
+"""Asyncio serving mode for many concurrent dashboard connections.
+
+    gunicorn async_server:create_app -c gunicorn.conf.py --worker-class aiohttp.GunicornWebWorker
+    python async_server.py                     # one process, no gunicorn
+
+Under the threaded Flask app every open connection holds a worker thread,
+so long-lived streams and slow readers use up a worker's capacity. Here each
+connection is a coroutine on one event loop, and an idle stream subscriber
+costs a suspended task and its socket, so a single process holds tens of
+thousands of them (raise ``ulimit -n`` to match).
+
+Handlers never touch the engine from the event loop. ``SnapshotHub`` reads
+the engine's (or the shared-tick reader's) current snapshot on the default
+executor a few times a second and swaps a reference to it; the read-only
+routes serve that snapshot's pre-serialized payloads, and every stream
+subscriber waits on one future that the hub resolves with each new tick. A
+subscriber that is slow to drain its socket just misses ticks: on its next
+turn it writes the newest one.
+
+The dashboard, the cached JSON products, ``/api/stream``, ``/health`` and
+``/metrics`` are served natively. Every other route (alert rules,
+acknowledgements, history queries) runs the Flask app through a small WSGI
+bridge on a thread pool, so the whole API stays available in this mode.
+"""
+import asyncio
+import functools
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+from multidict import CIMultiDict
+
+import app as flask_module
+from app import (DATA_AGE, EngineSnapshot, REQUEST_SECONDS, RESPONSE_BYTES, STREAM_KEEPALIVE_SECONDS,
+                 SharedEngineReader, TickBroadcaster, http_metrics)
+import metrics
+from shared_tick import ProducerUnavailable
+
+POLL_SECONDS = float(os.environ.get('ASYNC_POLL_SECONDS', 0.25))
+WSGI_THREADS = int(os.environ.get('ASYNC_WSGI_THREADS', 8))
+HUB = web.AppKey('hub', object)
+WSGI_EXECUTOR = web.AppKey('wsgi_executor', ThreadPoolExecutor)
+
+
+class SnapshotHub:
+    """The newest published snapshot, as seen from the event loop, and the tick stream subscribers wait on"""
+
+    def __init__(self, poll_seconds=POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self.snapshot = None
+        self.message = None  # the newest tick as a Server-Sent Event
+        self.dashboard = None
+        self.subscribers = 0
+        self.error = None  # why the engine's snapshot cannot be read, while it cannot
+        self._ready = asyncio.Event()
+        self._tick = asyncio.get_running_loop().create_future()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        engine = await loop.run_in_executor(None, flask_module.get_engine)
+        self.dashboard = await loop.run_in_executor(None, flask_module.get_dashboard_asset)
+        while True:
+            try:
+                snapshot = await loop.run_in_executor(None, lambda: engine.snapshot)
+                self.error = None
+                if self.snapshot is None or snapshot.version != self.snapshot.version:
+                    self.publish(snapshot)
+            except ProducerUnavailable as e:
+                self.error = e
+            except Exception as e:
+                print(f"Error reading engine snapshot: {e}")
+            await asyncio.sleep(self.poll_seconds)
+
+    def publish(self, snapshot):
+        self.snapshot = snapshot
+        self.message = TickBroadcaster.message(snapshot.version, snapshot.payload('snapshot').body)
+        tick, self._tick = self._tick, asyncio.get_running_loop().create_future()
+        tick.set_result(self.message)
+        self._ready.set()
+
+    async def current(self):
+        if self.error is not None:
+            raise self.error
+        if self.snapshot is None:
+            try:
+                await asyncio.wait_for(self._ready.wait(), SharedEngineReader.WAIT_SECONDS)
+            except asyncio.TimeoutError:
+                raise ProducerUnavailable('no tick has been published yet')
+        return self.snapshot
+
+    async def next_message(self, timeout):
+        """The next tick's event, or None if no tick arrives within ``timeout`` seconds"""
+        try:
+            return await asyncio.wait_for(asyncio.shield(self._tick), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+def encoding_qualities(request):
+    """{content-coding: quality} from Accept-Encoding, '*' included"""
+    qualities = {}
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        name, _, params = item.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name.strip():
+            qualities[name.strip().lower()] = quality
+    return qualities
+
+
+def negotiated_response(request, variants, etag, content_type, cache_control):
+    """The aiohttp counterpart of app.negotiated_response: best accepted variant, or a 304"""
+    qualities = encoding_qualities(request)
+    encoding = next((coding for coding in ('br', 'gzip')
+                     if coding in variants and qualities.get(coding, qualities.get('*', 0)) > 0), 'identity')
+    tag = etag if encoding == 'identity' else f'{etag}-{encoding}'
+    match = {value.strip().removeprefix('W/').strip('"')
+             for value in request.headers.get('If-None-Match', '').split(',')}
+    headers = {'ETag': f'"{tag}"', 'Vary': 'Accept-Encoding', 'Cache-Control': cache_control}
+    if tag in match or etag in match or '*' in match:
+        return web.Response(status=304, headers=headers)
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    return web.Response(body=variants[encoding], content_type=content_type, headers=headers)
+
+
+def cached_json(name):
+    async def handler(request):
+        payload = (await request.app[HUB].current()).payload(name)
+        return negotiated_response(request, {'identity': payload.body, 'gzip': payload.gzip_body}, payload.etag,
+                                   'application/json', 'no-cache')
+    return handler
+
+
+def asset_redirect(asset):
+    """Returned rather than raised, so the request metrics middleware still records it"""
+    return web.Response(status=302, headers={'Location': asset.url, 'Cache-Control': 'no-cache'})
+
+
+async def dashboard(request):
+    await request.app[HUB].current()
+    return asset_redirect(request.app[HUB].dashboard)
+
+
+async def dashboard_asset(request):
+    await request.app[HUB].current()
+    asset = request.app[HUB].dashboard
+    if request.match_info['digest'] != asset.digest:
+        return asset_redirect(asset)  # a bookmark from before a deploy
+    return negotiated_response(request, asset.variants, asset.digest, asset.mimetype,
+                               'public, max-age=31536000, immutable')
+
+
+async def stream(request):
+    """Server-Sent Events, one per tick; connections are not recycled, since an idle one holds no thread"""
+    hub = request.app[HUB]
+    await hub.current()
+    response = web.StreamResponse(headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache',
+                                           'X-Accel-Buffering': 'no'})
+    await response.prepare(request)
+    hub.subscribers += 1
+    try:
+        await response.write(b'retry: 5000\n\n' + hub.message)
+        while True:
+            message = await hub.next_message(STREAM_KEEPALIVE_SECONDS)
+            # A slow reader resumes at the newest tick rather than working through a backlog
+            await response.write(hub.message if message is not None else b': keep-alive\n\n')
+    except ConnectionResetError:
+        pass
+    finally:
+        hub.subscribers -= 1
+    return response
+
+
+async def health(request):
+    status = await asyncio.get_running_loop().run_in_executor(None, flask_module.health_status)
+    return web.json_response(status, status=200 if status['status'] == 'healthy' else 503,
+                             dumps=functools.partial(json.dumps, sort_keys=True))
+
+
+async def get_metrics(request):
+    snapshot = await request.app[HUB].current()
+    engine = flask_module.get_engine()
+    DATA_AGE.set(round(time.time() - snapshot.timestamp, 3))
+    body = await asyncio.get_running_loop().run_in_executor(None, engine.render_metrics)
+    return web.Response(body=(body + http_metrics.render()).encode(), headers={'Content-Type': metrics.CONTENT_TYPE})
+
+
+def _call_wsgi(environ):
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'], started['headers'] = status, headers
+
+    result = flask_module.app(environ, start_response)
+    try:
+        body = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return started['status'], started['headers'], body
+
+
+async def wsgi_fallback(request):
+    """Serve any other route by running the Flask app on the bridge's thread pool"""
+    body = await request.read()
+    host, _, port = (request.host or 'localhost').partition(':')
+    environ = {
+        'REQUEST_METHOD': request.method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': request.path.encode().decode('latin-1'),
+        'QUERY_STRING': request.query_string,
+        'SERVER_NAME': host,
+        'SERVER_PORT': port or ('443' if request.secure else '80'),
+        'SERVER_PROTOCOL': f'HTTP/{request.version.major}.{request.version.minor}',
+        'REMOTE_ADDR': request.remote or '',
+        'CONTENT_TYPE': request.headers.get('Content-Type', ''),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': request.scheme,
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in request.headers.items():
+        key = 'HTTP_' + name.upper().replace('-', '_')
+        if key not in ('HTTP_CONTENT_TYPE', 'HTTP_CONTENT_LENGTH'):
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    status, headers, body = await asyncio.get_running_loop().run_in_executor(
+        request.app[WSGI_EXECUTOR], _call_wsgi, environ)
+    code, _, reason = status.partition(' ')
+    headers = CIMultiDict(headers)
+    headers.popall('Content-Length', None)
+    return web.Response(status=int(code), reason=reason, body=body, headers=headers)
+
+
+@web.middleware
+async def request_metrics(request, handler):
+    started = time.perf_counter()
+    try:
+        response = await handler(request)
+    except ProducerUnavailable as e:
+        response = web.json_response({'error': f'Tick producer unavailable: {e}'}, status=503,
+                                     headers={'Retry-After': '5'})
+    if handler is not wsgi_fallback:  # the Flask app records its own requests
+        route = request.match_info.route.resource.canonical if request.match_info.route.resource else 'unmatched'
+        REQUEST_SECONDS.observe(time.perf_counter() - started, route, request.method, str(response.status))
+        if isinstance(response, web.Response):  # streams have no size
+            RESPONSE_BYTES.observe(response.content_length or 0, route)
+    return response
+
+
+async def _start_hub(application):
+    hub = application[HUB] = SnapshotHub()
+    application[WSGI_EXECUTOR] = ThreadPoolExecutor(max_workers=WSGI_THREADS, thread_name_prefix='wsgi')
+    task = asyncio.create_task(hub.run())
+    yield
+    task.cancel()
+    application[WSGI_EXECUTOR].shutdown(wait=False)
+
+
+async def create_app():
+    application = web.Application(middlewares=[request_metrics])
+    application.cleanup_ctx.append(_start_hub)
+    routes = application.router
+    routes.add_get('/', dashboard)
+    routes.add_get('/assets/dashboard-{digest}.html', dashboard_asset)
+    for name in EngineSnapshot.PAYLOADS:
+        routes.add_get(f'/api/{name}', cached_json(name))
+    routes.add_get('/api/stream', stream)
+    routes.add_get('/health', health)
+    routes.add_get('/metrics', get_metrics)
+    routes.add_route('*', '/{path:.*}', wsgi_fallback)
+    return application
+
+
+if __name__ == '__main__':
+    web.run_app(create_app(), port=int(os.environ.get('PORT', 5000)), print=None)
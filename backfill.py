@@ -0,0 +1,184 @@
+"""Parallel backfill of NYISO monthly archives into the tick store.
+
+    python backfill.py ARCHIVE_DIR --store DIR           # every month found in ARCHIVE_DIR
+    python backfill.py ARCHIVE_DIR --months 202401 202402 --workers 8
+
+NYISO publishes history as one zip per feed and month
+(``20240101realtime_zone_csv.zip``, ``20240101pal_csv.zip``,
+``20240101damlbmp_zone_csv.zip``), each holding one CSV per day. A month is
+one task for a pool worker. The worker streams each day's CSVs straight out
+of the zips (nothing is extracted to disk), joins them the way
+``NyisoIngestor`` does, and writes the day as one tick store segment. Months
+are independent, so throughput grows with the number of workers.
+
+Segments appear atomically, and a month that completes leaves a marker in
+``<store>/.backfill``. An interrupted backfill can simply be rerun: finished
+months are skipped, and so are the days of an unfinished month that already
+have a segment. A day that already has a segment (say, from the live engine)
+is never overwritten.
+
+The archives have no gas prices or heat rates, so those fields, and the
+spark spreads that depend on them, are stored as NaN.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timezone
+
+import numpy as np
+import pandas as pd
+
+import nyiso_ingest
+from tick_store import GAS_FIELDS, TickStore
+
+MARKER_DIR = '.backfill'
+ARCHIVE_NAME = re.compile(r'^(\d{6})01(\w+)_csv\.zip$')
+FIELDS = ('rt_price', 'da_price', 'load_mw')  # the tick store has no fuel mix column
+
+
+def find_archives(directory):
+    """{month: {field: archive path}} for every month that has a real-time LBMP archive"""
+    fields = {nyiso_ingest.FEEDS[field][0]: field for field in FIELDS}
+    months = {}
+    for name in sorted(os.listdir(directory)):
+        match = ARCHIVE_NAME.match(name)
+        if match and match.group(2) in fields:
+            months.setdefault(match.group(1), {})[fields[match.group(2)]] = os.path.join(directory, name)
+    return {month: archives for month, archives in months.items() if 'rt_price' in archives}
+
+
+def marker_path(store_dir, month):
+    return os.path.join(store_dir, MARKER_DIR, f'{month}.done')
+
+
+def read_member(archive, member, key_column, value_column):
+    """(UTC time stamps, keys, values) of one day's CSV, decompressed as it is parsed
+
+    Times are UTC so the hour repeated when clocks go back stays two hours.
+    """
+    columns = {'Time Stamp', 'Time Zone', key_column, value_column}
+    with archive.open(member) as f:
+        frame = pd.read_csv(f, usecols=lambda column: column in columns,
+                            dtype={'Time Stamp': str, 'Time Zone': str, key_column: str, value_column: 'float64'})
+    frame = frame.dropna()
+    stamps = pd.to_datetime(frame['Time Stamp'], format=nyiso_ingest.TIME_FORMAT)
+    repeated = nyiso_ingest.repeated_hour(stamps, frame.get('Time Zone'))
+    stamps = stamps.dt.tz_localize(nyiso_ingest.MARKET_TZ, ambiguous=~repeated, nonexistent='shift_forward')
+    stamps = stamps.dt.tz_convert('UTC').dt.tz_localize(None)
+    return stamps.to_numpy(), frame[key_column], frame[value_column].to_numpy()
+
+
+def pivot(stamps, keys, values, zone_index, n_zones):
+    """Sorted unique times and a (times x zones) matrix, NaN where a zone has no row"""
+    column = keys.map(zone_index).to_numpy(dtype=float)
+    keep = ~np.isnan(column)
+    times, rows = np.unique(stamps[keep], return_inverse=True)
+    matrix = np.full((len(times), n_zones), np.nan)
+    matrix[rows, column[keep].astype(np.intp)] = values[keep]
+    return times, matrix
+
+
+def as_of(times, matrix, at):
+    """Each zone's latest value at or before each of ``at``, NaN before its first row"""
+    filled = pd.DataFrame(matrix).ffill().to_numpy()
+    index = np.searchsorted(times, at, side='right') - 1
+    result = np.full((len(at), matrix.shape[1]), np.nan)
+    result[index >= 0] = filled[index[index >= 0]]
+    return result
+
+
+def backfill_month(month, archives, store_dir, zones, hubs):
+    """Write one month's day segments; runs in a pool worker. Returns (month, days written, ticks)"""
+    store = TickStore(store_dir, zones, hubs, recover=False)
+    zone_index = {name: zones.index(zone) for name, zone in nyiso_ingest.ZONE_NAMES.items() if zone in zones}
+    zone_index.update({zone: i for i, zone in enumerate(zones)})
+    opened = {field: zipfile.ZipFile(path) for field, path in archives.items()}
+    days = ticks = 0
+    try:
+        members = {field: {name[:8]: name for name in archive.namelist() if name[:8].isdigit()}
+                   for field, archive in opened.items()}
+        for day in sorted(members['rt_price']):
+            path = store.segment_path(day)
+            if os.path.exists(path):
+                continue
+            feeds = {}
+            for field, archive in opened.items():
+                if day in members[field]:
+                    _, key_column, value_column = nyiso_ingest.FEEDS[field]
+                    feeds[field] = pivot(*read_member(archive, members[field][day], key_column, value_column),
+                                         zone_index, len(zones))
+            times, rt_price = feeds['rt_price']
+            complete = ~np.isnan(rt_price).any(axis=1)
+            times, rt_price = times[complete], rt_price[complete]
+            da_price, load = (as_of(*feeds[field], times) if field in feeds else np.full(rt_price.shape, np.nan)
+                              for field in ('da_price', 'load_mw'))
+
+            records = np.zeros(len(times), dtype=store.dtype)
+            # Back to naive local times, converted the way the engine converts its own
+            records['timestamp'] = [nyiso_ingest.local_time(stamp.replace(tzinfo=timezone.utc)).timestamp()
+                                    for stamp in pd.to_datetime(times).to_pydatetime()]
+            records['rt_price'] = rt_price
+            records['da_price'] = np.where(np.isnan(da_price), rt_price, da_price)
+            records['load_mw'] = np.nan_to_num(load)
+            for field in ('heat_rate', 'spark_spread', 'henry_hub', 'avg_spark_spread') + GAS_FIELDS:
+                records[field] = np.nan
+            store.write_segment(path, records)
+            days += 1
+            ticks += len(records)
+    finally:
+        for archive in opened.values():
+            archive.close()
+
+    marker = marker_path(store_dir, month)
+    with open(marker + '.tmp', 'w') as f:
+        json.dump({'month': month, 'days': days, 'ticks': ticks, 'archives': archives}, f)
+    os.replace(marker + '.tmp', marker)
+    return month, days, ticks
+
+
+def main(argv=None):
+    from app import EnergyIntelligenceEngine  # segments must match the engine's zone/hub layout
+
+    parser = argparse.ArgumentParser(description='Backfill the tick store from NYISO monthly zip archives')
+    parser.add_argument('archives', help='directory holding the monthly *_csv.zip archives')
+    parser.add_argument('--store', default=EnergyIntelligenceEngine.TICK_STORE_DIR,
+                        help='tick store directory (default: TICK_STORE_DIR)')
+    parser.add_argument('--months', nargs='+', help='only these months, as YYYYMM')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+    if not args.store:
+        parser.error('--store or TICK_STORE_DIR is required')
+
+    months = find_archives(args.archives)
+    if args.months:
+        months = {month: archives for month, archives in months.items() if month in args.months}
+    os.makedirs(os.path.join(args.store, MARKER_DIR), exist_ok=True)
+    pending = [month for month in sorted(months) if not os.path.exists(marker_path(args.store, month))]
+    print(f'{len(months) - len(pending)} of {len(months)} months already backfilled; {len(pending)} to go')
+
+    zones = list(EnergyIntelligenceEngine.DEFAULT_ZONES)
+    hubs = list(EnergyIntelligenceEngine.DEFAULT_HUBS)
+    started = time.perf_counter()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(pending) or 1))) as pool:
+        futures = {pool.submit(backfill_month, month, months[month], args.store, zones, hubs): month
+                   for month in pending}
+        for future in as_completed(futures):
+            try:
+                month, days, ticks = future.result()
+            except Exception as e:
+                failed += 1
+                print(f'{futures[future]}: failed: {e}')
+                continue
+            print(f'{month}: {days} days, {ticks} ticks')
+    print(f'Backfilled {len(pending) - failed} months in {time.perf_counter() - started:.1f} s')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
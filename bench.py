@@ -0,0 +1,216 @@
+"""Microbenchmarks for the engine stages at 5 to 5,000 zones/hubs.
+
+    python bench.py                      # run, write bench_results.json, compare to bench_baseline.json
+    python bench.py --sizes 5 50         # subset of sizes
+    python bench.py --update-baseline    # accept the current numbers as the new baseline
+
+Every case reports the best-of-``--repeat`` mean seconds per call. A case
+fails when it is more than ``--threshold`` (default 25%) slower than the
+baseline and also more than ``--noise-floor`` (default 50 us) slower in
+absolute terms, since a few microseconds of scheduler jitter is a large ratio
+on the smallest cases. A case that looks slower is timed again up to
+``--retries`` times and keeps its best number before it counts as a failure;
+the exit status is 1 if any case failed. Baseline numbers are
+machine-specific, so refresh the baseline when the benchmark host changes.
+"""
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+import app
+
+SIZES = (5, 50, 500, 5000)
+RESULTS_PATH = 'bench_results.json'
+BASELINE_PATH = 'bench_baseline.json'
+
+
+def make_engine(size, seed=0):
+    """Engine with ``size`` zones and ``size`` hubs on a seeded RNG and a fixed clock, a few ticks in.
+
+    The tick store, alert rules file, NYISO drop folder and feed are all switched off, so the
+    numbers do not depend on whatever the environment points those at.
+    """
+    clock = app.SimulationClock(datetime(2026, 1, 15, 17), 30)
+    engine = app.EnergyIntelligenceEngine(
+        electricity_zones=[f'Z{i:04d}' for i in range(size)],
+        gas_hubs=[f'H{i:04d}' for i in range(size)],
+        zone_hubs={f'Z{i:04d}': f'H{i:04d}' for i in range(size)},
+        history_capacity=256, rollup_capacities={60: 4, 300: 4, 3600: 4, 86400: 4},
+        tick_store_dir='', alert_rules_path='', ingest_dir='', feed_url='', start=False, train_models=False,
+        seed=seed, clock=clock)
+    for _ in range(4):
+        clock.advance()
+        engine.tick()
+    return engine
+
+
+def alternating(stage, snapshots):
+    """Call ``stage`` on each snapshot in turn, so every call sees the prices move"""
+    calls = itertools.cycle(snapshots)
+    return lambda: stage(next(calls))
+
+
+def sparse_moves(market_data, fraction=0.01):
+    """Two copies of a snapshot that differ in 1% of zone and hub prices (at least one of each)"""
+    copies = []
+    for sign in (1, -1):
+        electricity = {field: column.copy() for field, column in market_data.electricity.items()}
+        natural_gas = {field: column.copy() for field, column in market_data.natural_gas.items()}
+        for column, step in ((electricity['rt_price'], 5.0), (natural_gas['price'], 0.05)):
+            column[:max(1, int(len(column) * fraction))] += sign * step
+        copies.append(app.MarketSnapshot(market_data.time, market_data.zones, market_data.hubs, electricity,
+                                         natural_gas, market_data.henry_hub, market_data.avg_spark_spread))
+    return copies
+
+
+def cases(engine):
+    """(name, zero-argument callable) pairs; payloads are rebuilt from scratch on every call"""
+    snapshot = engine.snapshot
+    market_data = snapshot.market_data
+    # Incremental stages skip work for prices that did not move, so feed them moving prices
+    full = [market_data, engine.generate_initial_data()]
+    sparse = sparse_moves(market_data)
+    yield 'generate_initial_data', engine.generate_initial_data
+    yield 'generate_predictions', lambda: engine.generate_predictions(market_data)
+    yield 'generate_trading_signals', alternating(engine.generate_trading_signals, full)
+    yield 'generate_trading_signals:sparse', alternating(engine.generate_trading_signals, sparse)
+    yield 'generate_alerts', alternating(engine.generate_alerts, full)
+    yield 'generate_alerts:sparse', alternating(engine.generate_alerts, sparse)
+    yield 'rollups:append', lambda: engine.rollups.append(market_data)
+    # The spark matrix is zones x hubs, so it is only timed up to a few hundred of each
+    electricity = market_data.electricity
+    matrix_sized = len(market_data.zones) * len(market_data.hubs) <= 500 * 500
+    if matrix_sized:
+        yield 'spark_matrix', lambda: engine.fuel.matrix(electricity['rt_price'], electricity['heat_rate'],
+                                                         market_data.natural_gas['price'])
+        yield 'spark_matrix:payload', lambda: engine.fuel.to_dict(market_data)
+    for name in app.EngineSnapshot.PAYLOADS:
+        if name == 'spark-matrix' and not matrix_sized:
+            continue
+        data = snapshot.to_dict() if name == 'snapshot' else app.EngineSnapshot.PAYLOADS[name](snapshot)
+        yield f'serialize:{name}', lambda data=data: app.SerializedPayload.build(data, snapshot.version)
+
+
+def measure(func, repeat, min_time):
+    """Best mean seconds per call over ``repeat`` runs of at least ``min_time`` seconds each"""
+    func()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def regressed(seconds, baseline_seconds, threshold, noise_floor):
+    return seconds > baseline_seconds * (1 + threshold) and seconds - baseline_seconds > noise_floor
+
+
+def run(sizes, repeat, min_time, baseline=None, threshold=0.25, noise_floor=50e-6, retries=2):
+    """Time every case; with a baseline, cases that look regressed are re-timed and keep their best"""
+    baseline = baseline or {}
+    results = {}
+    for size in sizes:
+        engine = make_engine(size)
+        for name, func in cases(engine):
+            key = f'{name}[{size}]'
+            seconds = measure(func, repeat, min_time)
+            for _ in range(retries):
+                if key not in baseline or not regressed(seconds, baseline[key], threshold, noise_floor):
+                    break
+                seconds = min(seconds, measure(func, repeat, min_time))
+            results[key] = seconds
+            print(f'{key:<40} {seconds * 1e3:10.3f} ms')
+    return results
+
+
+def compare(results, baseline, threshold, noise_floor):
+    """Print the ratio to the baseline for each case; returns the keys that regressed"""
+    regressions = []
+    for key, seconds in results.items():
+        if key not in baseline:
+            print(f'{key:<40} (no baseline)')
+            continue
+        ratio = seconds / baseline[key]
+        failed = regressed(seconds, baseline[key], threshold, noise_floor)
+        if failed:
+            regressions.append(key)
+        print(f'{key:<40} {ratio:6.2f}x baseline{"  REGRESSION" if failed else ""}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the engine stages and compare to a baseline')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='zone/hub counts to run')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.05, help='minimum seconds per timing run')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown, 0.25 = 25%%')
+    parser.add_argument('--noise-floor', type=float, default=50e-6,
+                        help='slowdowns under this many seconds per call never fail')
+    parser.add_argument('--retries', type=int, default=2, help='re-timings for a case that looks regressed')
+    parser.add_argument('--results', default=RESULTS_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if not args.update_baseline:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)['results']
+        except FileNotFoundError:
+            pass
+    results = run(args.sizes, args.repeat, args.min_time, baseline, args.threshold, args.noise_floor, args.retries)
+    report = {
+        'created': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'unit': 'seconds per call',
+        'results': results
+    }
+    with open(args.results, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.update_baseline:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            baseline = dict(report, results={})
+        # Merge so that a run over a subset of sizes keeps the other sizes' numbers
+        baseline.update({key: value for key, value in report.items() if key != 'results'})
+        baseline['results'].update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f'Baseline written to {args.baseline}')
+        return 0
+
+    if baseline is None:
+        print(f'No baseline at {args.baseline}; run with --update-baseline to create one')
+        return 0
+    regressions = compare(results, baseline, args.threshold, args.noise_floor)
+    if regressions:
+        print(f'{len(regressions)} case(s) regressed by more than {args.threshold:.0%}: {", ".join(regressions)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,334 @@
+"""Pooled, conditional HTTP fetching of feed files into a drop folder.
+
+    python feed_fetch.py serve RECORDED_DIR --port 8099 --rows-per-second 2
+    python feed_fetch.py bench http://127.0.0.1:8099 --drop /tmp/drop --ticks 200
+
+``FeedFetcher`` pulls every feed once per tick through one shared
+``requests.Session``, so connections to a host are kept alive and reused
+rather than opened per request. Each URL remembers the ``ETag`` and
+``Last-Modified`` of its last response and sends them back as
+``If-None-Match`` / ``If-Modified-Since``: an unchanged file costs a 304 with
+no body. A changed one is written to the drop folder (atomically, under its
+URL's file name), where ``NyisoIngestor`` picks it up.
+
+Feeds are fetched concurrently on a small thread pool. ``fetch`` waits at
+most ``deadline`` seconds for them; a slower request is left running and its
+file lands for a later tick, and that feed is not requested again until it
+finishes. A feed that fails waits out an exponential backoff, measured on the
+monotonic clock and checked at the start of each tick, so backing off never
+sleeps in the tick either.
+
+``serve`` runs a stand-in for the NYISO feed server: it serves a
+directory of recorded files with ETag and Last-Modified validators and honours
+conditional requests. With ``--rows-per-second`` it replays CSV files, revealing
+their rows a few at a time the way a live day file grows, so the fetch and
+ingest path can be exercised end to end without a network.
+"""
+import argparse
+import email.utils
+import hashlib
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# NYISO's public CSV paths, relative to a base URL (http://mis.nyiso.com/public/csv in production)
+NYISO_FEEDS = {
+    'rt_price': 'realtime/{date}realtime_zone.csv',
+    'da_price': 'damlbmp/{date}damlbmp_zone.csv',
+    'load_mw': 'pal/{date}pal.csv',
+    'fuel_mix': 'rtfuelmix/{date}rtfuelmix.csv'
+}
+UPDATED = 'updated'
+NOT_MODIFIED = 'not_modified'
+MISSING = 'missing'  # 404: a day file not published yet
+ERROR = 'error'
+
+
+def nyiso_feeds(base_url):
+    """{name: URL template} for the NYISO feeds under ``base_url``"""
+    return {name: f"{base_url.rstrip('/')}/{path}" for name, path in NYISO_FEEDS.items()}
+
+
+class FetchResult:
+    __slots__ = ('feed', 'url', 'outcome', 'seconds', 'nbytes', 'error')
+
+    def __init__(self, feed, url, outcome, seconds, nbytes=0, error=None):
+        self.feed = feed
+        self.url = url
+        self.outcome = outcome
+        self.seconds = seconds
+        self.nbytes = nbytes
+        self.error = error
+
+
+class _Validators:
+    """What the server last said about one URL"""
+    __slots__ = ('etag', 'last_modified')
+
+    def __init__(self):
+        self.etag = None
+        self.last_modified = None
+
+    def headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class FeedFetcher:
+    def __init__(self, feeds, directory, timeout=10.0, deadline=1.0, workers=8, backoff=1.0, max_backoff=300.0,
+                 rollover_seconds=900, session=None, clock=time.monotonic):
+        self.feeds = dict(feeds)  # name -> URL, where {date} is replaced by YYYYMMDD
+        self.directory = directory
+        self.timeout = timeout  # per request: connect and read, each
+        self.deadline = deadline  # longest a tick waits for its fetches
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rollover_seconds = rollover_seconds  # keep fetching yesterday's files this long past midnight
+        self.clock = clock
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=max(1, len(self.feeds)), pool_maxsize=workers, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='feed-fetch')
+        self.validators = {}  # url -> _Validators
+        self.in_flight = {}  # future -> (feed, url)
+        self.failures = {}  # feed -> consecutive failures
+        self.retry_at = {}  # feed -> monotonic time before which it is not requested
+        self._lock = threading.Lock()  # guards validators; the rest is only touched by the tick thread
+        os.makedirs(directory, exist_ok=True)
+
+    def urls(self, now):
+        """(feed, url) pairs to fetch at ``now``: today's files, plus yesterday's just after midnight"""
+        days = [now]
+        if now - timedelta(seconds=self.rollover_seconds) < now.replace(hour=0, minute=0, second=0, microsecond=0):
+            days.insert(0, now - timedelta(days=1))
+        pairs = []
+        for feed, template in self.feeds.items():
+            for url in dict.fromkeys(template.format(date=day.strftime('%Y%m%d')) for day in days):
+                pairs.append((feed, url))
+        return pairs
+
+    def fetch(self, now, deadline=None):
+        """Start this tick's requests and wait up to ``deadline`` (default: the fetcher's) for them.
+
+        Returns a FetchResult for every request that finished, including any
+        left running by an earlier tick.
+        """
+        started = self.clock()
+        deadline = self.deadline if deadline is None else deadline
+        busy = {feed for feed, _ in self.in_flight.values()}
+        pairs = self.urls(now)
+        with self._lock:
+            # Validators for past days' files are no longer needed
+            current = {url for _, url in pairs} | {url for _, url in self.in_flight.values()}
+            for url in [url for url in self.validators if url not in current]:
+                del self.validators[url]
+        submitted = False
+        for feed, url in pairs:
+            if feed in busy or self.retry_at.get(feed, 0) > started:
+                continue
+            self.in_flight[self.executor.submit(self._get, feed, url)] = (feed, url)
+            submitted = True
+        if not self.in_flight:
+            return []
+        # With nothing new requested, only collect what has finished since the last tick
+        timeout = max(0.0, deadline - (self.clock() - started)) if submitted else 0
+        done, _ = wait(list(self.in_flight), timeout=timeout)
+        results = []
+        for future in done:
+            feed, url = self.in_flight.pop(future)
+            result = future.result()
+            if result.outcome == ERROR:
+                failures = self.failures[feed] = self.failures.get(feed, 0) + 1
+                delay = min(self.max_backoff, self.backoff * 2 ** (failures - 1))
+                self.retry_at[feed] = self.clock() + delay * random.uniform(0.5, 1.0)
+            else:
+                self.failures.pop(feed, None)
+                self.retry_at.pop(feed, None)
+            results.append(result)
+        return results
+
+    def _get(self, feed, url):
+        started = time.perf_counter()
+        with self._lock:
+            validators = self.validators.setdefault(url, _Validators())
+            headers = validators.headers()
+        try:
+            with self.session.get(url, headers=headers, timeout=self.timeout) as response:
+                if response.status_code == 304:
+                    return FetchResult(feed, url, NOT_MODIFIED, time.perf_counter() - started)
+                if response.status_code == 404:
+                    return FetchResult(feed, url, MISSING, time.perf_counter() - started)
+                response.raise_for_status()
+                body = response.content
+                self._write(url, body)
+                with self._lock:
+                    validators.etag = response.headers.get('ETag')
+                    validators.last_modified = response.headers.get('Last-Modified')
+                return FetchResult(feed, url, UPDATED, time.perf_counter() - started, len(body))
+        except (requests.RequestException, OSError) as e:
+            return FetchResult(feed, url, ERROR, time.perf_counter() - started, error=e)
+
+    def _write(self, url, body):
+        path = os.path.join(self.directory, os.path.basename(unquote(urlsplit(url).path)))
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(body)
+        os.replace(tmp, path)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+
+class RecordedFeedHandler(BaseHTTPRequestHandler):
+    """Serves files under ``server.root`` with validators, optionally replaying CSV rows over time"""
+    protocol_version = 'HTTP/1.1'  # keep-alive, so the fetcher's pooled connections are reused
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        name = os.path.basename(unquote(urlsplit(self.path).path))
+        path = os.path.join(server.root, name)
+        if not name or not os.path.isfile(path):
+            return self._send(404, b'')
+        body, modified = server.content(path)
+        etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        last_modified = email.utils.formatdate(modified, usegmt=True)
+        since = self.headers.get('If-Modified-Since')
+        match = self.headers.get('If-None-Match')
+        if match is not None:
+            unchanged = match == etag
+        else:
+            unchanged = since is not None and since == last_modified
+        if unchanged:
+            return self._send(304, b'', etag, last_modified)
+        self._send(200, body, etag, last_modified)
+
+    def _send(self, status, body, etag=None, last_modified=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/csv')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', last_modified)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RecordedFeedServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, root, rows_per_second=None, latency=0.0):
+        super().__init__(address, RecordedFeedHandler)
+        self.root = root
+        self.rows_per_second = rows_per_second  # None serves whole files
+        self.latency = latency  # added to every response, in seconds
+        self.started = time.time()
+        self._cache = {}  # path -> (mtime, lines)
+
+    def content(self, path):
+        """(body, last modified time) of a file as the server should serve it now"""
+        modified = os.stat(path).st_mtime
+        if not self.rows_per_second or not path.endswith('.csv'):
+            with open(path, 'rb') as f:
+                return f.read(), modified
+        cached = self._cache.get(path)
+        if cached is None or cached[0] != modified:
+            with open(path, 'rb') as f:
+                cached = self._cache[path] = (modified, f.read().splitlines(keepends=True))
+        lines = cached[1]
+        elapsed = time.time() - self.started
+        shown = min(len(lines), 1 + int(elapsed * self.rows_per_second))  # the header, then the rows so far
+        # The file last changed when its newest shown row appeared
+        modified = self.started + (shown - 1) / self.rows_per_second if shown < len(lines) else time.time()
+        return b''.join(lines[:shown]), int(modified)
+
+
+def serve(args):
+    server = RecordedFeedServer((args.host, args.port), args.root, args.rows_per_second, args.latency / 1000)
+    print(f'Serving {args.root} on http://{args.host}:{server.server_address[1]}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def bench(args):
+    from datetime import datetime
+
+    feeds = nyiso_feeds(args.base_url)
+    fetcher = FeedFetcher(feeds, args.drop, timeout=args.timeout, deadline=args.deadline, workers=args.workers)
+    day = datetime.strptime(args.date, '%Y%m%d').replace(hour=12) if args.date else datetime.now()
+    ticks, outcomes, latencies, nbytes = [], {}, [], 0
+    started = time.perf_counter()
+    for _ in range(args.ticks):
+        tick_started = time.perf_counter()
+        for result in fetcher.fetch(day):
+            outcomes[result.outcome] = outcomes.get(result.outcome, 0) + 1
+            latencies.append(result.seconds)
+            nbytes += result.nbytes
+        ticks.append(time.perf_counter() - tick_started)
+        if args.interval:
+            time.sleep(args.interval)
+    elapsed = time.perf_counter() - started
+    fetcher.close()
+
+    def percentile(values, q):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(q * len(values)))] * 1000 if values else 0.0
+
+    print(f'{args.ticks} ticks, {len(latencies)} requests in {elapsed:.2f} s '
+          f'({len(latencies) / elapsed:.0f} req/s, {nbytes / 1e6:.1f} MB)')
+    print('outcomes: ' + ', '.join(f'{name}={count}' for name, count in sorted(outcomes.items())))
+    for label, values in (('request', latencies), ('tick', ticks)):
+        print(f'{label} ms: p50 {percentile(values, 0.5):.2f}  p99 {percentile(values, 0.99):.2f}  '
+              f'max {percentile(values, 1.0):.2f}')
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Feed fetcher and a local stand-in feed server')
+    commands = parser.add_subparsers(dest='command', required=True)
+    server = commands.add_parser('serve', help='serve a directory of recorded feed files')
+    server.add_argument('root', help='directory of recorded files, e.g. 20260115realtime_zone.csv')
+    server.add_argument('--host', default='127.0.0.1')
+    server.add_argument('--port', type=int, default=8099)
+    server.add_argument('--rows-per-second', type=float, help='replay CSV rows at this rate instead of whole files')
+    server.add_argument('--latency', type=float, default=0.0, help='milliseconds added to every response')
+    server.set_defaults(run=serve)
+    client = commands.add_parser('bench', help='fetch the NYISO feeds from a base URL repeatedly')
+    client.add_argument('base_url')
+    client.add_argument('--drop', required=True, help='directory to write fetched files to')
+    client.add_argument('--date', help='day to fetch, as YYYYMMDD (default: today)')
+    client.add_argument('--ticks', type=int, default=100)
+    client.add_argument('--interval', type=float, default=0.0, help='seconds between ticks')
+    client.add_argument('--timeout', type=float, default=10.0)
+    client.add_argument('--deadline', type=float, default=1.0)
+    client.add_argument('--workers', type=int, default=8)
+    client.set_defaults(run=bench)
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
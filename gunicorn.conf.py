@@ -0,0 +1,78 @@
+"""Gunicorn settings.
+
+The master starts one tick producer process (``python shared_tick.py``)
+that runs the engine and publishes every tick to shared memory. Workers
+only read that segment, so each one serves the same tick and adding workers
+scales request capacity without adding engine CPU.
+
+The master restarts the producer whenever it exits, backing off while it
+keeps failing. Until a new one publishes, workers answer 503 and /health
+reports unhealthy.
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# aiohttp.GunicornWebWorker, with async_server:create_app as the app, serves from one event loop per worker
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+
+# Named here, before any worker imports the app, so every process agrees on it
+os.environ.setdefault('SHARED_TICK_SEGMENT', f'nyiso-ticks-{os.getpid()}')
+
+PRODUCER_MAX_BACKOFF_SECONDS = 60
+
+_producer = None
+_stopping = False
+
+
+def _start_producer(server):
+    global _producer
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shared_tick.py')
+    _producer = subprocess.Popen([sys.executable, script])
+    server.log.info('Started tick producer (pid %s) for segment %s',
+                    _producer.pid, os.environ['SHARED_TICK_SEGMENT'])
+
+
+def _supervise_producer(server):
+    backoff = 1
+    while True:
+        started = time.monotonic()
+        code = _producer.wait()
+        if _stopping:
+            return
+        if time.monotonic() - started > PRODUCER_MAX_BACKOFF_SECONDS:
+            backoff = 1  # it ran for a while, so this is not a crash loop
+        server.log.error('Tick producer exited with status %s; restarting it in %s s', code, backoff)
+        time.sleep(backoff)
+        if _stopping:
+            return
+        _start_producer(server)
+        backoff = min(backoff * 2, PRODUCER_MAX_BACKOFF_SECONDS)
+
+
+def on_starting(server):
+    _start_producer(server)
+    threading.Thread(target=_supervise_producer, args=(server,), daemon=True, name='producer-supervisor').start()
+
+
+def post_fork(server, worker):
+    # Build the worker's engine (a shared-tick reader here) right after fork,
+    # rather than inheriting anything thread-backed from the master
+    import app
+    app.get_engine()
+
+
+def on_exit(server):
+    global _stopping
+    _stopping = True
+    if _producer is not None and _producer.poll() is None:
+        _producer.terminate()
+        try:
+            _producer.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            _producer.kill()
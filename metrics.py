@@ -0,0 +1,198 @@
+"""Minimal Prometheus-style metrics with lock-free recording.
+
+Counters and histograms are sharded per thread: each recording thread owns a
+private shard that only it writes to, so ``inc`` and ``observe`` take no lock
+and cannot lose updates to a concurrent writer. ``Registry.render`` sums the
+shards into the Prometheus text exposition format (version 0.0.4) when
+scraped. Gauges hold a single value per label set and are set by assignment.
+"""
+import bisect
+import math
+import threading
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') for _, v in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class _Metric:
+    TYPE = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _check(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f'{self.name} takes labels {self.labelnames}, got {labels}')
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.TYPE}']
+        lines.extend(self._samples())
+        return lines
+
+
+class _Sharded(_Metric):
+    """Base for metrics whose state lives in per-thread shards.
+
+    A scrape folds the shards of threads that have exited into ``_retired``
+    and drops them, so a server that starts a thread per request does not
+    accumulate one shard per request it ever served.
+    """
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._local = threading.local()
+        self._shards = []  # (thread, shard) pairs, appended to once per thread; list.append is atomic
+        self._retired = {}  # totals of the shards of exited threads
+        self._collect_lock = threading.Lock()  # taken by scrapes only, never by recording
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            self._shards.append((threading.current_thread(), shard))
+            return shard
+
+    def _fold(self, totals, shard):
+        """Add one shard's state into ``totals``"""
+        raise NotImplementedError
+
+    def _merged(self):
+        """Sum of every shard, keyed by label values"""
+        with self._collect_lock:
+            for pair in list(self._shards):
+                thread, shard = pair
+                if not thread.is_alive():
+                    # Its thread will never write again, so the shard can be folded without racing it
+                    self._fold(self._retired, shard)
+                    self._shards.remove(pair)
+            totals = {}
+            self._fold(totals, self._retired)
+            for _, shard in list(self._shards):
+                self._fold(totals, shard)
+        return totals
+
+
+class Counter(_Sharded):
+    TYPE = 'counter'
+
+    def inc(self, *labels, amount=1):
+        self._check(labels)
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def _fold(self, totals, shard):
+        for labels, value in list(shard.items()):
+            totals[labels] = totals.get(labels, 0) + value
+
+    def value(self, *labels):
+        return self._merged().get(labels, 0)
+
+    def _samples(self):
+        totals = self._merged()
+        if not totals and not self.labelnames:
+            totals[()] = 0  # an unlabelled counter reads 0 rather than missing before its first increment
+        for labels, value in sorted(totals.items()):
+            yield f'{self.name}_total{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+
+
+class Histogram(_Sharded):
+    TYPE = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        self._check(labels)
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # [count per bucket (+Inf last)..., sum]
+            state = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def _fold(self, totals, shard):
+        for labels, state in list(shard.items()):
+            total = totals.setdefault(labels, [0] * len(state))
+            for i, value in enumerate(list(state)):
+                total[i] += value
+
+    def _samples(self):
+        for labels, state in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), state[:-1]):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, [('le', _format_value(bound))])
+                yield f'{self.name}_bucket{le} {cumulative}'
+            label_text = _format_labels(self.labelnames, labels)
+            yield f'{self.name}_sum{label_text} {_format_value(state[-1])}'
+            yield f'{self.name}_count{label_text} {cumulative}'
+
+
+class Gauge(_Metric):
+    TYPE = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def set(self, value, *labels):
+        self._check(labels)
+        self._values[labels] = value
+
+    def replace(self, values):
+        """Swap in a whole {labels: value} mapping at once, dropping label sets that disappeared"""
+        self._values = dict(values)
+
+    def value(self, *labels):
+        return self._values.get(labels)
+
+    def _samples(self):
+        for labels, value in sorted(self._values.items()):
+            yield f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,283 @@
+"""Incremental ingestion of NYISO real-time CSV files from a drop folder.
+
+NYISO publishes one CSV per feed and day (``20260115realtime_zone.csv``,
+``20260115pal.csv``, ``20260115rtfuelmix.csv``, ``20260115damlbmp_zone.csv``)
+and adds a block of rows every five minutes. ``CsvTail`` remembers the byte
+offset it has parsed up to, so each poll reads only what was appended since,
+in fixed-size chunks, and hands complete lines to a dtype-pinned
+``pandas.read_csv``. The cost of a poll depends on the new rows, not on how
+large the day file has grown.
+
+``NyisoIngestor`` joins the feeds into one interval per real-time LBMP time
+stamp, once every zone has a price. Load, day-ahead LBMP and fuel mix are
+taken as of that time stamp (their latest rows at or before it). Zones with
+no day-ahead price yet use their real-time price, and zones with no load
+yet read 0. Time stamps are NYISO's local time, parsed as naive datetimes
+like every other time in the engine. The hour repeated when clocks go back
+comes through twice, its second pass with ``fold=1``, and rows are keyed by
+UTC instant so the two passes stay apart.
+"""
+import bisect
+import io
+import os
+from datetime import timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+CHUNK_BYTES = 1 << 20
+TIME_FORMAT = '%m/%d/%Y %H:%M:%S'
+MARKET_TZ = 'America/New_York'  # NYISO time stamps are Eastern local time
+_MARKET_ZONE = ZoneInfo(MARKET_TZ)
+# NYISO zone names, as they appear in the Name column, for the engine's zones
+ZONE_NAMES = {'N.Y.C.': 'NYC', 'CAPITL': 'CAPITAL', 'CENTRL': 'CENTRAL', 'WEST': 'WEST', 'NORTH': 'NORTH'}
+# Field -> (file name suffix, key column, value column)
+FEEDS = {
+    'rt_price': ('realtime_zone', 'Name', 'LBMP ($/MWHr)'),
+    'da_price': ('damlbmp_zone', 'Name', 'LBMP ($/MWHr)'),
+    'load_mw': ('pal', 'Name', 'Load'),
+    'fuel_mix': ('rtfuelmix', 'Fuel Category', 'Gen MW')
+}
+
+
+class IngestError(Exception):
+    """Raised for a CSV file that does not have the columns its feed needs"""
+
+
+def repeated_hour(stamps, time_zones=None, latest=None):
+    """Mask of the rows in the second pass through the hour repeated when clocks go back.
+
+    ``stamps`` are naive local times. With a Time Zone column those rows are
+    the ambiguous ones marked EST; without one, they are the ambiguous ones
+    from the first time stamp that goes back on. ``latest`` is the newest time
+    stamp read earlier from the same file, with ``fold=1`` once the second
+    pass has begun there.
+    """
+    ambiguous = stamps.dt.tz_localize(MARKET_TZ, ambiguous='NaT', nonexistent='shift_forward').isna().to_numpy()
+    if not ambiguous.any():
+        return ambiguous
+    if time_zones is not None:
+        return ambiguous & (time_zones.to_numpy() == 'EST')
+    if latest is not None and latest.fold:
+        return ambiguous
+    values = stamps.to_numpy().astype(np.int64)
+    start = values[0] if latest is None else latest.value
+    before = np.maximum.accumulate(np.concatenate([[start], values[:-1]]))
+    return ambiguous & np.logical_or.accumulate(values < before)
+
+
+def instant(when):
+    """UTC datetime for a naive local time, honouring ``fold``"""
+    return when.replace(tzinfo=_MARKET_ZONE).astimezone(timezone.utc)
+
+
+def local_time(when):
+    """Naive local time for a UTC datetime, with ``fold=1`` in the second pass through a repeated hour"""
+    return when.astimezone(_MARKET_ZONE).replace(tzinfo=None)
+
+
+class CsvTail:
+    """Parses the rows appended to one CSV file since the last read"""
+
+    def __init__(self, path, key_column, value_column):
+        self.path = path
+        self.key_column = key_column
+        self.value_column = value_column
+        self.offset = 0
+        self.usecols = None  # positions of (time, key, value[, time zone]), from the header
+        self._partial = b''  # an incomplete last line, finished by the next append
+        self._latest = None  # newest time stamp parsed, for spotting the repeated hour
+
+    def read(self):
+        """(times, keys, values) lists for the complete rows appended since the last read"""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return [], [], []
+        times, keys, values = [], [], []
+        with f:
+            if os.fstat(f.fileno()).st_size < self.offset:
+                # Truncated or replaced: start over
+                self.offset, self.usecols, self._partial, self._latest = 0, None, b'', None
+            f.seek(self.offset)
+            while True:
+                chunk = f.read(CHUNK_BYTES)
+                if not chunk:
+                    break
+                data = self._partial + chunk
+                end = data.rfind(b'\n') + 1
+                if end:
+                    # If this raises, the chunk is not consumed and the next read retries it
+                    for column, parsed in zip((times, keys, values), self._parse(data[:end])):
+                        column.extend(parsed)
+                self.offset += len(chunk)
+                self._partial = data[end:]
+        return times, keys, values
+
+    def _parse(self, block):
+        if self.usecols is None:
+            header, _, block = block.partition(b'\n')
+            names = [name.strip().strip('"') for name in header.decode('utf-8-sig').split(',')]
+            try:
+                self.usecols = [names.index(column) for column in ('Time Stamp', self.key_column, self.value_column)]
+            except ValueError:
+                raise IngestError(f'{self.path} lacks one of the columns Time Stamp, {self.key_column}, '
+                                  f'{self.value_column}')
+            if 'Time Zone' in names:
+                self.usecols.append(names.index('Time Zone'))
+            if not block:
+                return [], [], []
+        try:
+            return self._parse_rows(block)
+        except ValueError:
+            pass
+        # Some row is malformed: parse line by line and skip just the bad ones
+        parsed = [], [], []
+        for line in block.splitlines(keepends=True):
+            if not line.strip():
+                continue
+            try:
+                rows = self._parse_rows(line)
+            except ValueError as e:
+                print(f"Skipping malformed row in {self.path}: {line[:200]!r} ({e})")
+                continue
+            for column, values in zip(parsed, rows):
+                column.extend(values)
+        return parsed
+
+    def _parse_rows(self, block):
+        when, key, value = self.usecols[:3]
+        zone = self.usecols[3] if len(self.usecols) > 3 else None
+        dtype = {when: str, key: str, value: 'float64'}
+        if zone is not None:
+            dtype[zone] = str
+        frame = pd.read_csv(io.BytesIO(block), header=None, usecols=self.usecols, dtype=dtype)
+        frame = frame.dropna()
+        stamps = pd.to_datetime(frame[when], format=TIME_FORMAT)
+        repeated = repeated_hour(stamps, None if zone is None else frame[zone], self._latest)
+        times = stamps.dt.to_pydatetime().tolist()
+        for i in np.flatnonzero(repeated).tolist():
+            times[i] = times[i].replace(fold=1)
+        if len(stamps):
+            begun = repeated.any() or (self._latest is not None and self._latest.fold)
+            newest = stamps.max() if self._latest is None else max(self._latest, stamps.max())
+            self._latest = newest.replace(fold=int(begun))
+        return times, frame[key].tolist(), frame[value].tolist()
+
+
+class DailyFeed:
+    """One feed's day files in a directory, read in date order from the newest at startup.
+
+    After moving on to a new day, the previous day's file is still read: rows
+    for its last intervals can land after the new day's file appears (the
+    fetcher keeps refreshing yesterday's files for a while past midnight).
+    """
+
+    def __init__(self, directory, suffix, key_column, value_column):
+        self.directory = directory
+        self.suffix = f'{suffix}.csv'
+        self.key_column = key_column
+        self.value_column = value_column
+        self.tail = None
+        self.previous = None  # the day before the current one
+
+    def _files(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name for name in names if name.endswith(self.suffix) and name[:8].isdigit())
+
+    def read(self):
+        files = self._files()
+        if self.tail is None:
+            if not files:
+                return [], [], []
+            self.tail = CsvTail(os.path.join(self.directory, files[-1]), self.key_column, self.value_column)
+        times, keys, values = [], [], []
+        # Late rows for the previous day, then the rest of the current day, then any newer day files
+        current = os.path.basename(self.tail.path)
+        tails = [self.previous, self.tail] if self.previous is not None else [self.tail]
+        for name in files[bisect.bisect_right(files, current):]:
+            self.previous, self.tail = self.tail, CsvTail(os.path.join(self.directory, name), self.key_column,
+                                                          self.value_column)
+            tails.append(self.tail)
+        for tail in tails:
+            for column, parsed in zip((times, keys, values), tail.read()):
+                column.extend(parsed)
+        return times, keys, values
+
+
+class _Rows:
+    """Parsed rows of one feed, by UTC instant of their time stamp"""
+
+    def __init__(self):
+        self.times = []  # sorted
+        self.rows = {}  # instant -> {key: value}
+
+    def add(self, times, keys, values, names=None):
+        stamp = when = None
+        for local, key, value in zip(times, keys, values):
+            if local != stamp or local.fold != stamp.fold:  # rows come in runs sharing a time stamp
+                stamp, when = local, instant(local)
+            row = self.rows.get(when)
+            if row is None:
+                row = self.rows[when] = {}
+                bisect.insort(self.times, when)
+            row[names.get(key, key) if names else key] = value
+
+    def as_of(self, when):
+        """The newest row at or before ``when``, dropping the rows before it"""
+        i = bisect.bisect_right(self.times, when)
+        if i == 0:
+            return None
+        self.drop_before(self.times[i - 1])
+        return self.rows[self.times[0]]
+
+    def drop_before(self, when, inclusive=False):
+        i = (bisect.bisect_right if inclusive else bisect.bisect_left)(self.times, when)
+        for old in self.times[:i]:
+            del self.rows[old]
+        del self.times[:i]
+
+
+class NyisoIngestor:
+    def __init__(self, directory, zones, zone_names=None):
+        self.directory = directory
+        self.zones = list(zones)
+        self.zone_names = ZONE_NAMES if zone_names is None else zone_names
+        self.feeds = {field: DailyFeed(directory, *spec) for field, spec in FEEDS.items()}
+        self.rows = {field: _Rows() for field in FEEDS}
+        self.last_time = None
+        self._load = [0.0] * len(self.zones)
+
+    def poll(self):
+        """Intervals completed since the last poll, oldest first, as dicts of time, zone lists and fuel mix"""
+        for field, feed in self.feeds.items():
+            self.rows[field].add(*feed.read(), names=None if field == 'fuel_mix' else self.zone_names)
+
+        prices = self.rows['rt_price']
+        intervals = []
+        last = None if self.last_time is None else instant(self.last_time)
+        for when in list(prices.times):
+            row = prices.rows[when]
+            if (last is not None and when <= last) or any(zone not in row for zone in self.zones):
+                continue
+            rt_price = [row[zone] for zone in self.zones]
+            da = self.rows['da_price'].as_of(when) or {}
+            load = self.rows['load_mw'].as_of(when) or {}
+            self._load = [load.get(zone, previous) for zone, previous in zip(self.zones, self._load)]
+            intervals.append({
+                'time': local_time(when),
+                'rt_price': rt_price,
+                'da_price': [da.get(zone, price) for zone, price in zip(self.zones, rt_price)],
+                'load_mw': list(self._load),
+                'fuel_mix': dict(self.rows['fuel_mix'].as_of(when) or {})
+            })
+            last = when
+        if last is not None:
+            self.last_time = local_time(last)
+            # Emitted intervals are done with, and one older that is still missing zones never completes
+            prices.drop_before(last, inclusive=True)
+        return intervals
@@ -0,0 +1,133 @@
+"""Drift-free, multi-cadence stage scheduler.
+
+Each stage has its own interval and an absolute deadline on the monotonic
+clock. Deadlines advance by whole intervals from where they started, never
+from when a run happened to finish, so a stage's run time does not push its
+schedule later.
+
+A stage names the stages it reads from. It only reruns when at least one of
+those inputs has produced a new version since its last run; a stage with no
+inputs runs at every deadline. Stages must be listed after their inputs.
+A stage that finds nothing new (say, a poll that read no data) returns
+``UNCHANGED`` to keep its previous value and version.
+
+When a stage falls behind (its deadline passed by one or more whole
+intervals), the overrun policy decides what happens to the missed slots:
+
+``skip``      drop them and resume at the next slot on the original grid
+``catch_up``  run them back to back, up to ``max_catch_up`` slots behind;
+              further behind than that, the rest are dropped as with skip
+"""
+import time
+
+SKIP = 'skip'
+CATCH_UP = 'catch_up'
+POLICIES = (SKIP, CATCH_UP)
+UNCHANGED = object()
+
+
+class Stage:
+    def __init__(self, name, interval, func, inputs=(), value=None):
+        if interval <= 0:
+            raise ValueError(f'Stage {name} needs a positive interval, got {interval}')
+        self.name = name
+        self.interval = interval
+        self.func = func  # called with the current value of each input, in order
+        self.inputs = tuple(inputs)
+        self.value = value
+        self.version = 0
+        self.deadline = None
+        self.input_versions = None  # versions of the inputs used by the last run
+
+
+class Scheduler:
+    def __init__(self, stages, policy=SKIP, max_catch_up=3, clock=time.monotonic,
+                 on_error=None, on_missed=None):
+        if policy not in POLICIES:
+            raise ValueError(f'Unknown overrun policy {policy!r}; expected one of {POLICIES}')
+        self.stages = {}
+        for stage in stages:
+            for name in stage.inputs:
+                if name not in self.stages:
+                    raise ValueError(f'Stage {stage.name} reads {name}, which must be listed before it')
+            self.stages[stage.name] = stage
+        self.policy = policy
+        self.max_catch_up = max_catch_up
+        self.clock = clock
+        self.on_error = on_error  # called with (stage, exception) when a stage raises
+        self.on_missed = on_missed  # called with (stage, slots) when slots are dropped
+
+    def __getitem__(self, name):
+        return self.stages[name]
+
+    def start(self, now=None):
+        """Put every stage's first deadline one interval from now"""
+        now = self.clock() if now is None else now
+        for stage in self.stages.values():
+            stage.deadline = now + stage.interval
+
+    def next_deadline(self):
+        return min(stage.deadline for stage in self.stages.values())
+
+    def sleep_until_due(self):
+        delay = self.next_deadline() - self.clock()
+        if delay > 0:
+            time.sleep(delay)
+
+    def run_pending(self, now=None):
+        """Run every stage that is due and has new inputs; returns the names of the stages that ran"""
+        now = self.clock() if now is None else now
+        ran = []
+        # Insertion order is dependency order, so a stage sees inputs refreshed earlier in this pass
+        for stage in self.stages.values():
+            if now < stage.deadline:
+                continue
+            self._advance(stage, now)
+            if self._inputs_changed(stage) and self.run(stage):
+                ran.append(stage.name)
+        return ran
+
+    def run_all(self, values=None):
+        """Run every stage now, whatever its deadline or inputs; ``values`` supplies outputs to use instead"""
+        values = values or {}
+        for stage in self.stages.values():
+            if stage.name in values:
+                self._store(stage, values[stage.name])
+            else:
+                self.run(stage)
+        return list(self.stages)
+
+    def run(self, stage):
+        args = [self.stages[name].value for name in stage.inputs]
+        try:
+            value = stage.func(*args)
+        except Exception as e:
+            if self.on_error is None:
+                raise
+            self.on_error(stage, e)
+            return False
+        if value is UNCHANGED:
+            return False
+        self._store(stage, value)
+        return True
+
+    def _store(self, stage, value):
+        stage.value = value
+        stage.version += 1
+        stage.input_versions = self._input_versions(stage)
+
+    def _input_versions(self, stage):
+        return tuple(self.stages[name].version for name in stage.inputs)
+
+    def _inputs_changed(self, stage):
+        return not stage.inputs or stage.input_versions != self._input_versions(stage)
+
+    def _advance(self, stage, now):
+        """Move a due stage's deadline to its next slot on the original grid, applying the overrun policy"""
+        missed = int((now - stage.deadline) // stage.interval)
+        if self.policy == CATCH_UP and missed <= self.max_catch_up:
+            stage.deadline += stage.interval
+            return
+        stage.deadline += (missed + 1) * stage.interval
+        if missed and self.on_missed is not None:
+            self.on_missed(stage, missed)
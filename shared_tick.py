@@ -0,0 +1,212 @@
+"""Shared-memory transport for publishing engine ticks to web workers.
+
+A single producer process owns the engine and writes every tick into one
+``multiprocessing.shared_memory`` segment; each gunicorn worker attaches to
+the same segment and serves whatever tick is current. The segment holds:
+
+    [header: magic, sizes, JSON layout]
+    [history region: raw buffer for the producer's price and alert histories]
+    [control: generation counter, producer heartbeat]
+    [slot 0][slot 1]      double-buffered tick frames
+
+A frame is a set of named byte strings (the pre-serialized API payloads).
+The writer fills the slot that readers are not currently directed to, then
+bumps the generation. Each slot carries a sequence word that is odd while it
+is being written, so a reader that was lapped mid-copy notices and retries.
+
+The producer stamps the heartbeat every ``HEARTBEAT_SECONDS`` while its
+engine is running. A restarted producer creates a new segment under the same
+name (the layout's ``created`` time tells them apart), and readers that find
+the old one's heartbeat stale attach to it.
+"""
+import itertools
+import json
+import os
+import signal
+import struct
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+MAGIC = b'NYSHM001'
+ALIGN = 4096
+SLOT_SIZE = int(os.environ.get('SHARED_TICK_SLOT_BYTES', 8 * 1024 * 1024))
+# How long a reader retries shared state that stays mid-update before giving up on its writer
+READ_TIMEOUT_SECONDS = float(os.environ.get('SHARED_TICK_READ_TIMEOUT_SECONDS', 1))
+HEARTBEAT_SECONDS = 1.0
+_U64 = struct.Struct('<Q')
+_F64 = struct.Struct('<d')
+
+
+class ProducerUnavailable(Exception):
+    """Raised when the tick producer has not published yet, or has stopped"""
+
+
+def read_attempts(what, timeout=None):
+    """Attempt numbers for a lock-free read that retries while its writer is mid-update.
+
+    The first retries only yield the GIL, later ones back off up to 10 ms, and
+    after ``timeout`` seconds without a clean read ProducerUnavailable is
+    raised: a writer that never finishes an update has died part way through.
+    """
+    deadline = time.monotonic() + (READ_TIMEOUT_SECONDS if timeout is None else timeout)
+    for attempt in itertools.count():
+        if attempt:
+            if time.monotonic() > deadline:
+                raise ProducerUnavailable(f'{what} stayed mid-update; its writer may have died')
+            time.sleep(0 if attempt <= 3 else min(0.0001 * 2 ** attempt, 0.01))
+        yield attempt
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def encode_frame(parts):
+    """Pack {name: bytes} into one buffer: JSON index of (offset, length) followed by the blobs"""
+    index, offset = {}, 0
+    for name, blob in parts.items():
+        index[name] = (offset, len(blob))
+        offset += len(blob)
+    head = json.dumps(index).encode()
+    return _U64.pack(len(head)) + head + b''.join(parts.values())
+
+
+def decode_frame(frame):
+    (head_len,) = _U64.unpack_from(frame, 0)
+    start = _U64.size + head_len
+    index = json.loads(frame[_U64.size:start])
+    return {name: frame[start + offset:start + offset + length] for name, (offset, length) in index.items()}
+
+
+class SharedTickSegment:
+    def __init__(self, shm, layout, owner):
+        self.shm = shm
+        self.layout = layout
+        self.owner = owner
+        self.buf = shm.buf
+        self.history_buffer = self.buf[layout['history_offset']:layout['history_offset'] + layout['history_nbytes']]
+        self._control = layout['slots_offset']
+        self._slots = [self._control + ALIGN + i * _align(layout['slot_size'] + 2 * _U64.size)
+                       for i in range(2)]
+
+    @classmethod
+    def create(cls, name, layout, history_nbytes, slot_size=SLOT_SIZE):
+        """Create (replacing any stale segment of the same name) and size the segment"""
+        layout = dict(layout, history_nbytes=history_nbytes, slot_size=slot_size, created=time.time())
+        # The offsets below add well under 256 bytes of JSON to the header
+        header_size = _align(3 * _U64.size + len(json.dumps(layout)) + 256)
+        layout.update(history_offset=header_size, slots_offset=header_size + _align(history_nbytes))
+        head = json.dumps(layout).encode()
+        size = layout['slots_offset'] + ALIGN + 2 * _align(slot_size + 2 * _U64.size)
+
+        try:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        shm.buf[:len(MAGIC)] = MAGIC
+        _U64.pack_into(shm.buf, 8, header_size)
+        _U64.pack_into(shm.buf, 16, len(head))
+        shm.buf[24:24 + len(head)] = head
+        segment = cls(shm, layout, owner=True)
+        segment.beat()
+        return segment
+
+    @classmethod
+    def attach(cls, name, timeout=30.0):
+        """Attach to a segment created by the producer, waiting for it to appear"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+                break
+            except FileNotFoundError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.1)
+        # Readers must not unlink the producer's segment when they exit (bpo-39959)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        if bytes(shm.buf[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f'{name} is not a shared tick segment')
+        (head_len,) = _U64.unpack_from(shm.buf, 16)
+        layout = json.loads(bytes(shm.buf[24:24 + head_len]))
+        return cls(shm, layout, owner=False)
+
+    def generation(self):
+        return _U64.unpack_from(self.buf, self._control)[0]
+
+    def beat(self):
+        """Record that the producer is alive"""
+        _F64.pack_into(self.buf, self._control + _U64.size, time.time())
+
+    def heartbeat_age(self):
+        """Seconds since the producer last showed it was alive"""
+        return time.time() - _F64.unpack_from(self.buf, self._control + _U64.size)[0]
+
+    def write_frame(self, parts):
+        """Publish one frame; only the single producer may call this"""
+        frame = encode_frame(parts)
+        if len(frame) > self.layout['slot_size']:
+            raise ValueError(f'Tick frame of {len(frame)} bytes exceeds SHARED_TICK_SLOT_BYTES')
+        generation = self.generation() + 1
+        slot = self._slots[generation % 2]
+        _U64.pack_into(self.buf, slot, 2 * generation - 1)  # odd: slot is being written
+        _U64.pack_into(self.buf, slot + _U64.size, len(frame))
+        data = slot + 2 * _U64.size
+        self.buf[data:data + len(frame)] = frame
+        _U64.pack_into(self.buf, slot, 2 * generation)
+        _U64.pack_into(self.buf, self._control, generation)
+        self.beat()
+
+    def read_frame(self):
+        """Copy out the current frame; returns (generation, {name: bytes}) or (0, None) before the first tick"""
+        for _ in read_attempts('The shared tick frame'):
+            generation = self.generation()
+            if generation == 0:
+                return 0, None
+            slot = self._slots[generation % 2]
+            seq = _U64.unpack_from(self.buf, slot)[0]
+            if seq != 2 * generation:
+                continue  # the producer has already moved on to this slot; re-read the generation
+            (length,) = _U64.unpack_from(self.buf, slot + _U64.size)
+            data = slot + 2 * _U64.size
+            frame = bytes(self.buf[data:data + length])
+            if _U64.unpack_from(self.buf, slot)[0] == seq:
+                return generation, decode_frame(frame)
+
+    def close(self):
+        if self.owner:
+            self.shm.unlink()
+        try:
+            self.history_buffer.release()
+            self.shm.close()
+        except BufferError:
+            pass  # history arrays still view the mapping; it is released with the process
+
+
+def main():
+    """Run the tick producer: one engine whose ticks every web worker reads"""
+    if not os.environ.get('SHARED_TICK_SEGMENT'):
+        raise SystemExit('SHARED_TICK_SEGMENT must name the shared memory segment to publish to')
+    os.environ['SHARED_TICK_ROLE'] = 'producer'
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    import app
+    engine = app.get_engine()
+    segment = engine.shared_publisher.segment
+    print(f"Tick producer publishing to shared memory segment {os.environ['SHARED_TICK_SEGMENT']}")
+    try:
+        while engine.health_problem() is None:
+            segment.beat()
+            time.sleep(HEARTBEAT_SECONDS)
+        # Exiting lets the gunicorn master start a fresh producer
+        raise SystemExit(f'Tick producer stopping: {engine.health_problem()}')
+    finally:
+        segment.close()
+
+
+if __name__ == '__main__':
+    main()
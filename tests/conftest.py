@@ -0,0 +1,5 @@
+"""Run with ``python -m pytest`` from the repository root; the modules under test live there."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from alert_lifecycle import ACKNOWLEDGED, OPEN, RATE_HOLD_SECONDS, AlertBook, AlertHistory
+from alert_rules import RuleIndex, validate
+
+ZONES = ['NYC', 'WEST']
+HUBS = ['Transco Z6 NY']
+
+
+def tick(nyc, west=30.0):
+    return SimpleNamespace(electricity={'rt_price': np.array([nyc, west])}, natural_gas={'price': np.array([3.0])},
+                           henry_hub=3.0, avg_spark_spread=10.0)
+
+
+def book_for(*specs):
+    index = RuleIndex([dict(validate(spec), id=i) for i, spec in enumerate(specs, 1)], ZONES, HUBS)
+    book = AlertBook(AlertHistory(16))
+
+    def step(now, *prices):
+        return book.update(index, index.evaluate(tick(*prices)), now)
+    return book, step
+
+
+def test_threshold_alert_holds_until_back_past_its_hysteresis():
+    book, step = book_for({'series': 'NYC:rt_price', 'op': 'above', 'level': 100, 'hysteresis': 5,
+                           'severity': 'HIGH', 'name': 'spike'})
+    assert step(0, 90.0) == []
+    alerts = step(5, 110.0)
+    assert [(alert['type'], alert['state'], alert['value']) for alert in alerts] == [('spike', OPEN, 110.0)]
+    assert step(10, 120.0)[0]['max_value'] == 120.0
+    alerts = step(15, 98.0)  # no longer firing, but within 5 of the level
+    assert len(alerts) == 1 and alerts[0]['value'] == 98.0
+    assert step(20, 96.0) != []
+    assert step(25, 95.0) == []  # back past the margin
+    resolved = book.history.query()
+    assert len(resolved) == 1 and resolved[0]['max_value'] == 120.0
+
+
+def test_refiring_inside_the_margin_keeps_one_alert():
+    book, step = book_for({'series': 'NYC:rt_price', 'op': 'above', 'level': 100, 'hysteresis': 5, 'name': 'spike'})
+    first = step(0, 101.0)[0]['id']
+    step(5, 99.0)
+    assert step(10, 102.0)[0]['id'] == first
+    assert book.history.count == 0
+
+
+def test_below_rule_clears_by_percent_of_level():
+    book, step = book_for({'series': 'NYC:rt_price', 'op': 'below', 'level': 50, 'name': 'slump'})
+    assert len(step(0, 40.0)) == 1
+    assert len(step(5, 50.5)) == 1  # default margin is 2% of 50
+    assert step(10, 51.0) == []
+
+
+def test_rate_of_change_alert_holds_for_a_fixed_time():
+    book, step = book_for({'kind': 'rate_of_change', 'series': 'NYC:rt_price', 'op': 'above', 'level': 20,
+                           'name': 'jump'})
+    step(0, 50.0)
+    assert len(step(5, 70.0)) == 1
+    assert len(step(5 + RATE_HOLD_SECONDS - 1, 70.0)) == 1
+    assert step(5 + RATE_HOLD_SECONDS, 70.0) == []
+
+
+def test_escalation_reopens_an_acknowledged_alert():
+    book, step = book_for({'series': 'NYC:rt_price', 'level': 100, 'severity': 'MEDIUM', 'name': 'spike'},
+                          {'series': 'NYC:rt_price', 'level': 150, 'severity': 'HIGH', 'name': 'spike'})
+    alert_id = step(0, 120.0)[0]['id']
+    assert book.acknowledge(alert_id, 1)
+    assert step(2, 125.0)[0]['state'] == ACKNOWLEDGED
+    alerts = step(4, 160.0)
+    assert [(alert['id'], alert['state'], alert['severity']) for alert in alerts] == [(alert_id, OPEN, 'HIGH')]
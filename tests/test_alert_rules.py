@@ -0,0 +1,123 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from alert_rules import RuleError, RuleIndex, default_rules, series_names, validate
+
+ZONES = ['NYC', 'WEST', 'CAPITAL']
+HUBS = ['Transco Z6 NY', 'Dominion South']
+LEVELS = [-5.0, 0.0, 2.0, 5.0, 10.0, 20.0, 50.0]
+
+
+def market(rng, previous=None):
+    """A tick over a small grid of values, so levels are often hit exactly; about half the values move"""
+    def column(shape):
+        return rng.choice(LEVELS, shape)
+
+    tick = SimpleNamespace(
+        electricity={field: column(len(ZONES)) for field in ('rt_price', 'da_price', 'load_mw')},
+        natural_gas={field: column(len(HUBS)) for field in ('price', 'volatility')},
+        henry_hub=float(column(1)[0]), avg_spark_spread=float(column(1)[0]))
+    if previous is not None:
+        for group in ('electricity', 'natural_gas'):
+            for field, values in getattr(tick, group).items():
+                keep = rng.random(len(values)) < 0.5
+                values[keep] = getattr(previous, group)[field][keep]
+        if rng.random() < 0.5:
+            tick.henry_hub = previous.henry_hub
+    return tick
+
+
+def value_of(tick, series):
+    entity, _, field = series.rpartition(':')
+    if not entity:
+        return getattr(tick, field)
+    if entity in ZONES:
+        return float(tick.electricity[field][ZONES.index(entity)])
+    return float(tick.natural_gas[field][HUBS.index(entity)])
+
+
+def naive_firing(rules, tick, previous):
+    """Each rule checked on its own, the way the index is meant to behave"""
+    firing = {}
+    for rule in rules:
+        value = value_of(tick, rule['series'])
+        if rule['kind'] == 'band':
+            fired = value < rule['low'] or value > rule['high']
+        elif rule['kind'] == 'threshold':
+            fired = value > rule['level'] if rule['op'] == 'above' else value < rule['level']
+        else:
+            before = None if previous is None else value_of(previous, rule['series'])
+            if not before or before == value:
+                fired = False
+            else:
+                change = round((value - before) / abs(before) * 100, 4)
+                fired = change > rule['level'] if rule['op'] == 'above' else change < rule['level']
+        if fired:
+            firing.setdefault(rule['series'], {})[rule['id']] = value
+    return firing
+
+
+def random_rules(rng, count):
+    watched = ['NYC:rt_price', 'WEST:rt_price', 'CAPITAL:load_mw', 'NYC:da_price', 'Transco Z6 NY:price',
+               'Dominion South:volatility', 'henry_hub', 'avg_spark_spread']
+    rules = []
+    for rule_id in range(count):
+        kind = rng.choice(['threshold', 'rate_of_change', 'band'])
+        spec = {'kind': kind, 'series': rng.choice(watched), 'name': f'rule {rule_id}'}
+        if kind == 'band':
+            spec['low'], spec['high'] = sorted(rng.choice(LEVELS, 2).tolist())
+        elif kind == 'threshold':
+            spec['op'], spec['level'] = rng.choice(['above', 'below']), float(rng.choice(LEVELS))
+        else:
+            spec['op'], spec['level'] = rng.choice(['above', 'below']), float(rng.choice([-50.0, 0.0, 25.0, 100.0]))
+        rules.append(dict(validate(spec, series_names(ZONES, HUBS)), id=rule_id))
+    return rules
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_index_matches_naive_evaluation(seed):
+    rng = np.random.default_rng(seed)
+    rules = random_rules(rng, 60)
+    index = RuleIndex(rules, ZONES, HUBS)
+    previous = None
+    for _ in range(200):
+        tick = market(rng, previous)
+        before = dict(index.firing)
+        updated = index.evaluate(tick)
+        expected = naive_firing(rules, tick, previous)
+        assert index.firing == expected
+        # Exactly the series whose firing entry changed are reported
+        changed = {series for series in set(before) | set(expected) if before.get(series) != expected.get(series)}
+        assert changed <= set(updated)
+        previous = tick
+
+
+def test_unknown_series_are_set_aside():
+    rules = [dict(validate({'series': 'NOWHERE:rt_price', 'level': 1}), id=1),
+             dict(validate({'series': 'NYC:rt_price', 'level': 1}), id=2)]
+    index = RuleIndex(rules, ZONES, HUBS)
+    assert index.unknown == {'NOWHERE:rt_price'}
+    assert len(index) == 2
+
+
+def test_default_rules_validate():
+    known = series_names(ZONES, HUBS)
+    for spec in default_rules(ZONES):
+        validate(spec, known)
+
+
+@pytest.mark.parametrize('spec', [
+    {'series': 'NYC:rt_price'},
+    {'series': 'NYC:rt_price', 'level': 'x'},
+    {'series': 'NYC:rt_price', 'level': float('inf')},
+    {'series': 'NYC:rt_price', 'level': 1, 'op': 'sideways'},
+    {'series': 'NYC:rt_price', 'kind': 'band', 'low': 5, 'high': 1},
+    {'series': 'NYC:rt_price', 'level': 1, 'hysteresis': -1},
+    {'series': 'NYC:rt_price', 'level': 1, 'name': '<img src=x onerror=alert(1)>'},
+    {'series': 'NYC:rt_price', 'level': 1, 'message': 'price is <b>high</b>'},
+])
+def test_malformed_rules_are_rejected(spec):
+    with pytest.raises(RuleError):
+        validate(spec, series_names(ZONES, HUBS))
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+import app
+
+pytest.importorskip('aiohttp')
+from aiohttp.test_utils import TestClient, TestServer  # noqa: E402
+
+import async_server  # noqa: E402
+
+HEADERS = [
+    {}, {'Accept-Encoding': 'gzip'}, {'Accept-Encoding': 'GZIP'}, {'Accept-Encoding': 'gzip;q=0'},
+    {'Accept-Encoding': '*'}, {'Accept-Encoding': '*;q=0, identity'}, {'Accept-Encoding': 'br, gzip;q=0.5'},
+    {'Accept-Encoding': 'identity'}, {'If-None-Match': '*'}, {'If-None-Match': '"stale"'},
+]
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = app.simulate(8, 5)
+    monkeypatch.setattr(app, '_engine', engine)
+    return engine
+
+
+def summary(status, headers, body):
+    return (status, headers.get('ETag'), headers.get('Content-Encoding'), headers.get('Vary'),
+            headers.get('Cache-Control'), headers.get('Location'), None if status == 302 else body)
+
+
+def fetch_both(paths_and_headers):
+    """(Flask, aiohttp) summaries of the same GETs"""
+    flask = app.app.test_client()
+    expected = []
+    for path, headers in paths_and_headers:
+        response = flask.get(path, headers=headers)
+        expected.append(summary(response.status_code, response.headers, response.data))
+
+    async def run():
+        client = TestClient(TestServer(await async_server.create_app()), auto_decompress=False,
+                            skip_auto_headers=['Accept-Encoding'])
+        await client.start_server()
+        try:
+            actual = []
+            for path, headers in paths_and_headers:
+                response = await client.get(path, headers=headers, allow_redirects=False)
+                actual.append(summary(response.status, response.headers, await response.read()))
+            return actual
+        finally:
+            await client.close()
+    return expected, asyncio.run(run())
+
+
+def test_cached_json_negotiation_matches_flask(engine):
+    etag = engine.snapshot.payload('predictions').etag
+    conditional = [{'If-None-Match': f'"{etag}"'}, {'If-None-Match': f'W/"{etag}"'},
+                   {'If-None-Match': f'"other", "{etag}"'},
+                   {'Accept-Encoding': 'gzip', 'If-None-Match': f'"{etag}-gzip"'},
+                   {'Accept-Encoding': 'gzip', 'If-None-Match': f'"{etag}"'}]
+    requests = [('/api/predictions', headers) for headers in HEADERS + conditional]
+    expected, actual = fetch_both(requests)
+    for (_, headers), flask_response, aiohttp_response in zip(requests, expected, actual):
+        assert aiohttp_response == flask_response, headers
+    assert [response[0] for response in expected[-5:]] == [304] * 5
+
+
+def test_dashboard_asset_negotiation_matches_flask(engine):
+    asset = app.get_dashboard_asset()
+    requests = [(asset.url, headers) for headers in HEADERS + [{'If-None-Match': f'"{asset.digest}-br"',
+                                                              'Accept-Encoding': 'br'}]]
+    requests.append(('/assets/dashboard-0000.html', {}))  # an old digest redirects to the current one
+    expected, actual = fetch_both(requests)
+    for (_, headers), flask_response, aiohttp_response in zip(requests, expected, actual):
+        assert aiohttp_response == flask_response, headers
@@ -0,0 +1,101 @@
+import json
+import os
+import zipfile
+from concurrent.futures import Future
+
+import numpy as np
+
+import backfill
+from tick_store import TickStore
+
+ZONES = ['WEST', 'NYC']
+HUBS = ['Transco Z6 NY']
+
+
+def write_zip(path, members):
+    with zipfile.ZipFile(path, 'w') as archive:
+        for name, text in members.items():
+            archive.writestr(name, text)
+
+
+def day_csv(day, price):
+    lines = ['"Time Stamp","Name","PTID","LBMP ($/MWHr)"']
+    for minute in (0, 5):
+        lines += [f'"01/{day:02d}/2026 09:{minute:02d}:00","{name}",1,{price + minute}' for name in ('WEST', 'N.Y.C.')]
+    return '\n'.join(lines) + '\n'
+
+
+def archive_dir(tmp_path):
+    directory = tmp_path / 'archives'
+    directory.mkdir()
+    write_zip(directory / '20260101realtime_zone_csv.zip',
+              {f'202601{day:02d}realtime_zone.csv': day_csv(day, 10.0 * day) for day in (1, 2)})
+    return str(directory)
+
+
+def test_month_writes_day_segments_and_a_marker(tmp_path):
+    archives = backfill.find_archives(archive_dir(tmp_path))
+    store_dir = str(tmp_path / 'store')
+    os.makedirs(os.path.join(store_dir, backfill.MARKER_DIR))
+    assert backfill.backfill_month('202601', archives['202601'], store_dir, ZONES, HUBS) == ('202601', 2, 4)
+    with open(backfill.marker_path(store_dir, '202601')) as f:
+        assert json.load(f)['days'] == 2
+    records = TickStore(store_dir, ZONES, HUBS).read_day('20260102')
+    assert records['rt_price'].tolist() == [[20.0, 20.0], [25.0, 25.0]]
+    assert np.isnan(records['henry_hub']).all()
+
+
+def test_existing_segments_are_not_overwritten(tmp_path):
+    archives = backfill.find_archives(archive_dir(tmp_path))
+    store_dir = str(tmp_path / 'store')
+    os.makedirs(os.path.join(store_dir, backfill.MARKER_DIR))
+    store = TickStore(store_dir, ZONES, HUBS)
+    store.write_segment(store.segment_path('20260101'), np.zeros(1, dtype=store.dtype))  # e.g. from the live engine
+    assert backfill.backfill_month('202601', archives['202601'], store_dir, ZONES, HUBS) == ('202601', 1, 2)
+    assert len(store.read_day('20260101')) == 1
+
+
+class ImmediatePool:
+    """Stands in for the process pool, running each task as it is submitted"""
+
+    def __init__(self, max_workers):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, func, *args):
+        future = Future()
+        future.set_result(func(*args))
+        return future
+
+
+def test_rerun_skips_months_with_a_marker(tmp_path, monkeypatch):
+    directory = archive_dir(tmp_path)
+    store_dir = str(tmp_path / 'store')
+    calls = []
+    monkeypatch.setattr(backfill, 'backfill_month', lambda month, *args: calls.append(month) or (month, 0, 0))
+    monkeypatch.setattr(backfill, 'ProcessPoolExecutor', ImmediatePool)
+    os.makedirs(os.path.join(store_dir, backfill.MARKER_DIR))
+    open(backfill.marker_path(store_dir, '202601'), 'w').close()
+    assert backfill.main([directory, '--store', store_dir]) == 0
+    assert calls == []
+    os.remove(backfill.marker_path(store_dir, '202601'))
+    assert backfill.main([directory, '--store', store_dir]) == 0
+    assert calls == ['202601']
+
+
+def test_repeated_fall_back_hour_is_kept_apart(tmp_path):
+    lines = ['"Time Stamp","Time Zone","Name","PTID","LBMP ($/MWHr)"']
+    for zone, price in (('EDT', 1.0), ('EST', 2.0)):
+        lines += [f'"11/01/2026 01:00:00","{zone}","{name}",1,{price}' for name in ('WEST', 'N.Y.C.')]
+    path = tmp_path / '20261101realtime_zone_csv.zip'
+    write_zip(path, {'20261101realtime_zone.csv': '\n'.join(lines) + '\n'})
+    with zipfile.ZipFile(path) as archive:
+        parsed = backfill.read_member(archive, '20261101realtime_zone.csv', 'Name', 'LBMP ($/MWHr)')
+    times, matrix = backfill.pivot(*parsed, {'WEST': 0, 'N.Y.C.': 1}, 2)
+    assert len(times) == 2 and np.diff(times)[0] == np.timedelta64(1, 'h')  # 05:00 and 06:00 UTC
+    assert matrix.tolist() == [[1.0, 1.0], [2.0, 2.0]]
@@ -0,0 +1,92 @@
+import os
+import threading
+from datetime import datetime
+
+import pytest
+import requests
+
+import feed_fetch
+from feed_fetch import FeedFetcher, RecordedFeedServer
+
+NOON = datetime(2026, 1, 15, 12)
+
+
+@pytest.fixture
+def server(tmp_path):
+    root = tmp_path / 'recorded'
+    root.mkdir()
+    server = RecordedFeedServer(('127.0.0.1', 0), str(root))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def outcomes(fetcher, now=NOON):
+    return sorted(result.outcome for result in fetcher.fetch(now, deadline=10))
+
+
+def test_unchanged_files_cost_a_304(server, tmp_path):
+    recorded = os.path.join(server.root, '20260115realtime_zone.csv')
+    with open(recorded, 'w') as f:
+        f.write('"Time Stamp","Name","PTID","LBMP ($/MWHr)"\n')
+    drop = str(tmp_path / 'drop')
+    url = f'http://127.0.0.1:{server.server_address[1]}/{{date}}realtime_zone.csv'
+    fetcher = FeedFetcher({'rt_price': url}, drop)
+    try:
+        assert outcomes(fetcher) == [feed_fetch.UPDATED]
+        assert fetcher.validators[url.format(date='20260115')].etag
+        assert outcomes(fetcher) == [feed_fetch.NOT_MODIFIED]
+        with open(recorded, 'a') as f:
+            f.write('"01/15/2026 12:00:00","WEST",61761,30.5\n')
+        assert outcomes(fetcher) == [feed_fetch.UPDATED]
+        with open(os.path.join(drop, '20260115realtime_zone.csv')) as f:
+            assert f.read().endswith('30.5\n')
+        assert outcomes(fetcher, datetime(2026, 1, 16, 12)) == [feed_fetch.MISSING]  # not published yet
+        assert list(fetcher.validators) == [url.format(date='20260116')]  # the past day's are dropped
+    finally:
+        fetcher.close()
+
+
+class FailingSession(requests.Session):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        raise requests.ConnectionError('refused')
+
+
+def test_failing_feed_backs_off_exponentially(tmp_path, monkeypatch):
+    monkeypatch.setattr(feed_fetch.random, 'uniform', lambda low, high: high)
+    clock = [100.0]
+    session = FailingSession()
+    fetcher = FeedFetcher({'rt_price': 'http://feeds.invalid/{date}realtime_zone.csv'}, str(tmp_path),
+                          backoff=2, max_backoff=5, session=session, clock=lambda: clock[0])
+    try:
+        assert outcomes(fetcher) == [feed_fetch.ERROR]
+        assert fetcher.retry_at['rt_price'] == 102
+        clock[0] = 101.9
+        assert outcomes(fetcher) == []  # still backing off: not requested
+        assert session.calls == 1
+        clock[0] = 102
+        assert outcomes(fetcher) == [feed_fetch.ERROR]
+        assert fetcher.retry_at['rt_price'] == 106  # doubled
+        clock[0] = 106
+        outcomes(fetcher)
+        assert fetcher.retry_at['rt_price'] == 111  # capped at max_backoff
+        assert fetcher.failures['rt_price'] == 3
+    finally:
+        fetcher.close()
+
+
+def test_yesterdays_files_are_fetched_just_after_midnight(tmp_path):
+    fetcher = FeedFetcher({'rt_price': 'http://feeds.invalid/{date}.csv'}, str(tmp_path), rollover_seconds=900)
+    try:
+        assert [url for _, url in fetcher.urls(datetime(2026, 1, 15, 0, 10))] == [
+            'http://feeds.invalid/20260114.csv', 'http://feeds.invalid/20260115.csv']
+        assert [url for _, url in fetcher.urls(datetime(2026, 1, 15, 0, 20))] == ['http://feeds.invalid/20260115.csv']
+    finally:
+        fetcher.close()
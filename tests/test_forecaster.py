@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import app
+from app import OnlineForecaster
+
+START = datetime(2026, 1, 5).timestamp()
+STEP = 300
+
+
+def observation(rng, k):
+    hour = datetime.fromtimestamp(START + STEP * k).hour
+    return np.array([50.0, 80.0, 20.0]) + np.array([10.0, 5.0, 2.0]) * np.sin(2 * np.pi * hour / 24) \
+        + rng.normal(0, [2.0, 1.0, 0.5])
+
+
+def test_one_step_intervals_hit_their_target_coverage():
+    rng = np.random.default_rng(0)
+    forecaster = OnlineForecaster(3)
+    hits = []
+    for k in range(10 * 288):
+        values = observation(rng, k)
+        if k >= 5 * 288:
+            _, lower, upper = forecaster.forecast(0, START + STEP * k)
+            hits.append((lower <= values) & (values <= upper))
+        forecaster.update(values, START + STEP * k)
+    assert np.all(np.abs(np.mean(hits, axis=0) - 0.9) < 0.04)
+    assert np.all(np.abs(forecaster.coverage - 0.9) < 0.08)
+
+
+def test_intervals_widen_with_horizon_but_stay_bounded():
+    rng = np.random.default_rng(1)
+    forecaster = OnlineForecaster(3)
+    for k in range(3 * 288):
+        forecaster.update(observation(rng, k), START + STEP * k)
+    now = START + STEP * 3 * 288
+    widths = []
+    for horizon in (1, 4, 24, 96):
+        _, lower, upper = forecaster.forecast(horizon, now)
+        widths.append(upper - lower)
+    assert all(np.all(a <= b + 1e-9) for a, b in zip(widths, widths[1:]))
+    assert np.all(widths[-1] < 10 * np.array([2.0, 1.0, 0.5]) * 2 * OnlineForecaster.Z_90)
+
+
+def test_missing_values_leave_a_series_untouched():
+    forecaster = OnlineForecaster(2)
+    forecaster.update(np.array([10.0, 20.0]), START)
+    forecaster.update(np.array([11.0, 21.0]), START + STEP)
+    before = forecaster.level.copy(), forecaster.variance.copy(), forecaster.season.copy()
+    forecaster.update(np.array([np.nan, 40.0]), START + 2 * STEP)
+    assert forecaster.level[0] == before[0][0] and forecaster.variance[0] == before[1][0]
+    assert np.array_equal(forecaster.season[0], before[2][0])
+    assert forecaster.level[1] != before[0][1]
+
+
+def test_repeated_timestamp_only_starts_unseen_series():
+    forecaster = OnlineForecaster(2)
+    forecaster.update(np.array([10.0, np.nan]), START)
+    level = forecaster.level[0]
+    forecaster.update(np.array([99.0, 30.0]), START)  # e.g. a warm start replaying its last tick
+    assert forecaster.level[0] == level
+    assert forecaster.seen.all() and forecaster.level[1] == 30.0
+
+
+def test_warm_start_seeds_from_the_last_day_only(tmp_path, monkeypatch):
+    options = dict(start=False, train_models=False, tick_store_dir=str(tmp_path), alert_rules_path='',
+                   ingest_dir='', feed_url='')
+    clock = app.SimulationClock(datetime(2026, 1, 5), 1800)
+    engine = app.EnergyIntelligenceEngine(seed=2, clock=clock, **options)
+    for _ in range(3 * 48):  # three days of half-hourly ticks
+        clock.advance()
+        engine.tick()
+    engine.tick_store.close()
+    newest = clock().timestamp()
+
+    seeded = []
+    update = OnlineForecaster.update
+    monkeypatch.setattr(OnlineForecaster, 'update', lambda self, values, timestamp: (
+        seeded.append(timestamp), update(self, values, timestamp))[1])
+    warm = app.EnergyIntelligenceEngine(seed=2, clock=clock, **options)
+    assert warm.history.count == 3 * 48 + 1
+    assert min(seeded) >= newest - app.EnergyIntelligenceEngine.FORECAST_SEED_SECONDS
+    assert len(set(seeded)) == 49  # one day of ticks, both ends included
+    assert warm.forecaster.seen.all()
@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import app
+from app import FuelMapping
+
+ZONES = ['NYC', 'WEST', 'NORTH']
+HUBS = ['Transco Z6 NY', 'Dominion South']
+
+
+def snapshot(rt_price, heat_rate, gas_price):
+    electricity = {'rt_price': np.array(rt_price, dtype=float), 'heat_rate': np.array(heat_rate, dtype=float)}
+    return app.MarketSnapshot(datetime(2026, 1, 15, 9), ZONES, HUBS, electricity,
+                              {'price': np.array(gas_price, dtype=float)}, 3.0, 0.0)
+
+
+def test_payload_is_the_matrix_in_cents_zone_by_zone():
+    fuel = FuelMapping(ZONES, HUBS, {'NYC': 'Transco Z6 NY', 'WEST': 'Dominion South'}, {'NYC': 2.5})
+    data = fuel.to_dict(snapshot([50.0, 40.0, 30.0], [8000, 9000, 7500], [3.0, 2.5]))
+    assert data['shape'] == [3, 2]
+    spreads = np.array(data['spread_cents']).reshape(data['shape']) / 100
+    expected = np.array([[50 - 24 - 2.5, 50 - 20 - 2.5], [40 - 27, 40 - 22.5], [30 - 22.5, 30 - 18.75]])
+    assert np.allclose(spreads, expected)
+    assert data['best_hub'] == [1, 1, 1]
+    assert data['delivering_hub'] == [0, 1, None]
+    assert data['vom'] == [2.5, 0.0, 0.0]
+
+
+def test_unknown_delivering_hub_is_rejected():
+    with pytest.raises(ValueError, match='Nowhere'):
+        FuelMapping(ZONES, HUBS, {'NYC': 'Nowhere'}, {})
+    # A mapping entry for a zone that is not configured is ignored
+    FuelMapping(ZONES, HUBS, {'LONGIL': 'Nowhere'}, {})
+
+
+def test_unmapped_zones_are_priced_against_the_hub_average():
+    fuel = FuelMapping(ZONES, HUBS, {'NYC': 'Dominion South'}, {})
+    assert fuel.averaged
+    assert fuel.zone_gas(np.array([3.0, 2.0])).tolist() == [2.0, 2.5, 2.5]
+    mapped = FuelMapping(ZONES, HUBS, {zone: 'Transco Z6 NY' for zone in ZONES}, {})
+    assert not mapped.averaged
+    assert mapped.zone_gas(np.array([3.0, 2.0])).tolist() == [3.0, 3.0, 3.0]
+
+
+def test_spreads_use_the_delivering_hub_and_vom():
+    fuel = FuelMapping(ZONES, HUBS, {'NYC': 'Transco Z6 NY', 'WEST': 'Dominion South'}, {'NYC': 2.5}, default_vom=1.0)
+    rt_price, heat_rate = np.array([50.0, 40.0, 30.0]), np.array([8000.0, 9000.0, 7500.0])
+    gas = fuel.zone_gas(np.array([3.0, 2.5]))
+    spreads = app.spark_spreads(rt_price, heat_rate, gas, fuel.vom)
+    assert spreads.tolist() == [23.5, 16.5, 8.38]
+    assert np.allclose(fuel.matrix(rt_price, heat_rate, np.array([3.0, 2.5]))[[0, 1], [0, 1]], spreads[:2])
+
+
+def test_built_in_mapping_only_covers_configured_hubs(monkeypatch):
+    monkeypatch.setattr(app.EnergyIntelligenceEngine, 'ZONE_HUBS', None)
+    engine = app.EnergyIntelligenceEngine(gas_hubs=['Transco Z6 NY', 'Henry Hub'], start=False, train_models=False,
+                                          tick_store_dir='', alert_rules_path='', ingest_dir='', feed_url='', seed=0)
+    assert engine.fuel.delivering == {'NYC': 'Transco Z6 NY', 'WEST': None, 'CAPITAL': None, 'NORTH': None,
+                                      'CENTRAL': None}
+
+
+def test_configured_mapping_replaces_the_built_in_one(monkeypatch):
+    monkeypatch.setattr(app.EnergyIntelligenceEngine, 'ZONE_HUBS', {'WEST': 'Henry Hub'})
+    engine = app.EnergyIntelligenceEngine(gas_hubs=['Transco Z6 NY', 'Henry Hub'], start=False, train_models=False,
+                                          tick_store_dir='', alert_rules_path='', ingest_dir='', feed_url='', seed=0)
+    assert engine.fuel.delivering['WEST'] == 'Henry Hub'
+    assert engine.fuel.delivering['NYC'] is None
+    monkeypatch.setattr(app.EnergyIntelligenceEngine, 'ZONE_HUBS', {'WEST': 'Nowhere'})
+    with pytest.raises(ValueError):
+        app.EnergyIntelligenceEngine(gas_hubs=['Henry Hub'], start=False, train_models=False, tick_store_dir='',
+                                     alert_rules_path='', ingest_dir='', feed_url='', seed=0)
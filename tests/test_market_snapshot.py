@@ -0,0 +1,48 @@
+from datetime import datetime
+
+import numpy as np
+
+import app
+
+ZONES = ['NYC', 'CAPITAL', 'CENTRAL', 'WEST', 'NORTH', 'LONGIL']
+
+
+def make_engine():
+    return app.EnergyIntelligenceEngine(electricity_zones=ZONES, gas_hubs=[f'H{i}' for i in range(8)],
+                                        start=False, train_models=False, tick_store_dir='', alert_rules_path='',
+                                        ingest_dir='', feed_url='', seed=0)
+
+
+def interval(rt_price):
+    rt_price = np.array(rt_price, dtype=float)
+    return {'rt_price': rt_price, 'da_price': rt_price, 'load_mw': np.full(len(rt_price), 1000.0)}
+
+
+def test_ingested_intervals_hold_simulated_inputs_and_recompute_only_moved_zones():
+    engine = make_engine()
+    prices = np.array([40.0, 35.0, 30.0, 25.0, 20.0, 45.0])
+    first = engine._nyiso_snapshot(datetime(2026, 1, 15, 9, 0), interval(prices), None)
+    first.electricity['spark_spread'][1] = 999.0  # a spread that is only right if zone 1 is recomputed
+    moved = prices.copy()
+    moved[0] += 7.0
+    second = engine._nyiso_snapshot(datetime(2026, 1, 15, 9, 5), interval(moved), first)
+
+    assert np.array_equal(second.electricity['heat_rate'], first.electricity['heat_rate'])
+    assert np.array_equal(second.natural_gas['price'], first.natural_gas['price'])
+    assert second.henry_hub == first.henry_hub
+    assert second.electricity['spark_spread'][1] == 999.0  # carried over: not recomputed
+    assert second.electricity['spark_spread'][0] == first.electricity['spark_spread'][0] + 7.0
+
+    engine.generate_trading_signals(first)
+    rescans = engine.gas_pairs.rescans
+    engine.generate_trading_signals(second)
+    assert engine.gas_pairs.rescans == rescans
+
+
+def test_simulated_inputs_are_redrawn_on_a_new_day():
+    engine = make_engine()
+    prices = [40.0, 35.0, 30.0, 25.0, 20.0, 45.0]
+    first = engine._nyiso_snapshot(datetime(2026, 1, 15, 23, 55), interval(prices), None)
+    second = engine._nyiso_snapshot(datetime(2026, 1, 16, 0, 0), interval(prices), first)
+    assert not np.array_equal(second.natural_gas['price'], first.natural_gas['price'])
+    assert not np.array_equal(second.electricity['heat_rate'], first.electricity['heat_rate'])
@@ -0,0 +1,95 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+import app
+import metrics
+
+
+def run_in_thread(func):
+    thread = threading.Thread(target=func)
+    thread.start()
+    thread.join()
+
+
+def test_counter_sums_shards_across_threads():
+    counter = metrics.Counter('c', 'doc', ['route'])
+    threads = [threading.Thread(target=lambda: [counter.inc('a') for _ in range(1000)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.inc('b', amount=5)
+    assert counter.value('a') == 8000
+    assert counter.value('b') == 5
+    assert counter.value('c') == 0
+
+
+def test_exited_thread_shards_fold_into_retired_totals():
+    counter = metrics.Counter('c', 'doc')
+    histogram = metrics.Histogram('h', 'doc', buckets=(1, 10))
+    for _ in range(50):
+        run_in_thread(lambda: (counter.inc(), histogram.observe(5)))
+    assert counter.value() == 50
+    assert len(counter._shards) == 0
+    counter.inc(amount=2)  # a live shard is kept alongside the retired totals
+    assert counter.value() == 52
+    assert len(counter._shards) == 1
+    assert 'h_count 50' in histogram.render()
+    assert len(histogram._shards) == 0
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram('h', 'doc', ['stage'], buckets=(10, 1))
+    for value in (0.5, 1, 3, 20):
+        histogram.observe(value, 'x')
+    assert histogram.render() == [
+        '# HELP h doc', '# TYPE h histogram',
+        'h_bucket{stage="x",le="1"} 2',
+        'h_bucket{stage="x",le="10"} 3',
+        'h_bucket{stage="x",le="+Inf"} 4',
+        'h_sum{stage="x"} 24.5',
+        'h_count{stage="x"} 4',
+    ]
+
+
+def test_label_count_is_checked():
+    counter = metrics.Counter('c', 'doc', ['route'])
+    with pytest.raises(ValueError):
+        counter.inc()
+    with pytest.raises(ValueError):
+        metrics.Gauge('g', 'doc').set(1, 'extra')
+
+
+def test_gauge_replace_drops_missing_label_sets():
+    gauge = metrics.Gauge('g', 'doc', ['type'])
+    gauge.set(3, 'buy')
+    gauge.replace({('sell',): 1})
+    assert gauge.value('buy') is None
+    assert gauge.render()[2:] == ['g{type="sell"} 1']
+
+
+def test_registry_render_escapes_labels_and_zero_fills_counters():
+    registry = metrics.Registry()
+    registry.counter('plain', 'doc')
+    registry.gauge('g', 'doc', ['name']).set(1.5, 'a"b\\c\nd')
+    text = registry.render()
+    assert text.endswith('\n')
+    assert 'plain_total 0\n' in text
+    assert 'g{name="a\\"b\\\\c\\nd"} 1.5\n' in text
+
+
+def test_metrics_endpoint(monkeypatch):
+    clock = app.SimulationClock(datetime(2026, 1, 15, 17), 30)
+    engine = app.EnergyIntelligenceEngine(start=False, train_models=False, tick_store_dir='', alert_rules_path='',
+                                          ingest_dir='', feed_url='', seed=0, clock=clock)
+    clock.advance()
+    engine.tick()
+    monkeypatch.setattr(app, '_engine', engine)
+    response = app.app.test_client().get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type == metrics.CONTENT_TYPE
+    text = response.get_data(as_text=True)
+    assert '# TYPE nyiso_ticks counter' in text
+    assert '# TYPE nyiso_http_request_duration_seconds histogram' in text
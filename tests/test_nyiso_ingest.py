@@ -0,0 +1,139 @@
+from datetime import datetime
+
+import pytest
+
+import nyiso_ingest
+from nyiso_ingest import CsvTail, IngestError
+
+HEADER = b'"Time Stamp","Name","PTID","LBMP ($/MWHr)"\n'
+
+
+def row(minute, name, price):
+    return f'"01/15/2026 09:{minute:02d}:00","{name}",61761,{price}\n'.encode()
+
+
+def tail(path):
+    return CsvTail(str(path), 'Name', 'LBMP ($/MWHr)')
+
+
+def test_partial_line_is_held_until_finished(tmp_path):
+    path = tmp_path / '20260115realtime_zone.csv'
+    second = row(5, 'WEST', 31.25)
+    path.write_bytes(HEADER + row(0, 'N.Y.C.', 42.5) + second[:20])
+    reader = tail(path)
+
+    times, keys, values = reader.read()
+    assert keys == ['N.Y.C.'] and values == [42.5] and times == [datetime(2026, 1, 15, 9, 0)]
+
+    with open(path, 'ab') as f:
+        f.write(second[20:] + row(10, 'NORTH', 18.0))
+    times, keys, values = reader.read()
+    assert keys == ['WEST', 'NORTH'] and values == [31.25, 18.0]
+    assert times == [datetime(2026, 1, 15, 9, 5), datetime(2026, 1, 15, 9, 10)]
+    assert reader.read() == ([], [], [])
+
+
+def test_rows_split_across_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(nyiso_ingest, 'CHUNK_BYTES', 7)  # every row straddles several reads
+    path = tmp_path / 'feed.csv'
+    rows = [row(minute, 'CAPITL', minute + 0.5) for minute in range(12)]
+    path.write_bytes(HEADER + b''.join(rows))
+    assert tail(path).read()[2] == [minute + 0.5 for minute in range(12)]
+
+
+def test_replaced_file_is_read_from_the_start(tmp_path):
+    path = tmp_path / 'feed.csv'
+    path.write_bytes(HEADER + row(0, 'WEST', 1.0) + row(5, 'WEST', 2.0))
+    reader = tail(path)
+    assert reader.read()[2] == [1.0, 2.0]
+    path.write_bytes(HEADER + row(0, 'WEST', 9.0))  # shorter than what was read: a new file
+    assert reader.read()[2] == [9.0]
+
+
+def test_missing_file_and_missing_columns(tmp_path):
+    assert tail(tmp_path / 'absent.csv').read() == ([], [], [])
+    path = tmp_path / 'feed.csv'
+    path.write_bytes(b'"Time Stamp","Zone","Price"\n' + b'"01/15/2026 09:00:00","WEST",1.0\n')
+    with pytest.raises(IngestError):
+        tail(path).read()
+
+
+def test_malformed_rows_are_skipped_and_the_rest_kept(tmp_path, capsys):
+    path = tmp_path / 'feed.csv'
+    path.write_bytes(HEADER + row(0, 'WEST', 1.0) + b'"01/15/2026 09:05:00","WEST",61761,not-a-price\n'
+                     + b'"garbage","WEST",61761,3.0\n' + row(15, 'WEST', 4.0))
+    reader = tail(path)
+    times, keys, values = reader.read()
+    assert values == [1.0, 4.0]
+    assert times == [datetime(2026, 1, 15, 9, 0), datetime(2026, 1, 15, 9, 15)]
+    assert capsys.readouterr().out.count('Skipping malformed row') == 2
+    with open(path, 'ab') as f:
+        f.write(row(20, 'WEST', 5.0))
+    assert reader.read()[2] == [5.0]
+
+
+def test_a_failed_parse_does_not_consume_the_rows(tmp_path, monkeypatch):
+    path = tmp_path / 'feed.csv'
+    path.write_bytes(HEADER + row(0, 'WEST', 1.0) + row(5, 'WEST', 2.0))
+    reader = tail(path)
+    parse = reader._parse
+
+    def fail_once(block):
+        monkeypatch.setattr(reader, '_parse', parse)
+        raise OSError('interrupted')
+    monkeypatch.setattr(reader, '_parse', fail_once)
+    with pytest.raises(OSError):
+        reader.read()
+    assert reader.offset == 0
+    assert reader.read()[2] == [1.0, 2.0]
+
+
+def fall_back_rows(hours, zone=None):
+    """01:55 EDT, 01:00 and 01:05 EST on the night clocks went back, optionally with a Time Zone column"""
+    lines = []
+    for stamp, tz, price in hours:
+        extra = '' if zone is None else f'"{tz}",'
+        lines.append(f'"11/01/2026 {stamp}",{extra}"WEST",61761,{price}\n'.encode())
+    return b''.join(lines)
+
+
+FALL_BACK = [('01:55:00', 'EDT', 1.0), ('01:00:00', 'EST', 2.0), ('01:05:00', 'EST', 3.0)]
+
+
+@pytest.mark.parametrize('zone', [None, 'Time Zone'])
+def test_repeated_fall_back_hour_is_marked_with_fold(tmp_path, zone):
+    header = HEADER if zone is None else b'"Time Stamp","Time Zone","Name","PTID","LBMP ($/MWHr)"\n'
+    path = tmp_path / 'feed.csv'
+    path.write_bytes(header + fall_back_rows(FALL_BACK[:1], zone))
+    reader = tail(path)
+    assert [when.fold for when in reader.read()[0]] == [0]
+    with open(path, 'ab') as f:  # the second pass arrives in a later read
+        f.write(fall_back_rows(FALL_BACK[1:], zone))
+    times = reader.read()[0]
+    assert times == [datetime(2026, 11, 1, 1, 0), datetime(2026, 11, 1, 1, 5)]
+    assert [when.fold for when in times] == [1, 1]
+
+
+def test_ingestor_keeps_both_passes_through_the_repeated_hour(tmp_path):
+    rows = [('01:00:00', 'EDT', 1.0), ('01:05:00', 'EDT', 2.0), ('01:00:00', 'EST', 3.0), ('01:05:00', 'EST', 4.0)]
+    (tmp_path / '20261101realtime_zone.csv').write_bytes(HEADER + fall_back_rows(rows))
+    ingestor = nyiso_ingest.NyisoIngestor(str(tmp_path), ['WEST'])
+    intervals = ingestor.poll()
+    assert [interval['rt_price'] for interval in intervals] == [[1.0], [2.0], [3.0], [4.0]]
+    assert [interval['time'].fold for interval in intervals] == [0, 0, 1, 1]
+    assert ingestor.last_time == datetime(2026, 11, 1, 1, 5, fold=1)
+    assert ingestor.poll() == []
+
+
+def test_previous_day_rows_written_after_the_switch_are_read(tmp_path):
+    yesterday, today = tmp_path / '20260114realtime_zone.csv', tmp_path / '20260115realtime_zone.csv'
+    yesterday.write_bytes(HEADER + b'"01/14/2026 23:50:00","WEST",61761,1.0\n')
+    feed = nyiso_ingest.DailyFeed(str(tmp_path), *nyiso_ingest.FEEDS['rt_price'])
+    assert feed.read()[2] == [1.0]
+    today.write_bytes(HEADER + row(0, 'WEST', 3.0))
+    assert feed.read()[2] == [3.0]
+    with open(yesterday, 'ab') as f:  # the fetcher refreshed yesterday's file after today's appeared
+        f.write(b'"01/14/2026 23:55:00","WEST",61761,2.0\n')
+    times, keys, values = feed.read()
+    assert values == [2.0] and times == [datetime(2026, 1, 14, 23, 55)]
+    assert feed.read() == ([], [], [])
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import app
+from app import MarketSnapshot, PriceHistory
+
+ZONES = ['NYC', 'WEST']
+HUBS = ['Transco Z6 NY']
+START = datetime(2026, 1, 15, 9, 0)
+
+
+def snapshot(i, when=None):
+    electricity = {field: np.array([i, 1000.0 + i]) for field in MarketSnapshot.ELECTRICITY_FIELDS}
+    natural_gas = {field: np.array([i / 10]) for field in MarketSnapshot.GAS_FIELDS}
+    return MarketSnapshot(when or START + timedelta(seconds=5 * i), ZONES, HUBS, electricity, natural_gas, 3.0, 0.0)
+
+
+def filled(capacity, ticks):
+    history = PriceHistory(ZONES, HUBS, capacity)
+    for i in range(ticks):
+        history.append(snapshot(i))
+    return history
+
+
+def test_wraparound_keeps_newest_in_order():
+    history = filled(8, 21)
+    assert history.count == 8
+    timestamps, values = history.query(['NYC:rt_price', 'WEST:load_mw', 'Transco Z6 NY:price'])
+    assert values['NYC:rt_price'].tolist() == list(range(13, 21))
+    assert values['WEST:load_mw'].tolist() == [1000.0 + i for i in range(13, 21)]
+    assert np.allclose(values['Transco Z6 NY:price'], np.arange(13, 21) / 10)
+    assert timestamps.tolist() == [snapshot(i).time.timestamp() for i in range(13, 21)]
+    assert history.oldest() == snapshot(13).time.timestamp()
+
+
+@pytest.mark.parametrize('ticks', [5, 8, 11, 16, 19])
+def test_range_queries_across_the_seam(ticks):
+    history = filled(8, ticks)
+    held = list(range(max(ticks - 8, 0), ticks))
+    for lo in held:
+        for hi in held[held.index(lo):]:
+            start, end = snapshot(lo).time.timestamp(), snapshot(hi).time.timestamp()
+            _, values = history.query(['NYC:rt_price'], start, end)
+            assert values['NYC:rt_price'].tolist() == list(range(lo, hi + 1))
+            assert history.count_between(start, end) == hi - lo + 1
+    assert history.count_between(end=snapshot(held[0]).time.timestamp() - 1) == 0
+
+
+def test_extend_matches_append():
+    appended = filled(8, 13)
+    extended = PriceHistory(ZONES, HUBS, 8)
+    source = filled(32, 13)
+    timestamps, columns = source.export(PriceHistory.ELECTRICITY_FIELDS + PriceHistory.GAS_FIELDS)
+    extended.extend(timestamps[:4], {field: column[:4] for field, column in columns.items()})
+    extended.extend(timestamps[4:], {field: column[4:] for field, column in columns.items()})
+    for fields in (PriceHistory.ELECTRICITY_FIELDS, PriceHistory.GAS_FIELDS):
+        a_times, a = appended.export(fields)
+        b_times, b = extended.export(fields)
+        assert np.array_equal(a_times, b_times)
+        assert all(np.array_equal(a[field], b[field]) for field in fields)
+
+
+def test_timestamps_never_go_backwards():
+    history = filled(8, 4)
+    history.append(snapshot(4, when=START - timedelta(hours=1)))  # e.g. the clock stepped back
+    timestamps, values = history.query(['NYC:rt_price'], start=snapshot(3).time.timestamp())
+    assert values['NYC:rt_price'].tolist() == [3, 4]
+    assert timestamps[0] == timestamps[1]
+
+
+def test_readers_share_the_writers_buffer():
+    buffer = bytearray(PriceHistory.nbytes(ZONES, HUBS, 8))
+    writer = PriceHistory(ZONES, HUBS, 8, buffer=buffer)
+    reader = PriceHistory(ZONES, HUBS, 8, buffer=buffer)
+    for i in range(10):
+        writer.append(snapshot(i))
+    assert reader.query(['WEST:rt_price'])[1]['WEST:rt_price'].tolist() == [1000.0 + i for i in range(2, 10)]
+
+
+def test_unknown_series_raise():
+    with pytest.raises(KeyError):
+        filled(4, 2).query(['NYC:rt_price', 'MARS:rt_price'])
+
+
+def test_history_endpoint(monkeypatch):
+    engine = app.simulate(5, 20)
+    monkeypatch.setattr(app, '_engine', engine)
+    client = app.app.test_client()
+    body = client.get('/api/history?series=NYC:rt_price,Transco Z6 NY:price').get_json()
+    assert len(body['timestamps']) == 20 and set(body['series']) == {'NYC:rt_price', 'Transco Z6 NY:price'}
+    assert body['series']['NYC:rt_price'][-1] == engine.snapshot.market_data.electricity['rt_price'][0]
+    since = client.get(f'/api/history?series=NYC:rt_price&start={body["timestamps"][-3]}').get_json()
+    assert since['timestamps'] == body['timestamps'][-3:]
+    assert client.get('/api/history').status_code == 400
+    assert client.get('/api/history?series=NYC:rt_price&start=yesterday').status_code == 400
+    assert client.get('/api/history?series=MARS:rt_price').status_code == 404
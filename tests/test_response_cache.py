@@ -0,0 +1,80 @@
+import gzip
+import json
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = app.simulate(8, 5)
+    monkeypatch.setattr(app, '_engine', engine)
+    return engine
+
+
+@pytest.mark.parametrize('name', sorted(app.EngineSnapshot.PAYLOADS))
+def test_payload_is_serialized_once_per_snapshot(engine, name):
+    snapshot = engine.snapshot
+    payload = snapshot.payload(name)
+    assert snapshot.payload(name) is payload
+    assert gzip.decompress(payload.gzip_body) == payload.body
+    assert json.loads(payload.body) == json.loads(json.dumps(app.EngineSnapshot.PAYLOADS[name](snapshot)))
+
+
+def test_identity_and_gzip_variants_have_their_own_etags(engine):
+    client = app.app.test_client()
+    plain = client.get('/api/market-data')
+    packed = client.get('/api/market-data', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert plain.status_code == packed.status_code == 200
+    assert 'Content-Encoding' not in plain.headers and packed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(packed.get_data()) == plain.get_data()
+    assert packed.headers['ETag'] == plain.headers['ETag'][:-1] + '-gzip"'
+    for response in (plain, packed):
+        assert response.headers['Vary'] == 'Accept-Encoding'
+        assert response.headers['Cache-Control'] == 'no-cache'
+
+
+def test_matching_etag_gets_304_until_the_next_tick(engine):
+    client = app.app.test_client()
+    first = client.get('/api/alerts', headers={'Accept-Encoding': 'gzip'})
+    etag = first.headers['ETag']
+    again = client.get('/api/alerts', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert again.status_code == 304 and again.get_data() == b''
+    # The identity tag is accepted whatever the encoding, so a proxy that decoded the body still revalidates
+    plain_etag = client.get('/api/alerts').headers['ETag']
+    assert client.get('/api/alerts', headers={'Accept-Encoding': 'gzip', 'If-None-Match': plain_etag}).status_code == 304
+
+    engine.clock.advance()
+    engine.tick()
+    fresh = client.get('/api/snapshot', headers={'If-None-Match': client.get('/api/snapshot').headers['ETag']})
+    assert fresh.status_code == 304
+    engine.clock.advance()
+    engine.tick()
+    assert client.get('/api/snapshot', headers={'If-None-Match': fresh.headers['ETag']}).status_code == 200
+
+
+def test_etag_follows_content_and_version(engine):
+    payload = engine.snapshot.payload('predictions')
+    assert payload.etag.startswith(f'v{engine.snapshot.version}-')
+    assert app.SerializedPayload.build({'a': 1}, 3).etag == app.SerializedPayload.build({'a': 1}, 3).etag
+    assert app.SerializedPayload.build({'a': 1}, 3).etag != app.SerializedPayload.build({'a': 2}, 3).etag
+
+
+def test_market_payloads_carry_over_while_the_market_data_is_unchanged(engine):
+    before = engine.snapshot
+    matrix, market = before.payload('spark-matrix'), before.payload('market-data')
+    predictions = before.payload('predictions')
+    same_market = engine.tick(before.market_data)
+    assert same_market.payload('spark-matrix') is matrix
+    assert same_market.payload('market-data') is market
+    assert same_market.payload('predictions') is not predictions
+    engine.clock.advance()
+    assert engine.tick().payload('spark-matrix') is not matrix
+
+
+def test_large_bodies_still_round_trip_through_gzip():
+    data = {'values': list(range(100000))}
+    payload = app.SerializedPayload.build(data, 1)
+    assert len(payload.body) > app.SerializedPayload.FAST_GZIP_BYTES
+    assert json.loads(gzip.decompress(payload.gzip_body)) == data
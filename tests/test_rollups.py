@@ -0,0 +1,135 @@
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+from app import PriceHistory, RollupPyramid, select_resolution
+
+ZONES = ['NYC', 'WEST']
+HUBS = ['Transco Z6 NY']
+SERIES = ['NYC:rt_price', 'WEST:load_mw', 'Transco Z6 NY:price']
+
+
+@pytest.fixture(autouse=True)
+def new_york(monkeypatch):
+    """Buckets follow local time; run across the March DST change in New York"""
+    monkeypatch.setenv('TZ', 'America/New_York')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def ticks(n=1200, step=97, seed=0):
+    """Timestamps from 20:00 the evening before clocks go forward, and random columns"""
+    rng = np.random.default_rng(seed)
+    timestamps = datetime(2026, 3, 7, 20).timestamp() + step * np.arange(n)
+    columns = {field: rng.normal(50, 10, (n, len(ZONES))) for field in PriceHistory.ELECTRICITY_FIELDS}
+    columns.update({field: rng.normal(4, 1, (n, len(HUBS))) for field in PriceHistory.GAS_FIELDS})
+    return timestamps, columns
+
+
+def snapshot(timestamps, columns, i):
+    return SimpleNamespace(
+        time=datetime.fromtimestamp(timestamps[i]),
+        electricity={field: columns[field][i] for field in PriceHistory.ELECTRICITY_FIELDS},
+        natural_gas={field: columns[field][i] for field in PriceHistory.GAS_FIELDS})
+
+
+def raw_series(timestamps, columns, name):
+    node, field = name.split(':')
+    column = columns[field][:, (HUBS if field in PriceHistory.GAS_FIELDS else ZONES).index(node)]
+    local = pd.to_datetime(timestamps, unit='s', utc=True).tz_convert('America/New_York').tz_localize(None)
+    return pd.Series(column, index=local)
+
+
+@pytest.mark.parametrize('resolution', list(RollupPyramid.RESOLUTIONS.values()))
+def test_buckets_match_the_raw_series(resolution):
+    timestamps, columns = ticks()
+    columns['price'][100:400] = np.nan  # backfilled ticks have no gas prices
+    pyramid = RollupPyramid(ZONES, HUBS)
+    pyramid.extend(timestamps, columns)
+    starts, values = pyramid.query(resolution, SERIES)
+    for name in SERIES:
+        raw = raw_series(timestamps, columns, name)
+        groups = raw.groupby(raw.index.floor(f'{resolution}s') if resolution < 86400 else raw.index.normalize())
+        assert [datetime.fromtimestamp(start) for start in starts] == list(groups.first().index)
+        expected = {'open': groups.first(), 'high': groups.max(), 'low': groups.min(), 'close': groups.last(),
+                    'mean': groups.mean()}
+        for stat, series in expected.items():
+            np.testing.assert_allclose(values[name][stat], series.to_numpy(), equal_nan=True, err_msg=stat)
+
+
+def test_appending_ticks_matches_extending_in_chunks():
+    timestamps, columns = ticks(400)
+    appended = RollupPyramid(ZONES, HUBS)
+    for i in range(len(timestamps)):
+        appended.append(snapshot(timestamps, columns, i))
+    extended = RollupPyramid(ZONES, HUBS)
+    for chunk in np.array_split(np.arange(len(timestamps)), 7):
+        extended.extend(timestamps[chunk], {field: column[chunk] for field, column in columns.items()})
+    for resolution in RollupPyramid.RESOLUTIONS.values():
+        a, b = appended.query(resolution, SERIES), extended.query(resolution, SERIES)
+        np.testing.assert_array_equal(a[0], b[0])
+        for name in SERIES:
+            for stat in a[1][name]:
+                np.testing.assert_allclose(a[1][name][stat], b[1][name][stat])
+
+
+def test_full_rings_keep_the_newest_buckets():
+    timestamps, columns = ticks()
+    capacities = {60: 50, 300: 20, 3600: 10, 86400: 3}
+    small, full = RollupPyramid(ZONES, HUBS, capacities), RollupPyramid(ZONES, HUBS)
+    small.extend(timestamps[:600], {field: column[:600] for field, column in columns.items()})
+    for i in range(600, len(timestamps)):
+        small.append(snapshot(timestamps, columns, i))
+    full.extend(timestamps, columns)
+    for resolution, capacity in capacities.items():
+        starts, values = small.query(resolution, SERIES)
+        expected_starts, expected = full.query(resolution, SERIES)
+        count = min(capacity, len(expected_starts))
+        np.testing.assert_array_equal(starts, expected_starts[-count:])
+        np.testing.assert_allclose(values['NYC:rt_price']['mean'], expected['NYC:rt_price']['mean'][-count:])
+        assert small.covers_from(resolution) == (starts[0] if count == capacity else timestamps[0])
+
+
+def test_select_resolution_picks_the_finest_that_fits():
+    timestamps, columns = ticks()
+    history, pyramid = PriceHistory(ZONES, HUBS, 2000), RollupPyramid(ZONES, HUBS)
+    history.extend(timestamps, columns)
+    pyramid.extend(timestamps, columns)
+    assert select_resolution(history, pyramid) == 0
+    assert select_resolution(history, pyramid, max_points=len(timestamps)) == 0
+    assert pyramid.bucket_count(60) == len(timestamps)  # ticks are 97 s apart: minutes save nothing
+    assert select_resolution(history, pyramid, max_points=len(timestamps) - 1) == 300
+    assert select_resolution(history, pyramid, max_points=pyramid.bucket_count(3600)) == 3600
+    assert select_resolution(history, pyramid, max_points=1) == 86400  # nothing fits: the coarsest
+    last_hour = timestamps[-1] - 3600
+    assert select_resolution(history, pyramid, last_hour, max_points=history.count_between(last_hour)) == 0
+
+
+def test_select_resolution_passes_over_rings_that_no_longer_reach_back():
+    timestamps, columns = ticks()
+    history = PriceHistory(ZONES, HUBS, 100)  # only the newest 100 ticks
+    pyramid = RollupPyramid(ZONES, HUBS, {60: 50, 300: 1000, 3600: 1000, 86400: 10})
+    history.extend(timestamps, columns)
+    pyramid.extend(timestamps, columns)
+    assert select_resolution(history, pyramid, max_points=10_000) == 300
+    recent = timestamps[-1] - 600
+    assert select_resolution(history, pyramid, recent, max_points=10_000) == 0
+    empty = PriceHistory(ZONES, HUBS, 10), RollupPyramid(ZONES, HUBS)
+    assert select_resolution(*empty, max_points=5) == 0
+
+
+def test_history_endpoint_downsamples_to_the_budget(monkeypatch):
+    engine = app.simulate(1, 200, step_seconds=97)
+    monkeypatch.setattr(app, '_engine', engine)
+    client = app.app.test_client()
+    body = client.get('/api/history?series=NYC:rt_price&max_points=20').get_json()
+    assert body['resolution'] == '1h' and len(body['timestamps']) <= 20
+    assert set(body['series']['NYC:rt_price']) == {'open', 'high', 'low', 'close', 'mean'}
+    assert client.get('/api/history?series=NYC:rt_price&resolution=2h').status_code == 400
@@ -0,0 +1,98 @@
+import pytest
+
+import scheduler
+from scheduler import Scheduler, Stage
+
+
+def counting(name, interval, inputs=(), results=None):
+    calls = []
+
+    def func(*args):
+        calls.append(args)
+        return results.pop(0) if results else len(calls)
+    return Stage(name, interval, func, inputs), calls
+
+
+def test_deadlines_stay_on_the_original_grid():
+    stage, calls = counting('poll', 5)
+    sched = Scheduler([stage])
+    sched.start(now=100)
+    assert sched.run_pending(now=104.9) == []
+    assert sched.run_pending(now=105.7) == ['poll']
+    assert stage.deadline == 110  # not 110.7: late runs do not drift the schedule
+    assert sched.run_pending(now=110.2) == ['poll']
+    assert stage.deadline == 115
+
+
+def test_skip_drops_missed_slots():
+    stage, calls = counting('poll', 5)
+    missed = []
+    sched = Scheduler([stage], on_missed=lambda s, slots: missed.append((s.name, slots)))
+    sched.start(now=0)
+    assert sched.run_pending(now=23) == ['poll']  # slots at 5, 10, 15 and 20 are due; one run
+    assert missed == [('poll', 3)]
+    assert stage.deadline == 25
+    assert sched.run_pending(now=24) == []
+    assert len(calls) == 1
+
+
+def test_catch_up_replays_missed_slots_back_to_back():
+    stage, calls = counting('poll', 5)
+    sched = Scheduler([stage], policy=scheduler.CATCH_UP, max_catch_up=3)
+    sched.start(now=0)
+    runs = sum(len(sched.run_pending(now=21)) for _ in range(10))
+    assert runs == 4  # slots at 5, 10, 15 and 20
+    assert stage.deadline == 25
+
+
+def test_catch_up_drops_slots_beyond_the_limit():
+    stage, calls = counting('poll', 5)
+    missed = []
+    sched = Scheduler([stage], policy=scheduler.CATCH_UP, max_catch_up=2,
+                      on_missed=lambda s, slots: missed.append(slots))
+    sched.start(now=0)
+    assert sched.run_pending(now=52) == ['poll']
+    assert missed == [9]
+    assert stage.deadline == 55
+
+
+def test_stage_reruns_only_when_an_input_changed():
+    source, source_calls = counting('source', 1, results=[1, scheduler.UNCHANGED, 2])
+    derived, derived_calls = counting('derived', 1, inputs=['source'])
+    sched = Scheduler([source, derived])
+    sched.start(now=0)
+    assert sched.run_pending(now=1) == ['source', 'derived']
+    assert sched.run_pending(now=2) == []  # the source reported UNCHANGED
+    assert source.value == 1 and source.version == 1
+    assert sched.run_pending(now=3) == ['source', 'derived']
+    assert derived_calls == [(1,), (2,)]
+
+
+def test_failing_stage_keeps_its_value_and_reports_the_error():
+    errors = []
+
+    def fail():
+        raise RuntimeError('boom')
+    sched = Scheduler([Stage('bad', 1, fail, value='old')], on_error=lambda s, e: errors.append((s.name, str(e))))
+    sched.start(now=0)
+    assert sched.run_pending(now=1) == []
+    assert errors == [('bad', 'boom')]
+    assert sched['bad'].value == 'old'
+
+
+def test_run_all_uses_supplied_values():
+    source, source_calls = counting('source', 1)
+    derived, derived_calls = counting('derived', 1, inputs=['source'])
+    sched = Scheduler([source, derived])
+    sched.run_all({'source': 'given'})
+    assert source_calls == []
+    assert derived_calls == [('given',)]
+
+
+def test_invalid_configuration_is_rejected():
+    with pytest.raises(ValueError):
+        Stage('x', 0, lambda: None)
+    with pytest.raises(ValueError):
+        Scheduler([], policy='later')
+    with pytest.raises(ValueError):
+        Scheduler([Stage('derived', 1, lambda v: v, inputs=['source'])])
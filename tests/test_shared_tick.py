@@ -0,0 +1,140 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import alert_lifecycle
+import app
+import shared_tick
+from shared_tick import ProducerUnavailable, SharedTickSegment, decode_frame, encode_frame
+
+ZONES = ['NYC', 'WEST']
+HUBS = ['Transco Z6 NY']
+
+
+@pytest.fixture
+def segment():
+    segment = SharedTickSegment.create(f'nyiso-test-{os.getpid()}', {'zones': ZONES, 'hubs': HUBS}, 4096,
+                                       slot_size=1 << 16)
+    yield segment
+    segment.close()
+
+
+def test_frames_round_trip():
+    parts = {'snapshot': b'{"a":1}', 'empty': b'', 'metrics': b'x' * 1000}
+    assert decode_frame(encode_frame(parts)) == parts
+
+
+def test_reader_sees_each_published_frame(segment):
+    reader = SharedTickSegment.attach(segment.shm.name, timeout=1)
+    try:
+        assert reader.read_frame() == (0, None)
+        for i in range(1, 6):
+            segment.write_frame({'snapshot': f'tick {i}'.encode()})
+            assert reader.read_frame() == (i, {'snapshot': f'tick {i}'.encode()})
+        with pytest.raises(ValueError):
+            segment.write_frame({'snapshot': b'x' * (1 << 16)})
+    finally:
+        reader.close()
+
+
+def test_frame_stuck_mid_write_gives_up(segment, monkeypatch):
+    monkeypatch.setattr(shared_tick, 'READ_TIMEOUT_SECONDS', 0.05)
+    segment.write_frame({'snapshot': b'ok'})
+    slot = segment._slots[1]
+    shared_tick._U64.pack_into(segment.buf, slot, 1)  # a writer died part way through generation 1's slot
+    started = time.monotonic()
+    with pytest.raises(ProducerUnavailable):
+        segment.read_frame()
+    assert time.monotonic() - started < 1
+
+
+def test_history_readers_give_up_on_a_torn_write(monkeypatch):
+    monkeypatch.setattr(shared_tick, 'READ_TIMEOUT_SECONDS', 0.05)
+    history = app.PriceHistory(ZONES, HUBS, 4)
+    rollups = app.RollupPyramid(ZONES, HUBS, {60: 4, 300: 4, 3600: 4, 86400: 4})
+    alerts = alert_lifecycle.AlertHistory(4)
+    snapshot = app.MarketSnapshot(datetime(2026, 1, 15), ZONES, HUBS,
+                                  {field: np.ones(2) for field in app.MarketSnapshot.ELECTRICITY_FIELDS},
+                                  {field: np.ones(1) for field in app.MarketSnapshot.GAS_FIELDS}, 3.0, 1.0)
+    history.append(snapshot)
+    rollups.append(snapshot)
+    assert history.query(['NYC:rt_price'])[1]['NYC:rt_price'].tolist() == [1.0]
+    for state in (history._state, rollups._state, alerts._state):
+        state[0] += 1  # odd sequence: the writer never finished
+    with pytest.raises(ProducerUnavailable):
+        history.query(['NYC:rt_price'])
+    with pytest.raises(ProducerUnavailable):
+        rollups.query(60, ['NYC:rt_price'])
+    with pytest.raises(ProducerUnavailable):
+        alerts.query()
+
+
+def test_api_answers_503_when_the_producer_is_unavailable(monkeypatch):
+    class Stalled:
+        @property
+        def snapshot(self):
+            raise ProducerUnavailable('no tick yet')
+
+    monkeypatch.setattr(app, '_engine', Stalled())
+    response = app.app.test_client().get('/api/market-data')
+    assert response.status_code == 503 and response.headers['Retry-After'] == '5'
+    assert 'no tick yet' in response.get_json()['error']
+
+
+def test_reader_gives_up_waiting_for_a_producer(monkeypatch, segment):
+    monkeypatch.setattr(app.SharedEngineReader, 'WAIT_SECONDS', 0.2)
+    monkeypatch.setattr(app.SharedEngineReader, 'POLL_SECONDS', 0.01)
+    with pytest.raises(ProducerUnavailable, match='does not exist'):
+        app.SharedEngineReader(f'nyiso-test-missing-{os.getpid()}').snapshot
+    reader = app.SharedEngineReader(segment.shm.name)
+    with pytest.raises(ProducerUnavailable, match='not published'):
+        reader.snapshot  # the segment exists, but its producer never got to its first tick
+    reader._segment.close()
+
+
+def published_segment(name, body):
+    segment = SharedTickSegment.create(name, {'zones': ZONES, 'hubs': HUBS}, 4096, slot_size=1 << 16)
+    segment.write_frame({'version': b'1', 'snapshot': body})
+    return segment
+
+
+def test_reader_moves_to_a_restarted_producer(monkeypatch):
+    monkeypatch.setattr(app.SharedEngineReader, 'STALE_SECONDS', 0.5)
+    monkeypatch.setattr(app.SharedEngineReader, 'WAIT_SECONDS', 0.2)
+    monkeypatch.setattr(app.SharedEngineReader, 'POLL_SECONDS', 0.01)
+    monkeypatch.setattr(app, 'PublishedSnapshot', lambda parts: parts['snapshot'])
+    name = f'nyiso-test-restart-{os.getpid()}'
+    first = published_segment(name, b'first')
+    reader = app.SharedEngineReader(name)
+    try:
+        assert reader.snapshot == b'first' and reader.health_problem() is None
+
+        time.sleep(0.6)  # the producer died: no frames, no heartbeat
+        assert 'heartbeat' in reader.health_problem()
+        with pytest.raises(ProducerUnavailable):
+            reader.snapshot
+
+        first.close()
+        second = published_segment(name, b'second')  # what a restarted producer does
+        try:
+            assert reader.snapshot == b'second' and reader.health_problem() is None
+        finally:
+            reader._segment.close()
+            second.close()
+    finally:
+        if first.shm.buf is not None:
+            first.close()
+
+
+def test_health_reports_an_unavailable_producer(monkeypatch):
+    class Stalled:
+        def health_problem(self):
+            return 'tick producer unavailable: its heartbeat is 30 s old'
+
+    monkeypatch.setattr(app, '_engine', Stalled())
+    response = app.app.test_client().get('/health')
+    assert response.status_code == 503
+    assert response.get_json()['status'] == 'unhealthy' and 'heartbeat' in response.get_json()['error']
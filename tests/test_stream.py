@@ -0,0 +1,69 @@
+import json
+import threading
+
+import pytest
+
+import app
+from app import TickBroadcaster
+
+
+def test_slow_subscriber_keeps_only_the_newest_ticks():
+    broadcaster = TickBroadcaster(queue_size=2)
+    slow = broadcaster.subscribe()
+    for version in range(1, 6):
+        broadcaster.publish(version, b'{}')
+    assert [slow.get_nowait() for _ in range(2)] == [TickBroadcaster.message(4, b'{}'),
+                                                     TickBroadcaster.message(5, b'{}')]
+    assert slow.empty() and broadcaster.latest == TickBroadcaster.message(5, b'{}')
+
+
+def test_unsubscribed_queue_gets_nothing():
+    broadcaster = TickBroadcaster()
+    kept, gone = broadcaster.subscribe(), broadcaster.subscribe()
+    broadcaster.unsubscribe(gone)
+    broadcaster.publish(1, b'x')
+    assert broadcaster.subscriber_count == 1 and kept.qsize() == 1 and gone.empty()
+
+
+def test_concurrent_publishers_never_block():
+    broadcaster = TickBroadcaster(queue_size=1)
+    subscribers = [broadcaster.subscribe() for _ in range(20)]
+    threads = [threading.Thread(target=lambda: [broadcaster.publish(i, b'x') for i in range(500)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert not any(thread.is_alive() for thread in threads)
+    assert all(q.qsize() == 1 for q in subscribers)
+
+
+def parse(event):
+    fields = dict(line.split(': ', 1) for line in event.decode().strip().splitlines() if ': ' in line)
+    return int(fields['id']), json.loads(fields['data'])
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = app.simulate(9, 3)
+    engine.broadcaster.publish(engine.snapshot.version, engine.snapshot.payload('snapshot').body)
+    monkeypatch.setattr(app, '_engine', engine)
+    return engine
+
+
+def test_stream_sends_the_latest_tick_then_each_new_one(engine):
+    response = app.app.test_client().get('/api/stream', buffered=False)
+    assert response.mimetype == 'text/event-stream' and response.headers['Cache-Control'] == 'no-cache'
+    events = iter(response.response)
+    first = next(events)
+    assert first.startswith(b'retry: 5000\n\n')
+    version, body = parse(first[len(b'retry: 5000\n\n'):])
+    assert version == engine.snapshot.version and body == engine.snapshot.to_dict()
+
+    engine.clock.advance()
+    engine.tick()
+    version, body = parse(next(events))
+    assert version == engine.snapshot.version
+    assert body['market_data'] == json.loads(engine.snapshot.payload('market-data').body)
+    assert engine.broadcaster.subscriber_count == 1
+    response.close()
+    assert engine.broadcaster.subscriber_count == 0
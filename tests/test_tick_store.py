@@ -0,0 +1,76 @@
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+from tick_store import ELECTRICITY_FIELDS, GAS_FIELDS, HEADER_SIZE, TickStore
+
+ZONES = ['NYC', 'WEST']
+HUBS = ['Transco Z6 NY']
+START = datetime(2026, 1, 15, 9, 0)
+
+
+def snapshot(i):
+    return SimpleNamespace(
+        time=START + timedelta(seconds=5 * i),
+        electricity={field: np.full(len(ZONES), float(i)) for field in ELECTRICITY_FIELDS},
+        natural_gas={field: np.full(len(HUBS), float(i)) for field in GAS_FIELDS},
+        henry_hub=3.0 + i, avg_spark_spread=float(-i))
+
+
+def filled_store(directory, count):
+    store = TickStore(str(directory), ZONES, HUBS)
+    for i in range(count):
+        store.append(snapshot(i))
+    store.close()
+    return store.segment_path(START.strftime('%Y%m%d'))
+
+
+def test_reopen_truncates_partial_record(tmp_path):
+    path = filled_store(tmp_path, 10)
+    complete = os.path.getsize(path)
+    with open(path, 'ab') as f:
+        f.write(b'\x01' * 17)  # a crash part way through writing a record
+
+    store = TickStore(str(tmp_path), ZONES, HUBS)
+    assert os.path.getsize(path) == complete
+    records = np.concatenate(store.tail(100))
+    assert records['henry_hub'].tolist() == [3.0 + i for i in range(10)]
+
+    store.append(snapshot(10))  # appends line up with whole records again
+    store.close()
+    assert np.concatenate(store.tail(100))['avg_spark_spread'][-1] == -10.0
+
+
+def test_reopen_drops_unsealed_records(tmp_path):
+    path = filled_store(tmp_path, 4)
+    record_size = TickStore(str(tmp_path), ZONES, HUBS).dtype.itemsize
+    with open(path, 'ab') as f:
+        f.write(b'\x02' * record_size)  # whole record size, but its seal was never written
+        f.write(b'\x03' * (record_size // 2))
+
+    store = TickStore(str(tmp_path), ZONES, HUBS)
+    assert os.path.getsize(path) == HEADER_SIZE + 4 * record_size
+    assert len(np.concatenate(store.tail(100))) == 4
+
+
+def test_readers_ignore_a_torn_tail_without_recovery(tmp_path):
+    path = filled_store(tmp_path, 3)
+    with open(path, 'ab') as f:
+        f.write(b'\x01' * 9)
+    store = TickStore(str(tmp_path), ZONES, HUBS, recover=False)
+    assert os.path.getsize(path) > HEADER_SIZE + 3 * store.dtype.itemsize
+    assert len(store.read_day(START.strftime('%Y%m%d'))) == 3
+
+
+def test_tail_spans_segments_newest_last(tmp_path):
+    store = TickStore(str(tmp_path), ZONES, HUBS)
+    for i in range(0, 24 * 720, 720):  # one tick an hour across a midnight
+        store.append(snapshot(i))
+    store.close()
+    slices = store.tail(12)  # 09:00 to 23:00 one day, 00:00 to 08:00 the next
+    timestamps = np.concatenate([records['timestamp'] for records in slices])
+    assert [len(records) for records in slices] == [3, 9]
+    assert np.all(np.diff(timestamps) > 0)
+    assert timestamps[-1] == snapshot(23 * 720).time.timestamp()
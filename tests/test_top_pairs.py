@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from app import TopPairs, top_pair_spreads
+
+
+def brute_force(prices, threshold, k):
+    """Every qualifying (buy, sell) pair, widest first"""
+    pairs = [(prices[j] - prices[i], i, j) for i in range(len(prices)) for j in range(len(prices))
+             if prices[j] - prices[i] > threshold]
+    pairs.sort(key=lambda pair: -pair[0])
+    return pairs[:k]
+
+
+def as_pairs(buy, sell, spread):
+    return sorted(zip(spread.tolist(), buy.tolist(), sell.tolist()), key=lambda pair: -pair[0])
+
+
+@pytest.mark.parametrize('n,threshold,k', [(2, 0.5, 3), (10, 1.0, 5), (40, 5.0, 8), (60, 30.0, 50), (25, 1e9, 4)])
+def test_top_pair_spreads_matches_brute_force(n, threshold, k):
+    rng = np.random.default_rng(n)
+    for _ in range(20):
+        prices = rng.normal(50, 15, n)
+        expected = brute_force(prices, threshold, k)
+        got = as_pairs(*top_pair_spreads(prices, threshold, k))
+        assert [(i, j) for _, i, j in got] == [(i, j) for _, i, j in expected]
+        assert np.allclose([s for s, _, _ in got], [s for s, _, _ in expected])
+
+
+def test_top_pair_spreads_edge_cases():
+    assert len(top_pair_spreads(np.array([1.0, 5.0]), 1.0, 0)[0]) == 0
+    assert len(top_pair_spreads(np.array([1.0]), 0.0, 3)[0]) == 0
+    buy, sell, spread = top_pair_spreads(np.array([5.0, 1.0]), 1.0, 3)
+    assert buy.tolist() == [1] and sell.tolist() == [0] and spread.tolist() == [4.0]
+
+
+@pytest.mark.parametrize('n,k,reserve', [(30, 8, None), (50, 8, 0), (12, 20, None)])
+def test_top_pairs_tracks_brute_force_through_updates(n, k, reserve, monkeypatch):
+    monkeypatch.setattr(TopPairs, 'MIN_INCREMENTAL_NODES', 0)  # exercise the incremental path at test sizes
+    rng = np.random.default_rng(k + n)
+    threshold = 10.0
+    pairs = TopPairs(threshold, k, reserve)
+    prices = rng.normal(50, 15, n)
+    for step in range(300):
+        moved = rng.choice(n, size=rng.integers(1, 3) if step % 50 else n, replace=False)
+        prices = prices.copy()
+        prices[moved] += rng.normal(0, 5, len(moved))
+        got = as_pairs(*pairs.update(prices))
+        expected = brute_force(prices, threshold, k)
+        assert [(i, j) for _, i, j in got] == [(i, j) for _, i, j in expected], step
+    assert pairs.rescans < 300  # most updates were incremental
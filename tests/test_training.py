@@ -0,0 +1,66 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from training import ModelTrainer
+
+
+def history(ticks=60, zones=3):
+    rng = np.random.default_rng(0)
+    timestamps = 1_700_000_000 + 300.0 * np.arange(ticks)
+    load = 1000 + rng.normal(0, 50, (ticks, zones))
+    price = 40 + rng.normal(0, 5, (ticks, zones))
+    return timestamps, load, price, 3 + rng.normal(0, 0.1, ticks)
+
+
+def wait_for(predicate, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def test_export_runs_off_the_calling_thread():
+    trainer = ModelTrainer(retrain_seconds=3600, min_samples=10, horizon_seconds=300)
+    release = threading.Event()
+    callers = []
+
+    def export_history():
+        callers.append(threading.current_thread())
+        release.wait(5)
+        return history(ticks=5)
+
+    try:
+        started = time.perf_counter()
+        assert trainer.maybe_retrain(export_history)
+        assert time.perf_counter() - started < 0.5
+        assert not trainer.maybe_retrain(export_history)  # still in flight
+        release.set()
+        wait_for(lambda: trainer._future.done())
+        assert callers[0] is not threading.current_thread()
+        assert trainer.bundle is None  # five rows is under min_samples
+    finally:
+        trainer.shutdown()
+
+
+def test_short_history_is_retried_before_the_retrain_interval():
+    trainer = ModelTrainer(retrain_seconds=3600, min_samples=10, horizon_seconds=300)
+    try:
+        assert trainer.maybe_retrain(lambda: history(ticks=5))
+        wait_for(lambda: trainer._future.done())
+        assert trainer._next_submit - time.monotonic() <= 60
+    finally:
+        trainer.shutdown()
+
+
+def test_fit_installs_a_bundle():
+    pytest.importorskip('sklearn')
+    trainer = ModelTrainer(retrain_seconds=3600, min_samples=10, horizon_seconds=300)
+    try:
+        assert trainer.maybe_retrain(history)
+        wait_for(lambda: trainer.bundle is not None)
+        assert trainer.bundle.version == 1
+    finally:
+        trainer.shutdown()
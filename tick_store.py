@@ -0,0 +1,207 @@
+"""Append-only on-disk tick store.
+
+Every tick is written as one fixed-size binary record to a per-day segment
+file (``YYYYMMDD.ticks``). Segments are read back with ``numpy.memmap``, so
+mapping months of history costs a few system calls instead of a parse, and
+every read is a zero-copy view into the page cache.
+
+Segment layout::
+
+    [HEADER_SIZE bytes: MAGIC, header length, JSON layout, zero padding]
+    [record 0][record 1] ...
+
+Each record ends with a ``seal`` word written last. On open, a trailing
+partial record (size not a multiple of the record size) or a record whose
+seal is missing is treated as torn by a crash and truncated away.
+"""
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b'NYTICK01'
+HEADER_SIZE = 4096
+SEAL = 0x5EA1ED5EA1ED5EA1
+SEGMENT_SUFFIX = '.ticks'
+
+ELECTRICITY_FIELDS = ('rt_price', 'da_price', 'load_mw', 'heat_rate', 'spark_spread')
+GAS_FIELDS = ('price', 'basis_to_hh', 'volume_mmcf', 'volatility')
+
+
+class TickStoreError(Exception):
+    """Raised when a segment is unreadable or was written with a different layout"""
+
+
+def record_dtype(n_zones, n_hubs):
+    """Fixed-size record holding one full market snapshot"""
+    fields = [('timestamp', '<f8')]
+    fields += [(field, '<f8', (n_zones,)) for field in ELECTRICITY_FIELDS]
+    fields += [(field, '<f8', (n_hubs,)) for field in GAS_FIELDS]
+    fields += [('henry_hub', '<f8'), ('avg_spark_spread', '<f8'), ('seal', '<u8')]
+    return np.dtype(fields)
+
+
+class TickStore:
+    def __init__(self, directory, zones, hubs, fsync=False, recover=True):
+        self.directory = directory
+        self.zones = list(zones)
+        self.hubs = list(hubs)
+        self.fsync = fsync
+        self.dtype = record_dtype(len(self.zones), len(self.hubs))
+        self.layout = {'zones': self.zones, 'hubs': self.hubs, 'record_size': self.dtype.itemsize}
+        self._fd = None
+        self._day = None
+        os.makedirs(directory, exist_ok=True)
+        # Only the most recently written segment can end in a torn record. Bulk writers
+        # (recover=False) must leave it alone, since a live engine may be appending to it.
+        days = self.segment_days() if recover else None
+        if days:
+            try:
+                path = self.segment_path(days[-1])
+                self._check_header(path)
+                self.recover(path)
+            except TickStoreError as e:
+                print(f"Not recovering tick segment {days[-1]}: {e}")
+
+    # Writing
+
+    def append(self, snapshot):
+        """Append one snapshot to the segment for its day, rotating at midnight"""
+        day = snapshot.time.strftime('%Y%m%d')
+        if day != self._day:
+            self._rotate(day)
+        record = np.zeros(1, dtype=self.dtype)
+        record['timestamp'] = snapshot.time.timestamp()
+        for field in ELECTRICITY_FIELDS:
+            record[field] = snapshot.electricity[field]
+        for field in GAS_FIELDS:
+            record[field] = snapshot.natural_gas[field]
+        record['henry_hub'] = snapshot.henry_hub
+        record['avg_spark_spread'] = snapshot.avg_spark_spread
+        record['seal'] = SEAL
+        os.write(self._fd, record.tobytes())
+        if self.fsync:
+            os.fsync(self._fd)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            self._day = None
+
+    def _rotate(self, day):
+        self.close()
+        path = self.segment_path(day)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self._check_header(path)
+            self.recover(path)
+        else:
+            self._write_header(path)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+        self._day = day
+
+    def _write_header(self, path):
+        self.write_segment(path, np.empty(0, dtype=self.dtype))
+
+    def write_segment(self, path, records):
+        """Write a whole segment at once, e.g. from a backfill; it appears complete or not at all"""
+        layout = json.dumps(self.layout).encode()
+        header = MAGIC + struct.pack('<I', len(layout)) + layout
+        if len(header) > HEADER_SIZE:
+            raise TickStoreError(f'Layout for {len(self.zones)} zones and {len(self.hubs)} hubs '
+                                 f'does not fit in a {HEADER_SIZE}-byte header')
+        records = np.asarray(records, dtype=self.dtype).copy()
+        records['seal'] = SEAL
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(header.ljust(HEADER_SIZE, b'\0'))
+            f.write(records.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def recover(self, path):
+        """Truncate a torn trailing record left behind by a crash; returns the record count"""
+        record_size = self.dtype.itemsize
+        body = max(os.path.getsize(path) - HEADER_SIZE, 0)
+        count = body // record_size
+        if count:
+            last = np.memmap(path, dtype=self.dtype, mode='r', offset=HEADER_SIZE, shape=(count,))
+            sealed = last['seal'] == SEAL
+            # Only the tail can be torn; keep everything up to the last sealed record
+            count = int(np.flatnonzero(sealed)[-1]) + 1 if sealed.any() else 0
+            del last
+        if HEADER_SIZE + count * record_size != os.path.getsize(path):
+            os.truncate(path, HEADER_SIZE + count * record_size)
+        return count
+
+    # Reading
+
+    def segment_path(self, day):
+        return os.path.join(self.directory, day + SEGMENT_SUFFIX)
+
+    def segment_days(self):
+        """Days that have a segment on disk, oldest first"""
+        return sorted(name[:-len(SEGMENT_SUFFIX)] for name in os.listdir(self.directory)
+                      if name.endswith(SEGMENT_SUFFIX))
+
+    def _check_header(self, path):
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        if header[:len(MAGIC)] != MAGIC:
+            raise TickStoreError(f'{path} is not a tick segment')
+        (length,) = struct.unpack_from('<I', header, len(MAGIC))
+        start = len(MAGIC) + 4
+        try:
+            layout = json.loads(header[start:start + length])
+        except ValueError:
+            raise TickStoreError(f'{path} has a corrupt header')
+        if layout != self.layout:
+            raise TickStoreError(f'{path} was written with a different zone/hub layout')
+
+    def read_day(self, day):
+        """Memory-map one day's records; only whole, sealed records are exposed"""
+        path = self.segment_path(day)
+        self._check_header(path)
+        count = max(os.path.getsize(path) - HEADER_SIZE, 0) // self.dtype.itemsize
+        if count == 0:
+            return np.empty(0, dtype=self.dtype)
+        records = np.memmap(path, dtype=self.dtype, mode='r', offset=HEADER_SIZE, shape=(count,))
+        # A writer may be mid-append; drop anything after the last sealed record
+        if records[-1]['seal'] != SEAL:
+            sealed = np.flatnonzero(records['seal'] == SEAL)
+            records = records[:sealed[-1] + 1] if sealed.size else records[:0]
+        return records
+
+    def read_range(self, start=None, end=None):
+        """Zero-copy record slices covering [start, end] (epoch seconds), one per segment"""
+        slices = []
+        for day in self.segment_days():
+            try:
+                records = self.read_day(day)
+            except TickStoreError as e:
+                print(f"Skipping tick segment {day}: {e}")
+                continue
+            timestamps = records['timestamp']
+            lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+            hi = len(records) if end is None else int(np.searchsorted(timestamps, end, side='right'))
+            if lo < hi:
+                slices.append(records[lo:hi])
+        return slices
+
+    def tail(self, count):
+        """Zero-copy slices holding the newest ``count`` records, oldest first"""
+        slices = []
+        for day in reversed(self.segment_days()):
+            if count <= 0:
+                break
+            try:
+                records = self.read_day(day)
+            except TickStoreError as e:
+                print(f"Skipping tick segment {day}: {e}")
+                continue
+            if len(records):
+                slices.append(records[-count:])
+                count -= len(slices[-1])
+        return slices[::-1]
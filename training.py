@@ -0,0 +1,162 @@
+"""Background training of scikit-learn load and price models.
+
+Models are fitted on the engine's accumulated price history in a separate
+process, so neither API requests nor the tick loop ever wait on a fit. The
+engine hands ``ModelTrainer.maybe_retrain`` a function that copies out the
+history, which runs on the trainer's own thread rather than the tick loop;
+when a fit finishes, the new ``ModelBundle`` replaces the old one with a
+single reference swap, and inference is one batched ``predict`` per model
+per tick.
+
+This module must not import ``app``: pool workers are spawned fresh and only
+import what ``fit_models`` needs.
+"""
+import importlib.util
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+MAX_TRAINING_ROWS = 50000
+SHORT_HISTORY_RETRY_SECONDS = 60  # how soon to look again when the history was too short to fit
+
+
+def available():
+    return importlib.util.find_spec('sklearn') is not None
+
+
+def hour_of_day(timestamps):
+    """Fractional local hour for epoch-second timestamps (UTC offset taken from the newest one)"""
+    timestamps = np.asarray(timestamps, dtype=float)
+    offset = datetime.fromtimestamp(timestamps[-1]).astimezone().utcoffset().total_seconds()
+    return ((timestamps + offset) % 86400) / 3600
+
+
+def make_features(hours, zone_ids, load, price, gas_price):
+    """Feature matrix shared by training and inference; all arguments broadcast to one row per sample"""
+    angle = 2 * np.pi * np.asarray(hours) / 24
+    return np.column_stack(np.broadcast_arrays(zone_ids, np.sin(angle), np.cos(angle), load, price, gas_price))
+
+
+def fit_models(timestamps, load, price, gas_price, horizon_seconds, random_state=0):
+    """Fit load and price models predicting ``horizon_seconds`` ahead; runs inside a pool worker.
+
+    ``load`` and ``price`` are (ticks, zones) arrays and ``gas_price`` is the
+    per-tick average hub price. Returns None when the history is too short.
+    """
+    from sklearn.ensemble import RandomForestRegressor
+
+    timestamps = np.asarray(timestamps, dtype=float)
+    spacing = float(np.median(np.diff(timestamps))) if len(timestamps) > 1 else 0
+    if spacing <= 0:
+        return None
+    steps = max(int(round(horizon_seconds / spacing)), 1)
+    n_ticks, n_zones = load.shape
+    if n_ticks <= steps:
+        return None
+
+    rows = n_ticks - steps
+    hours = np.repeat(hour_of_day(timestamps[:rows]), n_zones)
+    zone_ids = np.tile(np.arange(n_zones), rows)
+    X = make_features(hours, zone_ids, load[:rows].ravel(), price[:rows].ravel(), np.repeat(gas_price[:rows], n_zones))
+    y_load = load[steps:].ravel()
+    y_price = price[steps:].ravel()
+    if len(X) > MAX_TRAINING_ROWS:
+        keep = np.random.default_rng(random_state).choice(len(X), MAX_TRAINING_ROWS, replace=False)
+        X, y_load, y_price = X[keep], y_load[keep], y_price[keep]
+
+    models = {}
+    for name, y in (('load', y_load), ('price', y_price)):
+        model = RandomForestRegressor(n_estimators=60, max_depth=12, min_samples_leaf=5,
+                                      random_state=random_state, n_jobs=1)
+        models[name] = model.fit(X, y)
+    return {'models': models, 'n_samples': len(X), 'horizon_seconds': horizon_seconds, 'trained_at': time.time()}
+
+
+class ModelBundle:
+    """One immutable, versioned set of fitted models"""
+
+    def __init__(self, version, models, n_samples, horizon_seconds, trained_at):
+        self.version = version
+        self.models = models
+        self.n_samples = n_samples
+        self.horizon_seconds = horizon_seconds
+        self.trained_at = trained_at
+
+    def predict(self, timestamp, load, price, gas_price):
+        """Batched forecast for every zone at once: one predict call per model"""
+        zone_ids = np.arange(len(load))
+        X = make_features(hour_of_day([timestamp])[0], zone_ids, load, price, gas_price)
+        return {name: model.predict(X) for name, model in self.models.items()}
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'trained_at': datetime.fromtimestamp(self.trained_at).isoformat(),
+            'n_samples': self.n_samples,
+            'horizon_hours': self.horizon_seconds / 3600
+        }
+
+
+class ModelTrainer:
+    """Schedules fits in a single-process pool and hot-swaps finished models in.
+
+    At most one fit is in flight. ``maybe_retrain`` only submits work and
+    returns immediately: the history export runs on a single helper thread,
+    which then waits for the fit in the pool, and results are installed from
+    that thread.
+    """
+
+    def __init__(self, retrain_seconds, min_samples, horizon_seconds):
+        self.retrain_seconds = retrain_seconds
+        self.min_samples = min_samples
+        self.horizon_seconds = horizon_seconds
+        self.bundle = None
+        self._version = 0
+        self._future = None
+        self._next_submit = None
+        self._executor = None
+        self._exporter = None
+
+    def maybe_retrain(self, export_history):
+        """Start a fit if one is due; ``export_history`` returns (timestamps, load, price, gas_price) copies"""
+        if self._future is not None and not self._future.done():
+            return False
+        now = time.monotonic()
+        if self._next_submit is not None and now < self._next_submit:
+            return False
+        if self._executor is None:
+            # spawn, not fork: the parent is multi-threaded and fork would copy held locks
+            self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+            self._exporter = ThreadPoolExecutor(max_workers=1, thread_name_prefix='training')
+        self._next_submit = now + self.retrain_seconds
+        self._future = self._exporter.submit(self._fit, export_history)
+        self._future.add_done_callback(self._install)
+        return True
+
+    def _fit(self, export_history):
+        """Runs on the helper thread: copy the history out, then fit it in the pool"""
+        timestamps, load, price, gas_price = export_history()
+        if len(timestamps) < self.min_samples:
+            self._next_submit = time.monotonic() + min(self.retrain_seconds, SHORT_HISTORY_RETRY_SECONDS)
+            return None
+        return self._executor.submit(fit_models, timestamps, load, price, gas_price, self.horizon_seconds).result()
+
+    def _install(self, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Error training models: {e}")
+            return
+        if result is None:
+            return
+        self._version += 1
+        self.bundle = ModelBundle(self._version, **result)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._exporter.shutdown(wait=False, cancel_futures=True)
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._exporter = None